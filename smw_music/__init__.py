@@ -3,15 +3,54 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-only
 
-"""Top level SMW Music Module."""
+"""
+Top level SMW Music Module.
+
+Notes
+-----
+Subpackages are imported the first time they're used, so that entry points
+only pay for the dependencies (music21, scipy, PyQt) that they need.
+"""
 
 ###############################################################################
 # Imports
 ###############################################################################
 
-from . import exporters, ext_tools, song, spc700, spcmw, ui, utils
+# Standard library imports
+import importlib
+from types import ModuleType
+from typing import TYPE_CHECKING
+
 from .common import COPYRIGHT_YEAR, RESOURCES, SmwMusicException, __version__
 
+if TYPE_CHECKING:
+    from . import exporters, ext_tools, song, spc700, spcmw, ui, utils
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_SUBPACKAGES = (
+    "exporters",
+    "ext_tools",
+    "song",
+    "spc700",
+    "spcmw",
+    "ui",
+    "utils",
+)
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 ###############################################################################
 # API declaration
 ###############################################################################
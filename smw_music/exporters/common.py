@@ -14,7 +14,7 @@ from functools import singledispatchmethod
 # Package imports
 from smw_music.common import SmwMusicException
 from smw_music.song import Song, Token
-from smw_music.spcmw import Project
+from smw_music.spcmw import Project, get_score_cache
 
 ###############################################################################
 # API class definitions
@@ -26,12 +26,14 @@ class Exporter:
     # Constructor definitions
     ###########################################################################
 
-    def __init__(self, project: Project, song: Song | None = None) -> None:
+    def __init__(
+        self, project: Project, song: Song | None = None, workers: int = 1
+    ) -> None:
         if song is None:
             musicxml = project.info.musicxml_fname
             if musicxml is None:
                 raise SmwMusicException("MusicXML missing from project info")
-            self.song = Song.from_music_xml(musicxml)
+            self.song = get_score_cache().from_music_xml(musicxml, workers)
         else:
             self.song = deepcopy(song)
         self.project = deepcopy(project)
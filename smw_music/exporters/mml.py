@@ -126,8 +126,10 @@ class MmlExporter(Exporter):
     # Constructor definitions
     ###########################################################################
 
-    def __init__(self, project: Project, song: Song | None = None) -> None:
-        super().__init__(project, song)
+    def __init__(
+        self, project: Project, song: Song | None = None, workers: int = 1
+    ) -> None:
+        super().__init__(project, song, workers)
 
         self.instruments: dict[str, InstrumentConfig]
         self.octave: int = 4
@@ -31,11 +31,17 @@ def main(arg_list: list[str] | None = None) -> None:
         arg_list = sys.argv[1:]
     parser = argparse.ArgumentParser(description=f"SPCMW CLI v{__version__}")
     parser.add_argument("spcmw", type=str, help="SPCMW Project File")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes to convert the score's parts on",
+    )
 
     args = parser.parse_args(arg_list)
 
     project, _ = Project.load(args.spcmw)
-    MmlExporter(project).export()
+    MmlExporter(project, workers=args.workers).export()
 
 
 ###############################################################################
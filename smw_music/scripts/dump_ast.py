@@ -48,10 +48,15 @@ def main(arg_list: list[str] | None = None) -> None:
     parser.add_argument(
         "--channel", type=int, help="Channel number", default=None
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Read the file directly instead of through music21",
+    )
 
     args = parser.parse_args(arg_list)
 
-    song = Song.from_music_xml(args.music_xml)
+    song = Song.from_music_xml(args.music_xml, streaming=args.streaming)
 
     _print_ast(song, args.channel)
 
@@ -13,15 +13,28 @@
 
 # Standard library imports
 import argparse
+import glob
+import hashlib
 import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from os import makedirs
 from pathlib import Path
 from typing import Callable, MutableMapping
 
+# Library imports
+import yaml
+
 # Package imports
 from smw_music.common import __version__
-from smw_music.spc700 import BLOCK_SIZE, Brr, extract_brrs
+from smw_music.spc700 import (
+    BLOCK_SIZE,
+    Brr,
+    SpcException,
+    SpcFile,
+    extract_brr_slots,
+    extract_brrs,
+)
 
 ###############################################################################
 # Private function definitions
@@ -31,10 +44,10 @@ from smw_music.spc700 import BLOCK_SIZE, Brr, extract_brrs
 def _extract(
     spc: Path, shift_check: bool, filt_check: bool, loop_check: bool
 ) -> None:
-    with open(spc, "rb") as fobj:
-        data = fobj.read()
-
-    all_brrs = extract_brrs(data)
+    try:
+        all_brrs = extract_brrs(SpcFile.from_file(spc))
+    except SpcException:
+        all_brrs = []
     brrs = defaultdict(list)
 
     if all_brrs:
@@ -42,29 +55,10 @@ def _extract(
         for n, brr in enumerate(all_brrs):
             brrs[brr].append(n)
 
-        # If the loop point doesn't point to the start of a block, discard
         _filter(
-            brrs,
-            lambda brr: brr.loop_point is None
-            or (brr.loop_point % BLOCK_SIZE == 0),
+            brrs, lambda brr: _keep(brr, shift_check, filt_check, loop_check)
         )
 
-        # Confirm that the loop point is somewhere in the sample
-        if loop_check:
-            _filter(
-                brrs,
-                lambda brr: brr.loop_point is None
-                or (0 <= brr.loop_point < len(brr.binary)),
-            )
-
-        # Shift values 13-15 are not valid
-        if shift_check:
-            _filter(brrs, lambda brr: all(x <= 12 for x in brr.ranges))
-
-        # Samples usually should start with a filter 0
-        if filt_check:
-            _filter(brrs, lambda brr: brr.filters[0] == 0)
-
         nbrrs = len(brrs)
         width = 1 if nbrrs < 10 else 2 if nbrrs < 100 else 3
 
@@ -89,6 +83,74 @@ def _extract(
 ###############################################################################
 
 
+def _extract_batch(
+    spcs: list[Path],
+    outdir: Path,
+    checks: tuple[bool, bool, bool],
+    max_workers: int | None,
+) -> None:
+    # Samples are named by content hash, so the same sample ripped from any
+    # number of SPCs lands in the library once
+    manifest: dict[str, list[dict[str, str | int]]] = {}
+
+    makedirs(outdir, exist_ok=True)
+
+    nspcs = 0
+    jobs = [(spc, checks) for spc in spcs]
+    with ProcessPoolExecutor(max_workers) as executor:
+        for spc, found in executor.map(_scan, jobs, chunksize=8):
+            if found is None:
+                print(f"Could not read {spc}")
+                continue
+
+            nspcs += 1
+            for slot, binary in found.items():
+                fname = f"{hashlib.sha256(binary).hexdigest()}.brr"
+
+                if fname not in manifest:
+                    manifest[fname] = []
+                    with open(outdir / fname, "wb") as fobj:
+                        fobj.write(binary)
+
+                manifest[fname].append({"spc": str(spc), "slot": slot})
+
+    with open(outdir / "manifest.yaml", "w", encoding="utf8") as fobj:
+        yaml.safe_dump(manifest, fobj)
+
+    print(f"Extracted {len(manifest)} unique BRRs from {nspcs} SPCs")
+
+
+###############################################################################
+
+
+def _expand(sources: list[str]) -> list[Path]:
+    # Files are taken as is and directories are searched recursively.
+    # Anything else is treated as a glob.
+    spcs: list[Path] = []
+    for source in sources:
+        path = Path(source)
+        if path.is_file():
+            found = [path]
+        elif path.is_dir():
+            found = sorted(
+                x
+                for x in path.rglob("*")
+                if x.is_file() and x.suffix.lower() == ".spc"
+            )
+        else:
+            found = [Path(x) for x in sorted(glob.glob(source))]
+
+        if not found:
+            print(f"No SPCs found at {source}")
+        spcs.extend(found)
+
+    # Drop repeats, but keep the order
+    return list(dict.fromkeys(spcs))
+
+
+###############################################################################
+
+
 def _filter(
     brrs: MutableMapping[Brr, list[int]], valid: Callable[[Brr], bool]
 ) -> None:
@@ -98,6 +160,53 @@ def _filter(
             del brrs[brr]
 
 
+###############################################################################
+
+
+def _keep(
+    brr: Brr, shift_check: bool, filt_check: bool, loop_check: bool
+) -> bool:
+    # If the loop point doesn't point to the start of a block, discard
+    if not (brr.loop_point is None or brr.loop_point % BLOCK_SIZE == 0):
+        return False
+
+    # Confirm that the loop point is somewhere in the sample
+    if loop_check and not (
+        brr.loop_point is None or 0 <= brr.loop_point < len(brr.binary)
+    ):
+        return False
+
+    # Shift values 13-15 are not valid
+    if shift_check and not all(x <= 12 for x in brr.ranges):
+        return False
+
+    # Samples usually should start with a filter 0
+    if filt_check and brr.filters[0] != 0:
+        return False
+
+    return True
+
+
+###############################################################################
+
+
+def _scan(
+    job: tuple[Path, tuple[bool, bool, bool]],
+) -> tuple[Path, dict[int, bytes] | None]:
+    # Runs in a worker process.  Binaries are sent back rather than Brrs,
+    # whose blocks are views into the worker's memory map.  An SPC that
+    # can't be read gives None.
+    spc, checks = job
+    try:
+        brrs = extract_brr_slots(SpcFile.from_file(spc))
+    except (OSError, ValueError, SpcException):
+        return spc, None
+
+    return spc, {
+        slot: brr.binary for slot, brr in brrs.items() if _keep(brr, *checks)
+    }
+
+
 ###############################################################################
 # API function definitions
 ###############################################################################
@@ -110,7 +219,22 @@ def main(arg_list: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description=f"SMW Music BRR Extractor v{__version__}"
     )
-    parser.add_argument("spc", type=Path, help="Source SPC file")
+    parser.add_argument(
+        "spc",
+        nargs="+",
+        help="Source SPC file(s), director(ies), or glob(s)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Shared sample library directory for batch mode",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes in batch mode",
+    )
     parser.add_argument(
         "--shiftcheck",
         action=argparse.BooleanOptionalAction,
@@ -132,7 +256,15 @@ def main(arg_list: list[str] | None = None) -> None:
 
     args = parser.parse_args(arg_list)
 
-    _extract(args.spc, args.shiftcheck, args.filtcheck, args.loopcheck)
+    checks = (args.shiftcheck, args.filtcheck, args.loopcheck)
+
+    # A single SPC file gets its own output directory, as always
+    if args.output is None:
+        if len(args.spc) != 1 or not Path(args.spc[0]).is_file():
+            parser.error("--output is required for multiple SPCs")
+        _extract(Path(args.spc[0]), *checks)
+    else:
+        _extract_batch(_expand(args.spc), args.output, checks, args.jobs)
 
 
 ###############################################################################
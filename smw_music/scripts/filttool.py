@@ -15,7 +15,6 @@
 # Standard Library imports
 import argparse
 import sys
-import warnings
 from functools import partial
 from typing import Any, Optional, cast
 
@@ -23,7 +22,6 @@ from typing import Any, Optional, cast
 import matplotlib
 import numpy as np
 import numpy.typing as npt
-import scipy.signal  # type: ignore
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 from matplotlib.ticker import ScalarFormatter
@@ -43,6 +41,7 @@ from PyQt6.QtWidgets import (
 
 # Package imports
 from smw_music.common import __version__
+from smw_music.spc700 import fir_response
 
 ###############################################################################
 # Private function definitions
@@ -188,14 +187,7 @@ class MainWindow(QMainWindow):
     ###########################################################################
 
     def update_plot(self, coeffs: npt.NDArray[np.int8]) -> None:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            w, mag, phase = scipy.signal.dbode(
-                (coeffs[::-1] / 128, 1, 1 / (8e3)), n=1000
-            )
-
-        phase = (phase + 180) % 360 - 180
-        w /= 2 * np.pi
+        w, mag, phase = fir_response(tuple(int(x) for x in coeffs))
 
         axes = self.canvas.mag
         axes.cla()
@@ -207,7 +199,7 @@ class MainWindow(QMainWindow):
         axes.set_title("Magnitude Response")
         axes.xaxis.set_major_formatter(ScalarFormatter())
         axes.set_xticks(
-            [1, 2, 4, 7, 10, 20, 40, 70, 100, 200, 400, 700, 1000, 2000, 4000]
+            [10, 20, 40, 70, 100, 200, 400, 700, 1000, 2000, 4000, 7000, 16000]
         )
 
         axes = self.canvas.phase
@@ -220,7 +212,7 @@ class MainWindow(QMainWindow):
         axes.set_title("Phase Response")
         axes.xaxis.set_major_formatter(ScalarFormatter())
         axes.set_xticks(
-            [1, 2, 4, 7, 10, 20, 40, 70, 100, 200, 400, 700, 1000, 2000, 4000]
+            [10, 20, 40, 70, 100, 200, 400, 700, 1000, 2000, 4000, 7000, 16000]
         )
 
         self.canvas.fig.canvas.draw_idle()
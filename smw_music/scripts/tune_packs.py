@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Sample pack tuning tool."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import argparse
+import sys
+from pathlib import Path
+
+# Package imports
+from smw_music.common import __version__
+from smw_music.spcmw import (
+    PACK_TUNING_FNAME,
+    analyze_packs,
+    get_preferences,
+    save_pack_tunings,
+)
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def main(arg_list: list[str] | None = None) -> None:
+    """Entrypoint for Sample Pack Tuning Tool"""
+    if arg_list is None:
+        arg_list = sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        description=f"SMW Music sample pack tuning tool v{__version__}"
+    )
+    parser.add_argument(
+        "dname",
+        type=Path,
+        nargs="?",
+        help="Sample pack directory (default: the dashboard's)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help=f"Tuning cache file (default: {PACK_TUNING_FNAME} in the "
+        + "sample pack directory, where the dashboard looks for it)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes",
+    )
+
+    args = parser.parse_args(arg_list)
+
+    dname = args.dname
+    if dname is None:
+        dname = get_preferences().sample_pack_dname
+    output = args.output or dname / PACK_TUNING_FNAME
+
+    tunings, failed = analyze_packs(dname, args.jobs)
+    save_pack_tunings(output, tunings)
+
+    for path in failed:
+        print(f"Could not read sample pack {path}")
+
+    nsamples = sum(len(x) for x in tunings.values())
+    print(f"Tuned {nsamples} samples from {len(tunings)} packs")
+
+
+###############################################################################
+# Entrypoint
+###############################################################################
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@
 # Imports
 ###############################################################################
 
+from .cache import ScoreCache
 from .common import Dynamics, NoteHead, SongException, dedupe_notes
 from .reduction import reduce, remove_unused_instruments
 from .song import Song, dynamics, transpose
@@ -45,6 +46,7 @@ from .tokens import (
 ###############################################################################
 
 __all__ = [
+    "ScoreCache",
     "Dynamics",
     "NoteHead",
     "SongException",
@@ -0,0 +1,267 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Parsed score cache
+
+Notes
+-----
+Parsing a MusicXML file with music21 dominates loading a song, so converted
+songs are cached on disk, one compressed pickle per score, named by the hash
+of the score's contents.  An entry is only used if it was written by the same
+versions of this package and music21, otherwise the score is parsed again and
+the entry replaced.  The cache is bounded in size, and the least recently
+used entries are evicted first.
+
+Entries are pickles, so the cache directory is created private to the user,
+and entries are neither read from nor written to a directory that someone
+else owns or can write to.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Only entries in a user-private directory are unpickled, see _private
+# (bandit B403, B301)
+
+# Standard library imports
+import hashlib
+import os
+import pickle  # nosec B403
+import zlib
+from contextlib import suppress
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+# Library imports
+import music21 as m21
+
+# Package imports
+from smw_music.common import __version__
+
+from .song import Song
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+DEFAULT_CACHE_SIZE = 64 * 2**20
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_EXT = ".song"
+
+# Bumped whenever what's stored changes, older entries are reparsed
+_FORMAT = 1
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _private(dname: Path) -> bool:
+    # Windows doesn't have these permission bits, and a user's application
+    # data directory is private there by default
+    if os.name != "posix":
+        return True
+
+    stat = dname.stat()
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+###############################################################################
+
+
+def _versions() -> tuple[int, str, str]:
+    return (_FORMAT, __version__, m21.__version__)
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class ScoreCache:
+    """
+    A persistent cache of songs converted from MusicXML
+
+    Parameters
+    ----------
+    cache_dir : Path
+        Directory for the cache, or None to always parse.  It is created when
+        the first entry is written.
+    max_size : int
+        Upper bound on the cache's size, in bytes
+    """
+
+    cache_dir: Path | None
+    max_size: int
+
+    ###########################################################################
+
+    def __init__(
+        self, cache_dir: Path | None, max_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def clear(self) -> None:
+        """Empty the cache."""
+        for fname, _ in self._entries():
+            with suppress(FileNotFoundError):
+                fname.unlink()
+
+    ###########################################################################
+
+    def from_music_xml(
+        self, fname: Path, workers: int = 1, streaming: bool = False
+    ) -> Song:
+        """
+        Convert a MusicXML file to a Song, as in `Song.from_music_xml`
+
+        Parameters
+        ----------
+        fname : Path
+            The (compressed or uncompressed) MusicXML file
+        workers : int
+            Number of worker processes to convert parts on, if it's parsed
+        streaming : bool
+            True to parse with the streaming reader instead of music21.  Its
+            conversions are cached separately.
+
+        Returns
+        -------
+        Song
+            The cached conversion of `fname`'s contents if there is one,
+            otherwise a new conversion (which is then cached)
+
+        Raises
+        ------
+        SongException:
+            Whenever a conversion is not possible
+        """
+        try:
+            with open(fname, "rb") as fobj:
+                key = hashlib.sha256(fobj.read()).hexdigest()
+        except OSError:
+            # Let the parser report it
+            return Song.from_music_xml(fname, workers, streaming)
+
+        if streaming:
+            key += "-streaming"
+
+        song = self._load(key)
+        if song is None:
+            song = Song.from_music_xml(fname, workers, streaming)
+            with suppress(OSError, pickle.PicklingError):
+                self._save(key, song)
+
+        return song
+
+    ###########################################################################
+
+    def prune(self) -> None:
+        """Evict least recently used entries until the cache fits."""
+        entries = self._entries()
+        total = sum(stat.st_size for _, stat in entries)
+
+        entries.sort(key=lambda x: x[1].st_mtime_ns)
+        for fname, stat in entries:
+            if total <= self.max_size:
+                break
+            with suppress(FileNotFoundError):
+                fname.unlink()
+            total -= stat.st_size
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        rv = []
+        if self.cache_dir is not None and self.cache_dir.is_dir():
+            for fname in self.cache_dir.glob(f"*{_EXT}"):
+                with suppress(FileNotFoundError):
+                    rv.append((fname, fname.stat()))
+        return rv
+
+    ###########################################################################
+
+    def _fname(self, key: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}{_EXT}"
+
+    ###########################################################################
+
+    def _load(self, key: str) -> Song | None:
+        fname = self._fname(key)
+        if fname is None:
+            return None
+
+        try:
+            if not _private(fname.parent):
+                return None
+            with open(fname, "rb") as fobj:
+                data = zlib.decompress(fobj.read())
+            # The cache is in a user-private directory, keyed by content hash
+            versions, song = pickle.loads(data)  # nosec B301
+        except (
+            OSError,
+            EOFError,
+            ValueError,
+            TypeError,
+            AttributeError,
+            ImportError,
+            pickle.UnpicklingError,
+            zlib.error,
+        ):
+            # Missing, or written by something else
+            return None
+
+        if versions != _versions() or not isinstance(song, Song):
+            return None
+
+        # Mark it as recently used
+        with suppress(OSError):
+            os.utime(fname)
+
+        return song
+
+    ###########################################################################
+
+    def _save(self, key: str, song: Song) -> None:
+        fname = self._fname(key)
+        if fname is None:
+            return
+
+        data = pickle.dumps((_versions(), song), pickle.HIGHEST_PROTOCOL)
+
+        fname.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _private(fname.parent):
+            return
+
+        # Write to a temporary file and move it into place so other processes
+        # never see a partial entry.  It's removed if anything goes wrong.
+        fobj = NamedTemporaryFile(
+            dir=fname.parent, suffix=".tmp", delete=False
+        )
+        try:
+            with fobj:
+                fobj.write(zlib.compress(data))
+            os.replace(fobj.name, fname)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(fobj.name)
+            raise
+
+        self.prune()
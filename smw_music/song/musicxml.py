@@ -0,0 +1,1470 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Streaming MusicXML reader
+
+Notes
+-----
+`Song.from_music_xml` has music21 build its complete object model of a score,
+then walks it to make tokens.  Only a small part of that model is ever used,
+so `read_music_xml` instead reads the file incrementally and keeps just what
+tokens are made from: notes, rests, dynamics, slurs, hairpins, brackets,
+repeats, text, tempos, clefs, and instruments.  Each measure is discarded as
+soon as it's read.
+
+The tokens are meant to be identical to music21's, so the reader follows
+music21's import rules rather than the MusicXML specification where they
+differ: the order of elements within a measure, how spanners are attached to
+notes, splitting multi-staff parts, voices, and full measure rests.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# ElementTree doesn't resolve external entities, and the expat it's built on
+# limits entity expansion, so it's safe on untrusted scores (bandit B405, B314)
+
+# Standard library imports
+import itertools
+import xml.etree.ElementTree as ET  # nosec B405
+from copy import deepcopy
+from dataclasses import dataclass, field, replace
+from fractions import Fraction
+from functools import cache
+from math import isclose
+from pathlib import Path, PurePosixPath
+from typing import IO, cast, get_args
+from zipfile import BadZipFile, ZipFile
+
+# Library imports
+import music21 as m21
+from music21.common.types import StepName
+
+from .common import Dynamics
+from .reduction import remove_unused_instruments
+from .tokens import (
+    Annotation,
+    Artic,
+    Clef,
+    CrescDelim,
+    Dynamic,
+    Error,
+    Instrument,
+    LoopDelim,
+    Measure,
+    Note,
+    RehearsalMark,
+    Repeat,
+    Rest,
+    Slur,
+    SongException,
+    Tempo,
+    Token,
+    Triplet,
+)
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Length of each MusicXML note type, in quarter notes
+_TYPE_LENGTHS = {
+    "maxima": Fraction(32),
+    "long": Fraction(16),
+    "breve": Fraction(8),
+    "whole": Fraction(4),
+    "half": Fraction(2),
+    "quarter": Fraction(1),
+    "eighth": Fraction(1, 2),
+    "16th": Fraction(1, 4),
+    "32nd": Fraction(1, 8),
+    "64th": Fraction(1, 16),
+    "128th": Fraction(1, 32),
+    "256th": Fraction(1, 64),
+    "512th": Fraction(1, 128),
+    "1024th": Fraction(1, 256),
+}
+
+# MusicXML note types to AMK note lengths, anything else is unsupported
+_AMK_LENGTHS = {
+    "whole": 1,
+    "half": 2,
+    "quarter": 4,
+    "eighth": 8,
+    "16th": 16,
+    "32nd": 32,
+    "64th": 64,
+}
+
+# music21's names for MusicXML accidentals, where they differ
+_ACCIDENTALS = {
+    "quarter-sharp": "half-sharp",
+    "three-quarters-sharp": "one-and-a-half-sharp",
+    "quarter-flat": "half-flat",
+    "three-quarters-flat": "one-and-a-half-flat",
+    "flat-flat": "double-flat",
+    "sharp-sharp": "double-sharp",
+}
+
+# Pitch steps by their MusicXML names
+_STEPS: dict[str, StepName] = {x: x for x in get_args(StepName)}
+
+# Default divisions per quarter note, before a part sets its own
+_DIVISIONS = Fraction(10080)
+
+# music21's class sort orders, which break ties between elements at the same
+# offset in a measure
+_ORDER_TEXT = -30
+_ORDER_BARLINE = -5
+_ORDER_CLEF = 0
+_ORDER_TEMPO = 1
+_ORDER_VOICE = 5
+_ORDER_DYNAMIC = 10
+_ORDER_NOTE = 20
+
+# Element kinds
+_CHORD = "chord"
+_CLEF = "clef"
+_DYNAMIC = "dynamic"
+_NOTE = "note"
+_REHEARSAL = "rehearsal"
+_REPEAT = "repeat"
+_REST = "rest"
+_TEMPO = "tempo"
+_TEXT = "text"
+_VOICE = "voice"
+
+_GENERAL_NOTES = (_CHORD, _NOTE, _REST)
+
+# Kinds that only go to their own staff when a part is split into staves
+_STAFF_SPECIFIC = (
+    _CHORD,
+    _CLEF,
+    _DYNAMIC,
+    _NOTE,
+    _REHEARSAL,
+    _REST,
+    _TEMPO,
+    _TEXT,
+)
+
+# Spanner kinds
+_LINE = "line"
+_OTTAVA = "ottava"
+_SLUR = "slur"
+_WEDGE = "wedge"
+
+# Elements whose staff is given by a `number` attribute rather than a `staff`
+# child
+_NUMBERED = ("clef", "key", "measure-style", "staff-details", "time")
+
+###############################################################################
+# Private class definitions
+###############################################################################
+
+
+@dataclass(eq=False)
+class _Elem:
+    # One element of a measure.  Elements are compared by identity, which is
+    # how spanners find their notes.
+    kind: str
+    offset: Fraction
+    order: int
+    staff: int = 0
+    seq: int = 0
+    length: Fraction = Fraction(0)
+    at_end: bool = False
+    grace: bool = False
+    tuplet: bool = False
+    # Duration type and dots, for notes and rests
+    type: str = ""
+    dots: int = 0
+    linked: bool = True
+    full_measure: bool = False
+    # Kind-specific contents
+    value: object = None
+    children: list["_Elem"] = field(default_factory=list)
+
+    ###########################################################################
+
+    def end(self) -> Fraction:
+        return self.offset + self.length
+
+    ###########################################################################
+
+    def key(self) -> tuple[bool, Fraction, int, bool, int]:
+        return (self.at_end, self.offset, self.order, not self.grace, self.seq)
+
+
+###############################################################################
+
+
+@dataclass
+class _Spanner:
+    kind: str
+    number: str | None
+    cresc: bool = False
+    complete: bool = False
+    elems: list[_Elem] = field(default_factory=list)
+
+    ###########################################################################
+
+    def add(self, elem: _Elem | None) -> None:
+        if elem is not None and all(x is not elem for x in self.elems):
+            self.elems.append(elem)
+
+
+###############################################################################
+
+
+@dataclass
+class _Measure:
+    number: int
+    elems: list[_Elem] = field(default_factory=list)
+    # Instrument transpositions that start at this measure
+    instruments: list[int] = field(default_factory=list)
+
+
+###############################################################################
+
+
+@dataclass
+class _Part:
+    # A part (or one staff of a split part), as it will be converted
+    name: str
+    measures: list[_Measure]
+    spanners: list[_Spanner] = field(default_factory=list)
+
+
+###############################################################################
+
+
+@dataclass
+class _PartState:
+    # Conversion state that outlives a single measure
+    name: str
+    divisions: Fraction = _DIVISIONS
+    measure_number: int = 0
+    bar_length: Fraction | None = None
+    transposition: tuple[int | None, int | None, int] | None = None
+    first_measure: bool = True
+    max_staves: int = 1
+    staff_keys: set[int] = field(default_factory=set)
+    measures: list[_Measure] = field(default_factory=list)
+    last_forward: _Elem | None = None
+    last_voices: bool = False
+
+
+###############################################################################
+
+
+@dataclass
+class _MeasureState:
+    # Conversion state for one measure, see music21's MeasureParser
+    measure: _Measure
+    elems: list[_Elem]
+    voices: dict[str, _Elem]
+    offset: Fraction = Fraction(0)
+    last_voice: str | None = None
+    last_note: _Elem | None = None
+    chord: list[ET.Element] = field(default_factory=list)
+    forward: _Elem | None = None
+    left: _Elem | None = None
+    right: _Elem | None = None
+    notes: int = 0
+    rests: int = 0
+    full_measure: bool = False
+    bar_length: Fraction | None = None
+    transposition: tuple[int | None, int | None, int] | None = None
+
+
+###############################################################################
+
+
+class _Reader:
+    # Reads a partwise score, one measure at a time
+
+    def __init__(self) -> None:
+        self._seq = itertools.count()
+        # Spanners still being built, and those waiting for their next note
+        self._bundle: list[_Spanner] = []
+        self._pending: list[_Spanner] = []
+        self._names: dict[str | None, str] = {}
+        self.parts: list[_Part] = []
+
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def end_part(self, part: _PartState) -> None:
+        self._remove_forward_rest(part)
+
+        # Finished spanners belong to the part they end in
+        spanners = [x for x in self._bundle if x.complete]
+        self._bundle = [x for x in self._bundle if not x.complete]
+
+        if part.max_staves > 1:
+            self.parts.extend(self._split(part, spanners))
+        else:
+            self.parts.append(_Part(part.name, part.measures, spanners))
+
+    ###########################################################################
+
+    def read_measure(self, part: _PartState, mx: ET.Element) -> None:
+        number = self._measure_number(part, mx.get("number"))
+        measure = _Measure(number)
+
+        state = _MeasureState(measure, measure.elems, {})
+        self._add_voices(state, mx)
+
+        children = list(mx)
+        for n, sub in enumerate(children):
+            match sub.tag:
+                case "note":
+                    nxt = children[n + 1] if n + 1 < len(children) else None
+                    self._read_note(part, state, sub, nxt)
+                case "backup":
+                    if (text := _text(sub.find("duration"))) is not None:
+                        change = _fraction(text) / part.divisions
+                        state.offset = max(state.offset - change, Fraction(0))
+                case "forward":
+                    self._read_forward(part, state, sub)
+                case "direction":
+                    self._read_direction(part, state, sub)
+                case "attributes":
+                    self._read_attributes(part, state, sub)
+                case "barline":
+                    self._read_barline(state, sub)
+
+        for barline in (state.left, state.right):
+            if barline is not None and barline.kind == _REPEAT:
+                state.elems.append(barline)
+
+        for voice in state.voices.values():
+            if voice.children:
+                self._fill_voice(state, voice)
+                voice.length = _highest_time(voice.children)
+
+        self._end_measure(part, state)
+
+    ###########################################################################
+
+    def read_part_list(self, mx: ET.Element) -> None:
+        for score_part in mx.iterfind("score-part"):
+            name = _clean(score_part.findtext("part-name")) or ""
+            self._names[score_part.get("id")] = name
+
+    ###########################################################################
+
+    def start_part(self, mx: ET.Element) -> _PartState:
+        part_id = mx.get("id")
+        if part_id is None and self._names:
+            part_id = next(iter(self._names))
+        try:
+            name = self._names[part_id]
+        except KeyError as e:
+            raise SongException(f"Part {part_id} missing from list") from e
+
+        return _PartState(name)
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _add(
+        self, part: _PartState, state: _MeasureState, elem: _Elem, voice: str
+    ) -> None:
+        # Insert into the measure, or its voice if it has voices
+        elem.seq = next(self._seq)
+        if elem.staff:
+            part.staff_keys.add(elem.staff)
+
+        if state.voices:
+            if (target := state.voices.get(voice)) is not None:
+                target.children.append(elem)
+                return
+        state.elems.append(elem)
+
+    ###########################################################################
+
+    def _add_voices(self, state: _MeasureState, mx: ET.Element) -> None:
+        indices = set()
+        for note in mx.iterfind("note"):
+            if (voice := _text(note.find("voice"))) is not None:
+                indices.add(voice)
+
+        if len(indices) > 1:
+            for index in sorted(indices):
+                elem = _Elem(_VOICE, Fraction(0), _ORDER_VOICE, value=index)
+                elem.seq = next(self._seq)
+                state.voices[index] = elem
+                state.elems.append(elem)
+
+    ###########################################################################
+
+    def _chord(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> _Elem:
+        # Only the first note's duration matters
+        first = state.chord[0]
+        elem = self._duration(
+            part, first, _Elem(_CHORD, state.offset, _ORDER_NOTE)
+        )
+        elem.staff = _staff(first)
+
+        for note in state.chord:
+            for notations in note.iterfind("notations"):
+                self._read_notations(notations, elem)
+        self._free_pending(elem, chord=True)
+
+        voice = next(
+            (
+                x.findtext("voice")
+                for x in state.chord
+                if x.find("voice") is not None
+            ),
+            mx.findtext("voice"),
+        )
+        self._add(part, state, elem, self._voice(state, voice))
+        state.chord = []
+        return elem
+
+    ###########################################################################
+
+    @staticmethod
+    def _copy(elem: _Elem, seen: set[int], force: bool = False) -> _Elem:
+        # The first staff an element goes to gets the element itself, the
+        # others get copies that spanners don't know about
+        if not force and id(elem) not in seen:
+            seen.add(id(elem))
+            return elem
+        return replace(
+            elem, value=deepcopy(elem.value), children=list(elem.children)
+        )
+
+    ###########################################################################
+
+    def _duration(
+        self, part: _PartState, mx: ET.Element, elem: _Elem
+    ) -> _Elem:
+        # Fill in a note or rest's duration, as music21's xmlToDuration
+        length = Fraction(0)
+        if (duration := mx.find("duration")) is not None:
+            length = _fraction(duration.text) / part.divisions
+
+        # Grace notes take no time
+        elem.grace = mx.find("grace") is not None
+        note_type = _text(mx.find("type"))
+
+        if note_type is None:
+            elem.type, elem.dots, elem.tuplet = _raw_duration(length)
+            elem.length = Fraction(0) if elem.grace else length
+            return elem
+
+        if note_type not in _TYPE_LENGTHS:
+            raise SongException(f"Unknown note type {note_type}")
+
+        dots = len(mx.findall("dot"))
+        cooked = _TYPE_LENGTHS[note_type] * (2 - Fraction(1, 2**dots))
+        modification = mx.find("time-modification")
+
+        elem.type = note_type
+        elem.dots = dots
+        elem.tuplet = modification is not None
+        elem.length = length
+
+        if modification is not None:
+            actual = _text(modification.find("actual-notes"))
+            normal = _text(modification.find("normal-notes"))
+            if actual is not None and normal is not None:
+                cooked *= _fraction(normal) / _fraction(actual)
+
+        if isclose(cooked, length, abs_tol=1e-7):
+            elem.length = cooked
+        else:
+            elem.linked = False
+
+        if elem.grace:
+            elem.length = Fraction(0)
+
+        return elem
+
+    ###########################################################################
+
+    def _end_measure(self, part: _PartState, state: _MeasureState) -> None:
+        measure = state.measure
+
+        # A transposition change means a new instrument
+        if state.transposition is not None:
+            if part.first_measure or part.transposition != state.transposition:
+                measure.instruments.append(_semitones(state.transposition))
+            part.transposition = state.transposition
+        if part.first_measure and not measure.instruments:
+            measure.instruments.append(0)
+        part.measures.append(measure)
+        part.first_measure = False
+
+        # Only a time signature at the start of the measure counts
+        if state.bar_length is not None:
+            part.bar_length = state.bar_length
+        elif part.bar_length is None:
+            part.bar_length = Fraction(4)
+
+        # music21 stretches a lone rest to fill the measure
+        if state.full_measure or (state.rests == 1 and state.notes == 0):
+            rests = [x for x in state.elems if x.kind == _REST]
+            if rests:
+                rest = min(rests, key=_Elem.key)
+                bar = part.bar_length
+                if rest.full_measure or (
+                    rest.length != bar
+                    and rest.type in ("whole", "breve")
+                    and rest.dots == 0
+                    and not rest.tuplet
+                ):
+                    rest.length = bar
+                    if rest.linked:
+                        rest.type, rest.dots, rest.tuplet = _raw_duration(bar)
+
+        part.last_forward = state.forward
+        part.last_voices = bool(state.voices)
+
+    ###########################################################################
+
+    def _fill_voice(self, state: _MeasureState, voice: _Elem) -> None:
+        # music21 fills gaps in each voice with hidden rests
+        top = _highest_time(
+            [x for x in state.elems if x.kind != _VOICE]
+            + [x for v in state.voices.values() for x in v.children]
+        )
+        children = voice.children
+
+        def rest(offset: Fraction, length: Fraction) -> None:
+            elem = _Elem(_REST, offset, _ORDER_NOTE, length=length)
+            elem.type, elem.dots, elem.tuplet = _raw_duration(length)
+            elem.seq = next(self._seq)
+            children.append(elem)
+
+        low = min(x.offset for x in children)
+        high = _highest_time(children)
+        if low > 0:
+            rest(Fraction(0), low)
+        if top > high:
+            rest(high, top - high)
+
+        end = Fraction(0)
+        for elem in _sorted(children):
+            if elem.at_end:
+                break
+            if elem.offset > end:
+                rest(end, elem.offset - end)
+            end = max(end, elem.end())
+
+    ###########################################################################
+
+    def _free_pending(self, elem: _Elem, chord: bool = False) -> None:
+        if self._pending:
+            # music21 replaces grace notes with a copy after their spanners
+            # are attached, so the spanners never find them
+            if elem.grace and not chord:
+                elem = _Elem(elem.kind, elem.offset, elem.order)
+            self._pending.pop(0).add(elem)
+
+    ###########################################################################
+
+    def _incomplete(self, kind: str, number: str | None) -> _Spanner | None:
+        for spanner in self._bundle:
+            if (
+                spanner.kind == kind
+                and spanner.number == number
+                and not spanner.complete
+            ):
+                return spanner
+        return None
+
+    ###########################################################################
+
+    @staticmethod
+    def _measure_number(part: _PartState, raw: str | None) -> int:
+        # Digits anywhere in the number attribute, or 0 if there are none
+        number = 0
+        suffix = None
+        if raw is not None:
+            digits = "".join(x for x in raw if x.isdigit())
+            suffix = "".join(x for x in raw if not x.isdigit())
+            if digits:
+                number = int(digits)
+
+        # Finale numbers unnumbered measures X1, X2, ...
+        if suffix == "X" and number != part.measure_number + 1:
+            number = part.measure_number
+
+        part.measure_number = number
+        return number
+
+    ###########################################################################
+
+    def _note(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> _Elem:
+        elem = self._duration(
+            part, mx, _Elem(_NOTE, state.offset, _ORDER_NOTE, _staff(mx))
+        )
+        self._free_pending(elem)
+
+        if (unpitched := mx.find("unpitched")) is not None:
+            step = _step(unpitched.find("display-step")) or "B"
+            octave = _int(unpitched.findtext("display-octave"))
+            pitch = m21.pitch.Pitch(
+                step=step, octave=4 if octave is None else octave
+            )
+        else:
+            pitch = _pitch(mx)
+
+        head = "normal"
+        if (notehead := mx.find("notehead")) is not None and notehead.text:
+            head = notehead.text
+
+        types = (x.get("type") for x in mx.iterfind("tie"))
+        ties = [x for x in types if x is not None]
+        tie = ""
+        if mx.find("tie") is not None:
+            if len(ties) == 1:
+                tie = ties[0]
+            elif "start" in ties and "stop" in ties:
+                tie = "continue"
+            else:
+                tie = "start"
+
+        articulations: set[str] = set()
+        for notations in mx.iterfind("notations"):
+            for group in notations.iterfind("articulations"):
+                articulations.update(x.tag for x in group)
+            self._read_notations(notations, elem)
+
+        if "accent" in articulations:
+            if "staccato" in articulations:
+                articulation = Artic.ACCSTAC
+            else:
+                articulation = Artic.ACCENT
+        elif "staccato" in articulations:
+            articulation = Artic.STACCATO
+        else:
+            articulation = Artic.NORMAL
+
+        elem.value = (pitch, head, tie, articulation)
+        return elem
+
+    ###########################################################################
+
+    def _read_attributes(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> None:
+        for sub in mx:
+            match sub.tag:
+                case "divisions":
+                    part.divisions = _fraction(sub.text)
+                case "staves":
+                    part.max_staves = max(part.max_staves, int(sub.text or 1))
+                case "transpose":
+                    state.transposition = (
+                        _int(sub.findtext("diatonic")),
+                        _int(sub.findtext("chromatic")),
+                        _int(sub.findtext("octave-change")) or 0,
+                    )
+                case "clef":
+                    sign = (sub.findtext("sign") or "").strip()
+                    elem = _Elem(
+                        _CLEF,
+                        state.offset,
+                        _ORDER_CLEF,
+                        staff=_staff(sub),
+                        value=sign.lower() == "percussion",
+                    )
+                    self._add(part, state, elem, "")
+                case "time":
+                    if (staff := _staff(sub)) != 0:
+                        part.staff_keys.add(staff)
+                    if state.offset == 0 and state.bar_length is None:
+                        state.bar_length = _bar_length(sub)
+                case "key" | "measure-style" | "staff-details":
+                    if (staff := _staff(sub)) != 0:
+                        part.staff_keys.add(staff)
+
+    ###########################################################################
+
+    def _read_barline(self, state: _MeasureState, mx: ET.Element) -> None:
+        location = mx.get("location") or "right"
+
+        elem = _Elem("barline", Fraction(0), _ORDER_BARLINE)
+        if (repeat := mx.find("repeat")) is not None:
+            direction = (repeat.get("direction") or "").lower()
+            if direction not in ("forward", "backward"):
+                raise SongException(f"Unknown repeat direction {direction}")
+            elem.kind = _REPEAT
+            elem.value = direction == "forward"
+        elem.seq = next(self._seq)
+
+        if location == "left":
+            state.left = elem
+        elif location == "right":
+            elem.at_end = True
+            state.right = elem
+        elif elem.kind == _REPEAT:
+            elem.offset = _highest_time(state.elems)
+            state.elems.append(elem)
+
+    ###########################################################################
+
+    def _read_direction(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> None:
+        offset = state.offset
+        if (text := _text(mx.find("offset"))) is not None:
+            offset += _fraction(text) / part.divisions
+        staff = _staff(mx)
+
+        def add(kind: str, order: int, value: object) -> None:
+            elem = _Elem(kind, offset, order, staff=staff, value=value)
+            elem.seq = next(self._seq)
+            if staff:
+                part.staff_keys.add(staff)
+            state.elems.append(elem)
+
+        for dir_type in mx.iterfind("direction-type"):
+            for sub in dir_type:
+                match sub.tag:
+                    case "dynamics":
+                        # music21 keeps other-dynamics' tag, not its text
+                        for dyn in sub:
+                            add(_DYNAMIC, _ORDER_DYNAMIC, dyn.tag)
+                    case "wedge" | "bracket" | "dashes" | "octave-shift":
+                        self._read_direction_spanner(state, sub)
+                    case "metronome":
+                        if (tempo := _tempo(sub)) is not None:
+                            add(_TEMPO, _ORDER_TEMPO, tempo)
+                    case "rehearsal":
+                        add(_REHEARSAL, _ORDER_TEXT, _text(sub) or "")
+                    case "words":
+                        words = _text(sub) or ""
+                        if not _is_repeat_expression(words):
+                            add(_TEXT, _ORDER_TEXT, words)
+
+    ###########################################################################
+
+    def _read_direction_spanner(
+        self, state: _MeasureState, mx: ET.Element
+    ) -> None:
+        # Wedges, brackets, and octave shifts start on the next note and stop
+        # on the last one
+        number = mx.get("number")
+        mx_type = mx.get("type")
+
+        match mx.tag, mx_type:
+            case "wedge", "crescendo" | "diminuendo":
+                spanner = _Spanner(_WEDGE, number, mx_type == "crescendo")
+                self._bundle.append(spanner)
+                self._pending.append(spanner)
+            case ("bracket" | "dashes"), "start":
+                spanner = _Spanner(_LINE, number)
+                self._bundle.append(spanner)
+                self._pending.append(spanner)
+            case "octave-shift", "up" | "down":
+                spanner = _Spanner(_OTTAVA, number)
+                self._bundle.append(spanner)
+                self._pending.append(spanner)
+            case "octave-shift", "continue":
+                if (found := self._incomplete(_OTTAVA, number)) is not None:
+                    self._pending.append(found)
+            case "wedge", "stop":
+                self._stop(state, self._incomplete(_WEDGE, number))
+            case ("bracket" | "dashes"), "stop":
+                self._stop(state, self._incomplete(_LINE, number))
+            case "octave-shift", "stop":
+                self._stop(state, self._incomplete(_OTTAVA, number))
+
+    ###########################################################################
+
+    def _read_forward(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> None:
+        # A forward is a hidden rest
+        if (text := _text(mx.find("duration"))) is None:
+            return
+
+        change = _fraction(text) / part.divisions
+        elem = _Elem(
+            _REST, state.offset, _ORDER_NOTE, staff=_staff(mx), length=change
+        )
+        elem.type, elem.dots, elem.tuplet = _raw_duration(change)
+        self._add(part, state, elem, self._voice(state, mx.findtext("voice")))
+
+        state.offset += change
+        state.forward = elem
+
+    ###########################################################################
+
+    def _read_notations(self, mx: ET.Element, elem: _Elem) -> None:
+        for slur in mx.iterfind("slur"):
+            number = slur.get("number")
+            spanner = self._incomplete(_SLUR, number)
+            if spanner is None:
+                spanner = _Spanner(_SLUR, number)
+                self._bundle.append(spanner)
+            spanner.add(elem)
+            if slur.get("type") == "stop":
+                spanner.complete = True
+
+    ###########################################################################
+
+    def _read_note(
+        self,
+        part: _PartState,
+        state: _MeasureState,
+        mx: ET.Element,
+        nxt: ET.Element | None,
+    ) -> None:
+        # See music21's MeasureParser.xmlToNote
+        next_chord = (
+            nxt is not None
+            and nxt.tag == "note"
+            and nxt.find("chord") is not None
+        )
+        is_chord = next_chord or mx.find("chord") is not None
+        if next_chord and (mx_voice := mx.find("voice")) is not None:
+            state.last_voice = (mx_voice.text or "").strip()
+
+        increment = Fraction(0)
+        if is_chord:
+            state.chord.append(mx)
+        else:
+            if mx.find("rest") is not None:
+                state.rests += 1
+                elem = self._rest(part, state, mx)
+            else:
+                state.notes += 1
+                elem = self._note(part, state, mx)
+            voice = self._voice(state, mx.findtext("voice"))
+            self._add(part, state, elem, voice)
+            increment = elem.length
+            state.last_note = elem
+
+        if state.chord and not next_chord:
+            elem = self._chord(part, state, mx)
+            increment = elem.length
+            state.last_note = elem
+
+        state.offset += increment
+        state.forward = None
+
+    ###########################################################################
+
+    def _remove_forward_rest(self, part: _PartState) -> None:
+        # music21 drops a hidden rest closing the last measure
+        forward = part.last_forward
+        if forward is None or part.last_voices or not part.measures:
+            return
+
+        elems = part.measures[-1].elems
+        notes = [x for x in elems if x.kind in _GENERAL_NOTES]
+        if notes and max(notes, key=_Elem.key) is forward:
+            elems.remove(forward)
+
+    ###########################################################################
+
+    def _rest(
+        self, part: _PartState, state: _MeasureState, mx: ET.Element
+    ) -> _Elem:
+        elem = self._duration(
+            part, mx, _Elem(_REST, state.offset, _ORDER_NOTE, _staff(mx))
+        )
+        rest = mx.find("rest")
+        if rest is not None and rest.get("measure") == "yes":
+            state.full_measure = True
+            elem.full_measure = True
+
+        self._free_pending(elem)
+        for notations in mx.iterfind("notations"):
+            self._read_notations(notations, elem)
+        return elem
+
+    ###########################################################################
+
+    def _split(
+        self, part: _PartState, spanners: list[_Spanner]
+    ) -> list[_Part]:
+        # A part with several staves becomes one part per staff.  Elements
+        # for other staves are left out, spanners only go on the first staff,
+        # and voices only stay when there's more than one left.
+        staves = []
+        seen: set[int] = set()
+        for index, staff in enumerate(sorted(part.staff_keys)):
+            measures = []
+            for measure in part.measures:
+                elems = []
+                voices = []
+                for elem in measure.elems:
+                    if elem.kind == _VOICE:
+                        children = [
+                            self._copy(x, seen)
+                            for x in elem.children
+                            if x.staff in (0, staff)
+                        ]
+                        voices.append((elem, children))
+                    elif elem.kind not in _STAFF_SPECIFIC:
+                        elems.append(self._copy(elem, seen, force=index > 0))
+                    elif elem.staff in (0, staff):
+                        elems.append(self._copy(elem, seen))
+
+                voices = [x for x in voices if x[1]]
+                if len(voices) == 1:
+                    for child in voices[0][1]:
+                        child.seq = next(self._seq)
+                        elems.append(child)
+                else:
+                    for voice, children in voices:
+                        copy = self._copy(voice, seen, force=True)
+                        copy.children = children
+                        elems.append(copy)
+
+                copy_measure = _Measure(measure.number, elems)
+                copy_measure.instruments = measure.instruments
+                measures.append(copy_measure)
+
+            staves.append(
+                _Part(part.name, measures, spanners if index == 0 else [])
+            )
+
+        return staves
+
+    ###########################################################################
+
+    def _stop(self, state: _MeasureState, spanner: _Spanner | None) -> None:
+        # Stops end on the last note read in this measure, if there is one
+        if spanner is not None:
+            spanner.complete = True
+            spanner.add(state.last_note)
+
+    ###########################################################################
+
+    @staticmethod
+    def _voice(state: _MeasureState, text: str | None) -> str:
+        # The voice an element goes in, falling back on the last one given
+        voice = (text or "").strip()
+        if voice:
+            state.last_voice = voice
+        else:
+            voice = state.last_voice or "1"
+        return voice
+
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _bar_length(mx: ET.Element) -> Fraction | None:
+    beats = [x.text or "" for x in mx.iterfind("beats")]
+    beat_types = [x.text or "" for x in mx.iterfind("beat-type")]
+    if not beats or not beat_types:
+        return None
+
+    try:
+        return sum(
+            (
+                sum(Fraction(y) for y in x.split("+")) * 4 / Fraction(z)
+                for x, z in zip(beats, beat_types)
+            ),
+            Fraction(0),
+        )
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+###############################################################################
+
+
+def _clean(text: str | None) -> str | None:
+    if text is None:
+        return None
+    return text.strip().replace("\n", " ")
+
+
+###############################################################################
+
+
+def _convert_part(
+    part: _Part, sections: dict[int, RehearsalMark], part_no: int
+) -> list[Token]:
+    # Make a part's tokens, as _parse_part does with a music21 part
+    slur_starts = set()
+    slur_stops = set()
+    cresc_starts: dict[int, bool] = {}
+    cresc_stops: dict[int, bool] = {}
+    line_starts: dict[int, int] = {}
+    line_stops: dict[int, int] = {}
+
+    lines = 0
+    for spanner in part.spanners:
+        if not spanner.elems:
+            continue
+        first = id(spanner.elems[0])
+        last = id(spanner.elems[-1])
+        match spanner.kind:
+            case "slur":
+                slur_starts.add(first)
+                slur_stops.add(last)
+            case "wedge":
+                cresc_starts.setdefault(first, spanner.cresc)
+                cresc_stops.setdefault(last, spanner.cresc)
+            case "line":
+                line_starts.setdefault(first, lines)
+                line_stops.setdefault(last, lines)
+                lines += 1
+
+    tokens: list[Token] = []
+    loop_base = (part_no + 1) * 100
+    triplets = False
+
+    name = part.name.replace("♭", "b").replace(" ", "")
+
+    for measure in part.measures:
+        for semitones in measure.instruments:
+            tokens.append(Instrument(name, semitones % 12))
+
+        measure_num = measure.number
+        note_no = 0
+        tokens.append(Measure(measure_num))
+        if measure_num in sections:
+            tokens.append(sections[measure_num])
+
+        for elem in _sorted(measure.elems):
+            elem_id = id(elem)
+            if (line := line_starts.get(elem_id)) is not None:
+                tokens.append(LoopDelim(True, loop_base + line))
+
+            kind = elem.kind
+            if kind == _CHORD:
+                msg = f"Chord found, #{note_no + 1} in measure {measure_num}"
+                tokens.append(Error(msg))
+            elif kind == _VOICE:
+                tokens.append(
+                    Error(f"Multiple voices in measure {measure_num}")
+                )
+
+            if kind in _GENERAL_NOTES:
+                note_no += 1
+                if not triplets and elem.tuplet:
+                    tokens.append(Triplet(True))
+                    triplets = True
+                if triplets and not elem.tuplet:
+                    tokens.append(Triplet(False))
+                    triplets = False
+
+            match kind:
+                case "dynamic":
+                    dyn = str(elem.value).lower()
+                    try:
+                        tokens.append(Dynamic(Dynamics(dyn)))
+                    except ValueError:
+                        msg = f"Invalid dynamic level {dyn} "
+                        msg += f"in measure {measure_num}"
+                        tokens.append(Error(msg))
+                case "note":
+                    if elem_id in slur_starts:
+                        tokens.append(Slur(True))
+                    if elem_id in slur_stops:
+                        tokens.append(Slur(False))
+                    if (cresc := cresc_starts.get(elem_id)) is not None:
+                        tokens.append(CrescDelim(True, cresc))
+
+                    note = _make_note(elem)
+                    note.measure_num = measure_num
+                    note.note_num = note_no
+                    tokens.append(note)
+
+                    if (cresc := cresc_stops.get(elem_id)) is not None:
+                        tokens.append(CrescDelim(False, cresc))
+                case "repeat":
+                    tokens.append(Repeat(bool(elem.value)))
+                case "rest":
+                    rest = Rest(_AMK_LENGTHS.get(elem.type, 0), elem.dots)
+                    rest.measure_num = measure_num
+                    rest.note_num = note_no
+                    tokens.append(rest)
+                case "text":
+                    tokens.append(Annotation(str(elem.value)))
+                case "tempo":
+                    tokens.append(Tempo(elem.value))  # type: ignore[arg-type]
+                case "clef":
+                    tokens.append(Clef(bool(elem.value)))
+
+            if (line := line_stops.get(elem_id)) is not None:
+                tokens.append(LoopDelim(False, loop_base + line))
+
+    if triplets:
+        tokens.append(Triplet(False))
+
+    return tokens
+
+
+###############################################################################
+
+
+def _find_rehearsal_marks(parts: list[_Part]) -> dict[int, RehearsalMark]:
+    # Only each part's first measure is searched, as in song.py
+    marks = {}
+    for part in parts:
+        for measure in part.measures[:1]:
+            for elem in _sorted(measure.elems):
+                if elem.kind == _REHEARSAL:
+                    marks[measure.number] = RehearsalMark(str(elem.value))
+    return marks
+
+
+###############################################################################
+
+
+def _fraction(text: str | None) -> Fraction:
+    try:
+        return Fraction((text or "").strip())
+    except ValueError as e:
+        raise SongException(f"Invalid number {text!r}") from e
+
+
+###############################################################################
+
+
+def _highest_time(elems: list[_Elem]) -> Fraction:
+    return max((x.end() for x in elems if not x.at_end), default=Fraction(0))
+
+
+###############################################################################
+
+
+def _int(text: str | None) -> int | None:
+    try:
+        return int((text or "").strip())
+    except ValueError:
+        return None
+
+
+###############################################################################
+
+
+@cache
+def _is_repeat_expression(text: str) -> bool:
+    # music21 turns words like "D.C. al Fine" into repeat expressions, which
+    # aren't text
+    return any(
+        x.isValidText(text) for x in m21.repeat.repeatExpressionReference
+    )
+
+
+###############################################################################
+
+
+def _make_note(elem: _Elem) -> Note:
+    pitch, head, tie, articulation = cast(
+        tuple[m21.pitch.Pitch, str, str, Artic], elem.value
+    )
+    return Note(
+        pitch,
+        _AMK_LENGTHS.get(elem.type, 0),
+        head,
+        elem.dots,
+        tie,
+        elem.grace,
+        articulation,
+    )
+
+
+###############################################################################
+
+
+def _metadata(root: ET.Element) -> dict[str, str]:
+    # As music21's Metadata reports it
+    def text(path: str) -> str | None:
+        value = root.findtext(path)
+        return value or None
+
+    title = text("work/work-title")
+    if title == text("movement-title"):
+        title = None
+    if title is not None:
+        title = m21.metadata.Text(title).getNormalizedArticle()
+
+    creators: dict[str, list[str]] = {}
+    for creator in root.iterfind("identification/creator"):
+        role = creator.get("type")
+        if role is not None:
+            name = (creator.text or "").strip()
+            creators.setdefault(role, []).append(name)
+
+    def names(role: str) -> str:
+        values = creators.get(role, [])
+        if len(values) > 2:
+            return f"{values[0]} and {len(values) - 1} others"
+        return " and ".join(values)
+
+    rights = root.find("identification/rights")
+    game = ""
+    if rights is not None and rights.text is not None:
+        game = rights.text.strip()
+
+    return {
+        "composer": names("composer"),
+        "title": title or "",
+        "porter": names("lyricist"),
+        "game": game,
+    }
+
+
+###############################################################################
+
+
+def _open(fname: Path) -> IO[bytes]:
+    # The score file, or the score in a compressed MusicXML file
+    try:
+        zobj = ZipFile(fname)
+    except BadZipFile:
+        return open(fname, "rb")
+
+    with zobj:
+        names = zobj.namelist()
+        root = None
+        if "META-INF/container.xml" in names:
+            container = ET.fromstring(  # nosec B314
+                zobj.read("META-INF/container.xml")
+            )
+            if (rootfile := container.find(".//rootfile")) is not None:
+                root = rootfile.get("full-path")
+        if root is None:
+            candidates = [
+                x
+                for x in names
+                if not x.startswith("META-INF")
+                and PurePosixPath(x).suffix in (".xml", ".musicxml")
+            ]
+            if not candidates:
+                raise SongException(f"No score found in {fname}")
+            root = candidates[0]
+        return zobj.open(root)
+
+
+###############################################################################
+
+
+def _pitch(mx: ET.Element) -> m21.pitch.Pitch:
+    # See music21's MeasureParser.xmlToPitch
+    pitch = m21.pitch.Pitch()
+    if (mx_pitch := mx.find("pitch")) is None:
+        return pitch
+
+    if (step := _step(mx_pitch.find("step"))) is not None:
+        pitch.step = step
+    if (octave := _int(mx_pitch.findtext("octave"))) is not None:
+        pitch.octave = octave
+
+    alter = None
+    if (text := _text(mx_pitch.find("alter"))) is not None:
+        alter = float(text)
+
+    if (name := _text(mx.find("accidental"))) is not None:
+        name = name.lower()
+        try:
+            accidental = m21.pitch.Accidental()
+            accidental.set(
+                _ACCIDENTALS.get(name, name), allowNonStandardValue=True
+            )
+            pitch.accidental = accidental
+            accidental.displayStatus = True
+            if alter is not None and alter != accidental.alter:
+                accidental.setAttributeIndependently("alter", alter)
+        except m21.pitch.AccidentalException:
+            pass
+    elif alter is not None:
+        try:
+            pitch.accidental = m21.pitch.Accidental(alter)
+        except m21.pitch.AccidentalException as e:
+            raise SongException(f"Invalid accidental {alter}") from e
+        pitch.accidental.displayStatus = False
+
+    return pitch
+
+
+###############################################################################
+
+
+@cache
+def _raw_duration(length: Fraction) -> tuple[str, int, bool]:
+    # Type, dots, and whether there's a tuplet for a bare length, as music21
+    # derives them.  music21 has no dots for some lengths.
+    dur = m21.duration.Duration(quarterLength=length)
+    return dur.type, dur.dots or 0, bool(dur.tuplets)
+
+
+###############################################################################
+
+
+def _semitones(transposition: tuple[int | None, int | None, int]) -> int:
+    _, chromatic, octave = transposition
+    if chromatic is None:
+        return 0
+    return chromatic + 12 * octave
+
+
+###############################################################################
+
+
+def _sorted(elems: list[_Elem]) -> list[_Elem]:
+    return sorted(elems, key=_Elem.key)
+
+
+###############################################################################
+
+
+def _staff(mx: ET.Element) -> int:
+    if mx.tag in _NUMBERED:
+        text = mx.get("number")
+    else:
+        text = mx.findtext("staff")
+    try:
+        return int((text or "").strip())
+    except ValueError:
+        return 0
+
+
+###############################################################################
+
+
+def _step(mx: ET.Element | None) -> StepName | None:
+    # A pitch's step, or None if it's missing or not a step
+    text = _text(mx)
+    if text is None:
+        return None
+    return _STEPS.get(text.upper())
+
+
+###############################################################################
+
+
+def _tempo(mx: ET.Element) -> int | None:
+    # Quarter notes per minute, or None if it's not a plain metronome mark
+    units: list[str] = []
+    dots: list[int] = []
+    numbers = []
+    for sub in mx:
+        if sub.tag == "beat-unit":
+            units.append((sub.text or "").strip())
+            dots.append(0)
+        elif sub.tag == "beat-unit-dot" and units:
+            dots[-1] += 1
+        elif sub.tag == "per-minute":
+            try:
+                numbers.append(float((sub.text or "").strip()))
+            except ValueError:
+                pass
+
+    if len(units) > 1 or not numbers:
+        return None
+
+    referent = Fraction(1)
+    if units:
+        if units[0] not in _TYPE_LENGTHS:
+            return None
+        referent = _TYPE_LENGTHS[units[0]] * (2 - Fraction(1, 2 ** dots[0]))
+
+    return int(numbers[0] * referent)
+
+
+###############################################################################
+
+
+def _text(mx: ET.Element | None) -> str | None:
+    # An element's stripped text, or None if it's missing or blank
+    if mx is None or mx.text is None or not mx.text.strip():
+        return None
+    return mx.text.strip()
+
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def read_music_xml(
+    fname: Path,
+) -> tuple[list[list[Token]], dict[str, str]]:
+    """
+    Read a MusicXML file's tokens without building a music21 score
+
+    Parameters
+    ----------
+    fname : Path
+        The (compressed or uncompressed) MusicXML file
+
+    Returns
+    -------
+    tuple
+        Each part's tokens, and the song's metadata (as keyword arguments to
+        `Song`)
+
+    Raises
+    ------
+    SongException:
+        Whenever a conversion is not possible
+    """
+    reader = _Reader()
+    root = None
+    part_elem = None
+    part = None
+
+    try:
+        with _open(fname) as fobj:
+            events = ET.iterparse(fobj, ("start", "end"))  # nosec B314
+            for event, elem in events:
+                if root is None:
+                    root = elem
+                    if root.tag != "score-partwise":
+                        raise SongException(
+                            f"Can only operate on partwise scores, "
+                            f"not {root.tag}"
+                        )
+
+                if event == "start":
+                    if elem.tag == "part" and part is None:
+                        part_elem = elem
+                        part = reader.start_part(elem)
+                    continue
+
+                match elem.tag:
+                    case "part-list":
+                        reader.read_part_list(elem)
+                    case "measure" if part is not None:
+                        reader.read_measure(part, elem)
+                        # Measures are done with once they're read
+                        if part_elem is not None:
+                            part_elem.remove(elem)
+                    case "part" if part is not None:
+                        reader.end_part(part)
+                        root.remove(elem)
+                        part = None
+                        part_elem = None
+    except (OSError, KeyError, BadZipFile, ET.ParseError) as e:
+        raise SongException(str(e)) from e
+
+    if root is None:
+        raise SongException(f"No score in {fname}")
+
+    sections = _find_rehearsal_marks(reader.parts)
+    channels = [
+        remove_unused_instruments(_convert_part(x, sections, n))
+        for n, x in enumerate(reader.parts)
+    ]
+
+    return channels, _metadata(root)
@@ -10,8 +10,14 @@
 ###############################################################################
 
 # Standard library imports
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from functools import cached_property
+from itertools import repeat
 from pathlib import Path
+from typing import Any, Callable
 
 # Library imports
 import music21 as m21
@@ -20,6 +26,7 @@ import music21 as m21
 from smw_music.utils import filter_type
 
 from .common import Dynamics
+from .musicxml import read_music_xml
 from .reduction import remove_unused_instruments
 from .tokens import (
     Annotation,
@@ -43,22 +50,97 @@ from .tokens import (
     Triplet,
 )
 
+###############################################################################
+# Private class definitions
+###############################################################################
+
+
+@dataclass
+class _PartState:
+    # Conversion state for one part, shared by the element handlers
+    slur_starts: set[int]
+    slur_stops: set[int]
+    cresc_starts: dict[int, bool]
+    cresc_stops: dict[int, bool]
+    tokens: list[Token] = field(default_factory=list)
+    measure_num: int = 0
+    note_no: int = 0
+    triplets: bool = False
+
+
 ###############################################################################
 # Private function definitions
 ###############################################################################
 
 
-def _extract_channels(stream: m21.stream.base.Score) -> list[list[Token]]:
-    parts: list[list[Token]] = []
+def _convert_forked_part(
+    part_no: int, sections: dict[int, RehearsalMark]
+) -> list[Token]:
+    # Runs in a worker process forked with the score already parsed
+    if _forked_score is None:
+        raise SongException("No score was forked with this worker")
+    parts = filter_type(m21.stream.Part, _forked_score[:])
+    return _convert_part(parts[part_no], sections, part_no)
+
+
+###############################################################################
+
+
+def _convert_part(
+    part: m21.stream.Part, sections: dict[int, RehearsalMark], part_no: int
+) -> list[Token]:
+    return remove_unused_instruments(_parse_part(part, sections, part_no))
+
 
+###############################################################################
+
+
+def _extract_channels(
+    stream: m21.stream.base.Score, workers: int = 1
+) -> list[list[Token]]:
     sections = _find_rehearsal_marks(stream)
+    parts = filter_type(m21.stream.Part, stream[:])
+
+    # Parts are independent once the rehearsal marks are known.  Sending
+    # music21 objects to other processes costs more than converting them,
+    # so workers are forked with the score and only send tokens back.
+    # Forking a process with other threads running isn't safe, so parts are
+    # converted here if there are any (in the dashboard, for instance).
+    if (
+        workers > 1
+        and len(parts) > 1
+        and "fork" in multiprocessing.get_all_start_methods()
+        and threading.active_count() == 1
+    ):
+        workers = min(workers, len(parts))
+        return _extract_forked(stream, sections, len(parts), workers)
+
+    return [_convert_part(x, sections, n) for n, x in enumerate(parts)]
 
-    for elem in filter_type(m21.stream.Part, stream[:]):
-        part = _parse_part(elem, sections, len(parts))
-        part = remove_unused_instruments(part)
-        parts.append(part)
 
-    return parts
+###############################################################################
+
+
+def _extract_forked(
+    stream: m21.stream.base.Score,
+    sections: dict[int, RehearsalMark],
+    nparts: int,
+    workers: int,
+) -> list[list[Token]]:
+    global _forked_score
+
+    context = multiprocessing.get_context("fork")
+
+    _forked_score = stream
+    try:
+        with ProcessPoolExecutor(workers, context) as executor:
+            return list(
+                executor.map(
+                    _convert_forked_part, range(nparts), repeat(sections)
+                )
+            )
+    finally:
+        _forked_score = None
 
 
 ###############################################################################
@@ -97,42 +179,176 @@ def _find_rehearsal_marks(
 
 def _get_cresc(
     part: m21.stream.Part,
-) -> tuple[list[list[int]], list[bool]]:
-    cresc: list[list[int]] = [[], []]
+) -> tuple[dict[int, bool], dict[int, bool]]:
+    # Maps the IDs of each hairpin's first and last notes to whether it's a
+    # crescendo.  The first hairpin wins when several share a note.
+    starts: dict[int, bool] = {}
+    stops: dict[int, bool] = {}
+
     # DynamicWedge is a parent class for Crescendo and Diminuendo, which is
     # what we want to pull out of the token list
-    cresc_list = filter_type(m21.dynamics.DynamicWedge, part[:])
+    for cresc in filter_type(m21.dynamics.DynamicWedge, part[:]):
+        cresc_type = isinstance(cresc, m21.dynamics.Crescendo)
+        starts.setdefault(cresc.getFirst().id, cresc_type)
+        stops.setdefault(cresc.getLast().id, cresc_type)
 
-    cresc[0] = [x.getFirst().id for x in cresc_list]
-    cresc[1] = [x.getLast().id for x in cresc_list]
-    cresc_type = [isinstance(x, m21.dynamics.Crescendo) for x in cresc_list]
-
-    return (cresc, cresc_type)
+    return starts, stops
 
 
 ###############################################################################
 
 
-def _get_lines(part: m21.stream.Part) -> list[list[int]]:
-    lines: list[list[int]] = [[], []]
+def _get_lines(part: m21.stream.Part) -> tuple[dict[int, int], dict[int, int]]:
+    # Maps the IDs of each line's first and last elements to the line's
+    # index.  The first line wins when several share an element.
+    starts: dict[int, int] = {}
+    stops: dict[int, int] = {}
+
     line_list = [x for x in part if isinstance(x, m21.spanner.Line)]
-    lines[0] = [x.getFirst().id for x in line_list]
-    lines[1] = [x.getLast().id for x in line_list]
+    for n, line in enumerate(line_list):
+        starts.setdefault(line.getFirst().id, n)
+        stops.setdefault(line.getLast().id, n)
 
-    return lines
+    return starts, stops
 
 
 ###############################################################################
 
 
-def _get_slurs(part: m21.stream.Part) -> list[list[int]]:
-    slurs: list[list[int]] = [[], []]
+def _get_slurs(part: m21.stream.Part) -> tuple[set[int], set[int]]:
+    # IDs of slurs' first and last notes
     slur_list = filter_type(m21.spanner.Slur, part[:])
 
-    slurs[0] = [x.getFirst().id for x in slur_list]
-    slurs[1] = [x.getLast().id for x in slur_list]
+    starts = {x.getFirst().id for x in slur_list}
+    stops = {x.getLast().id for x in slur_list}
+
+    return starts, stops
+
+
+###############################################################################
+
 
-    return slurs
+def _handlers(
+    cls: type[m21.base.Music21Object],
+) -> tuple[Callable[[_PartState, Any], None], ...]:
+    # Handlers for an element type, in dispatch table order
+    try:
+        return _type_handlers[cls]
+    except KeyError:
+        rv = tuple(hdlr for types, hdlr in _HANDLERS if issubclass(cls, types))
+        _type_handlers[cls] = rv
+        return rv
+
+
+###############################################################################
+
+
+def _on_chord(state: _PartState, elem: m21.chord.Chord) -> None:
+    msg = f"Chord found, #{state.note_no + 1} "
+    msg += f"in measure {state.measure_num}"
+    state.tokens.append(Error(msg))
+
+
+###############################################################################
+
+
+def _on_clef(state: _PartState, elem: m21.clef.Clef) -> None:
+    state.tokens.append(Clef.from_music_xml(elem))
+
+
+###############################################################################
+
+
+def _on_dynamic(state: _PartState, elem: m21.dynamics.Dynamic) -> None:
+    try:
+        state.tokens.append(Dynamic.from_music_xml(elem))
+    except SongException as e:
+        msg = f"{e} in measure {state.measure_num}"
+        state.tokens.append(Error(msg))
+
+
+###############################################################################
+
+
+def _on_general_note(state: _PartState, elem: m21.note.GeneralNote) -> None:
+    state.note_no += 1
+    if not state.triplets and bool(elem.duration.tuplets):
+        state.tokens.append(Triplet(True))
+        state.triplets = True
+
+    if state.triplets and not bool(elem.duration.tuplets):
+        state.tokens.append(Triplet(False))
+        state.triplets = False
+
+
+###############################################################################
+
+
+def _on_note(
+    state: _PartState, elem: m21.note.Note | m21.note.Unpitched
+) -> None:
+    note = Note.from_music_xml(elem)
+
+    elem_id = elem.id
+    if not isinstance(elem_id, int):
+        raise SongException(f"Non-integer element ID {elem_id}")
+
+    if elem_id in state.slur_starts:
+        state.tokens.append(Slur(True))
+    # It seems weird to put slur-ends before the actual last slur note.  But
+    # the note that comes at the slur-end needs to know it so the legato can
+    # be put in the right place.
+    if elem_id in state.slur_stops:
+        state.tokens.append(Slur(False))
+
+    if (cresc := state.cresc_starts.get(elem_id)) is not None:
+        state.tokens.append(CrescDelim(True, cresc))
+
+    note.measure_num = state.measure_num
+    note.note_num = state.note_no
+    state.tokens.append(note)
+
+    if (cresc := state.cresc_stops.get(elem_id)) is not None:
+        state.tokens.append(CrescDelim(False, cresc))
+
+
+###############################################################################
+
+
+def _on_repeat(state: _PartState, elem: m21.bar.Repeat) -> None:
+    state.tokens.append(Repeat.from_music_xml(elem))
+
+
+###############################################################################
+
+
+def _on_rest(state: _PartState, elem: m21.note.Rest) -> None:
+    rest = Rest.from_music_xml(elem)
+    rest.measure_num = state.measure_num
+    rest.note_num = state.note_no
+    state.tokens.append(rest)
+
+
+###############################################################################
+
+
+def _on_tempo(state: _PartState, elem: m21.tempo.MetronomeMark) -> None:
+    state.tokens.append(Tempo.from_music_xml(elem))
+
+
+###############################################################################
+
+
+def _on_text(state: _PartState, elem: m21.expressions.TextExpression) -> None:
+    state.tokens.append(Annotation.from_music_xml(elem))
+
+
+###############################################################################
+
+
+def _on_voice(state: _PartState, elem: m21.stream.Voice) -> None:
+    msg = f"Multiple voices in measure {state.measure_num}"
+    state.tokens.append(Error(msg))
 
 
 ###############################################################################
@@ -143,14 +359,20 @@ def _parse_part(
     sections: dict[int, RehearsalMark],
     part_no: int,
 ) -> list[Token]:
-    channel_elem: list[Token] = []
+    slur_starts, slur_stops = _get_slurs(part)
+    line_starts, line_stops = _get_lines(part)
+    cresc_starts, cresc_stops = _get_cresc(part)
 
-    slurs = _get_slurs(part)
-    lines = _get_lines(part)
-    loop_nos = list((part_no + 1) * 100 + n for n in range(len(lines[0])))
-    cresc, cresc_type = _get_cresc(part)
+    state = _PartState(
+        slur_starts=slur_starts,
+        slur_stops=slur_stops,
+        cresc_starts=cresc_starts,
+        cresc_stops=cresc_stops,
+    )
+    channel_elem = state.tokens
+
+    loop_base = (part_no + 1) * 100
 
-    triplets = False
     for subpart in part:
         if isinstance(subpart, m21.instrument.Instrument):
             # This used to be .instrumentName, but that behaves...
@@ -173,107 +395,60 @@ def _parse_part(
             continue
 
         measure = subpart
-        note_no = 0
+        state.measure_num = measure.number
+        state.note_no = 0
         channel_elem.append(Measure(measure.number))
         if measure.number in sections:
             channel_elem.append(sections[measure.number])
 
         for subelem in measure:
-            if subelem.id in lines[0]:
-                channel_elem.append(
-                    LoopDelim(True, loop_nos[lines[0].index(subelem.id)])
-                )
+            subelem_id = subelem.id
+            if (line := line_starts.get(subelem_id)) is not None:
+                channel_elem.append(LoopDelim(True, loop_base + line))
 
-            if isinstance(
-                subelem,
-                (m21.chord.Chord, m21.percussion.PercussionChord),
-            ):
-                msg = f"Chord found, #{note_no + 1} "
-                msg += f"in measure {measure.number}"
-                channel_elem.append(Error(msg))
-
-            if isinstance(subelem, (m21.stream.Voice)):
-                msg = f"Multiple voices in measure {measure.number}"
-                channel_elem.append(Error(msg))
-
-            if isinstance(subelem, m21.note.GeneralNote):
-                note_no += 1
-                if not triplets and bool(subelem.duration.tuplets):
-                    channel_elem.append(Triplet(True))
-                    triplets = True
-
-                if triplets and not bool(subelem.duration.tuplets):
-                    channel_elem.append(Triplet(False))
-                    triplets = False
-
-            if isinstance(subelem, m21.dynamics.Dynamic):
-                try:
-                    channel_elem.append(Dynamic.from_music_xml(subelem))
-                except SongException as e:
-                    msg = f"{e} in measure {measure.number}"
-                    channel_elem.append(Error(msg))
-            if isinstance(subelem, (m21.note.Note, m21.note.Unpitched)):
-                note = Note.from_music_xml(subelem)
-                if subelem.id in slurs[0]:
-                    channel_elem.append(Slur(True))
-                # It seems weird to put slur-ends before the actual last
-                # slur note.  But the note that comes at the slur-end needs
-                # to know it so the legato can be put in the right place.
-                if subelem.id in slurs[1]:
-                    channel_elem.append(Slur(False))
-
-                # Gross, fix this
-                subelem_id = subelem.id
-                if not isinstance(subelem_id, int):
-                    raise SongException(f"Non-integer element ID {subelem_id}")
-
-                if subelem_id in cresc[0]:
-                    channel_elem.append(
-                        CrescDelim(
-                            True, cresc_type[cresc[0].index(subelem_id)]
-                        )
-                    )
-
-                note.measure_num = measure.number
-                note.note_num = note_no
-                channel_elem.append(note)
-
-                # Also gross, fix this
-                subelem_id = subelem.id
-                if not isinstance(subelem_id, int):
-                    raise SongException(f"Non-integer element ID {subelem_id}")
-
-                if subelem_id in cresc[1]:
-                    channel_elem.append(
-                        CrescDelim(
-                            False, cresc_type[cresc[1].index(subelem_id)]
-                        )
-                    )
-
-            if isinstance(subelem, m21.bar.Repeat):
-                channel_elem.append(Repeat.from_music_xml(subelem))
-            if isinstance(subelem, m21.note.Rest):
-                rest = Rest.from_music_xml(subelem)
-                rest.measure_num = measure.number
-                rest.note_num = note_no
-                channel_elem.append(rest)
-            if isinstance(subelem, m21.expressions.TextExpression):
-                channel_elem.append(Annotation.from_music_xml(subelem))
-            if isinstance(subelem, m21.tempo.MetronomeMark):
-                channel_elem.append(Tempo.from_music_xml(subelem))
-            if isinstance(subelem, m21.clef.Clef):
-                channel_elem.append(Clef.from_music_xml(subelem))
-
-            if subelem.id in lines[1]:
-                channel_elem.append(
-                    LoopDelim(False, loop_nos[lines[1].index(subelem.id)])
-                )
-    if triplets:
+            for hdlr in _handlers(type(subelem)):
+                hdlr(state, subelem)
+
+            if (line := line_stops.get(subelem_id)) is not None:
+                channel_elem.append(LoopDelim(False, loop_base + line))
+
+    if state.triplets:
         channel_elem.append(Triplet(False))
 
     return channel_elem
 
 
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Element handlers, in the order they're applied.  An element is passed to
+# every handler whose types it's an instance of.
+_HANDLERS: list[
+    tuple[type | tuple[type, ...], Callable[[_PartState, Any], None]]
+] = [
+    ((m21.chord.Chord, m21.percussion.PercussionChord), _on_chord),
+    (m21.stream.Voice, _on_voice),
+    (m21.note.GeneralNote, _on_general_note),
+    (m21.dynamics.Dynamic, _on_dynamic),
+    ((m21.note.Note, m21.note.Unpitched), _on_note),
+    (m21.bar.Repeat, _on_repeat),
+    (m21.note.Rest, _on_rest),
+    (m21.expressions.TextExpression, _on_text),
+    (m21.tempo.MetronomeMark, _on_tempo),
+    (m21.clef.Clef, _on_clef),
+]
+
+###############################################################################
+# Private variable definitions
+###############################################################################
+
+# Score being converted by forked worker processes
+_forked_score: m21.stream.base.Score | None = None
+
+# Handlers for each element type seen so far, see _handlers
+_type_handlers: dict[type, tuple[Callable[[_PartState, Any], None], ...]] = {}
+
 ###############################################################################
 # API class definitions
 ###############################################################################
@@ -326,7 +501,9 @@ class Song:
     ###########################################################################
 
     @classmethod
-    def from_music_xml(cls, fname: Path) -> "Song":
+    def from_music_xml(
+        cls, fname: Path, workers: int = 1, streaming: bool = False
+    ) -> "Song":
         """
         Convert a MusicXML file to a Song.
 
@@ -334,6 +511,14 @@ class Song:
         ----------
         fname : str
             The (compressed or uncompressed) MusicXML file
+        workers : int
+            Number of worker processes to convert parts on.  Only used on
+            platforms that can fork, and only when this process has no other
+            threads running.  Otherwise parts are converted in this process.
+        streaming : bool
+            True to read the file directly instead of through music21 (see
+            `smw_music.song.musicxml`), which takes much less time and memory.
+            `workers` is ignored.
 
         Return
         ------
@@ -345,6 +530,10 @@ class Song:
         SongException:
             Whenever a conversion is not possible
         """
+        if streaming:
+            channels, metadata = read_music_xml(fname)
+            return cls(channels, **metadata)
+
         try:
             stream = m21.converter.parseFile(fname)
         except m21.converter.ConverterFileException as e:
@@ -356,7 +545,7 @@ class Song:
             )
 
         metadata = _extract_metadata(stream)
-        channels = _extract_channels(stream)
+        channels = _extract_channels(stream, workers)
 
         return cls(channels, **metadata)
 
@@ -10,9 +10,32 @@
 ###############################################################################
 
 from . import limits
-from .brr import BLOCK_SIZE, SAMPLES_PER_BLOCK, Brr, BrrException, extract_brrs
-from .echo import EchoConfig, echo_bytes
-from .nspc import calc_tune, midi_to_nspc, set_pitch
+from .brr import (
+    BLOCK_SIZE,
+    SAMPLES_PER_BLOCK,
+    Brr,
+    BrrException,
+    encode_wavs,
+    extract_brr_slots,
+    extract_brrs,
+)
+from .brr_library import DEFAULT_CACHE_SIZE, BrrLibrary
+from .echo import (
+    FIR_FILTERS,
+    EchoConfig,
+    apply_echo,
+    echo_bytes,
+    fir_response,
+)
+from .interpolation import Interpolation, resample
+from .mixer import NVOICES, MixerException, Note, mix, write_wav
+from .nspc import calc_tune, calc_tunes, midi_to_nspc, set_pitch, set_pitches
+from .pitch import (
+    PitchEstimate,
+    PitchMethod,
+    estimate_pitch,
+    magnitude_spectrum,
+)
 from .sample_player import SamplePlayer
 from .spc700 import (
     PITCH_REG_SCALE,
@@ -23,9 +46,12 @@ from .spc700 import (
     generate_decexp,
     generate_declin,
     generate_direct_gain,
+    generate_envelope,
     generate_incbent,
     generate_inclin,
 )
+from .spc_file import Id666, SpcException, SpcFile
+from .voice import Voice
 
 ###############################################################################
 # API declaration
@@ -37,12 +63,32 @@ __all__ = [
     "SAMPLES_PER_BLOCK",
     "Brr",
     "BrrException",
+    "encode_wavs",
+    "extract_brr_slots",
     "extract_brrs",
+    "DEFAULT_CACHE_SIZE",
+    "BrrLibrary",
+    "FIR_FILTERS",
     "EchoConfig",
+    "apply_echo",
     "echo_bytes",
+    "fir_response",
+    "Interpolation",
+    "resample",
+    "NVOICES",
+    "MixerException",
+    "Note",
+    "mix",
+    "write_wav",
     "calc_tune",
+    "calc_tunes",
     "midi_to_nspc",
     "set_pitch",
+    "set_pitches",
+    "PitchEstimate",
+    "PitchMethod",
+    "estimate_pitch",
+    "magnitude_spectrum",
     "SamplePlayer",
     "PITCH_REG_SCALE",
     "SAMPLE_FREQ",
@@ -52,6 +98,11 @@ __all__ = [
     "generate_decexp",
     "generate_declin",
     "generate_direct_gain",
+    "generate_envelope",
     "generate_incbent",
     "generate_inclin",
+    "Id666",
+    "SpcException",
+    "SpcFile",
+    "Voice",
 ]
@@ -8,10 +8,15 @@ Utilities for handling BRR files.
 
 Notes
 -----
-Decoding algorithm is documented in [1]_.
+Decoding algorithm is documented in [1]_.  The bit-exact behavior of the
+S-DSP's decoder (clamping, 15-bit wraparound, and the reserved shift ranges)
+is documented in [5]_.
 
 File loop headers are discussed in [2]_.
 
+Encoding is a per-block exhaustive search over every filter and (non-reserved)
+range, scored by squared error against the input after bit-exact decoding.
+
 .. [1] SNES Dev Manual Book 1 (Fixed ToC) : Nintendo : Free Download, Borrow,
        and Streaming : Internet Archive.
        https://archive.org/details/snes_manual1
@@ -21,6 +26,12 @@ File loop headers are discussed in [2]_.
 
 .. [3] scipy.signal.lfilter &#8212; SciPy v1.7.1 Manual.
        https://docs.scipy.org/doc/scipy/reference/generated/scipy.signal.lfilter.html
+
+.. [4] Prefix sum - Wikipedia.
+       https://en.wikipedia.org/wiki/Prefix_sum
+
+.. [5] Fullsnes - Nocash SNES Specs, "SNES APU DSP BRR Samples".
+       https://problemkaputt.de/fullsnes.htm#snesapudspbrrsamples
 """
 
 ###############################################################################
@@ -28,26 +39,35 @@ File loop headers are discussed in [2]_.
 ###############################################################################
 
 # Standard library imports
+import hashlib
 import math
 import wave
 from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import suppress
 from dataclasses import dataclass, field
-from functools import cached_property
+from functools import cache, cached_property
 from pathlib import Path
-from struct import iter_unpack
 from typing import List
 
 # Library imports
 import numpy as np
 import numpy.typing as npt
-from scipy.signal import find_peaks, lfilter, lfiltic  # type: ignore
 
 # Package imports
 from smw_music.common import SmwMusicException
 
+from .interpolation import Interpolation
 from .nspc import calc_tune
-from .spc700 import PITCH_REG_SCALE, SAMPLE_FREQ, Envelope
+from .pitch import (
+    PitchEstimate,
+    PitchMethod,
+    estimate_pitch,
+    magnitude_spectrum,
+)
+from .spc700 import SAMPLE_FREQ, Envelope
+from .spc_file import SpcException, SpcFile
+from .voice import Voice
 
 ###############################################################################
 # API constant definitions
@@ -61,6 +81,9 @@ SAMPLES_PER_BLOCK = 16
 # Private constant definitions
 ###############################################################################
 
+# Ranges 13-15 are reserved and never produced by the encoder
+_ENCODER_RANGES = np.arange(13)
+
 # Filter coefficients documented in [1].  Coefficient signs (and leading 1s)
 # are required as documented in [3].
 _FILTERS = {
@@ -70,6 +93,22 @@ _FILTERS = {
     3: np.array([1, -1.7968750, 0.8125]),
 }
 
+# Integer filters documented in [5], as (a, b, c, d, e) for
+# a * old + ((b * old) >> c) + d * older + ((e * older) >> 4)
+_EXACT_FILTERS = np.array(
+    [
+        [0, 0, 0, 0, 0],
+        [1, -1, 4, 0, 0],
+        [2, -3, 5, -1, 1],
+        [2, -13, 6, -1, 3],
+    ],
+    dtype=np.int32,
+)
+
+# Cost of one side-by-side step of the exact decoder (one block from every
+# chain), relative to decoding one block sequentially
+_LOCKSTEP_COST = 24
+
 ###############################################################################
 # Private function definitions
 ###############################################################################
@@ -82,6 +121,247 @@ def _block_loops(block: Sequence[int]) -> bool:
 ###############################################################################
 
 
+def _decode(
+    filters: npt.NDArray[np.uint8],
+    ranges: npt.NDArray[np.uint8],
+    samples: npt.NDArray[np.int8],
+) -> npt.NDArray[np.double]:
+    # Each block is a linear system driven by its own samples and by the last
+    # two outputs of the block before it.  The forced part of every block's
+    # response is independent of its neighbors, so compute it all at once.
+    zs_resp, zi_resp = _response_tables()
+    inputs = samples * np.exp2(ranges, dtype=np.double)[:, np.newaxis]
+    forced = np.einsum("bij,bj->bi", zs_resp[filters], inputs)
+
+    # The trailing two outputs of each block are an affine function of the
+    # trailing two outputs of the previous one.  Resolve that recurrence with
+    # a parallel prefix scan over the composed affine maps (see [4]).
+    free = zi_resp[filters]
+    trans = free[:, [-1, -2]]
+    state = forced[:, [-1, -2]]
+    shift = 1
+    while shift < len(state):
+        state[shift:] += np.einsum("bij,bj->bi", trans[shift:], state[:-shift])
+        trans[shift:] = trans[shift:] @ trans[:-shift]
+        shift *= 2
+
+    # Each block is seeded with the final state of the previous one, and the
+    # first block is seeded with zeros.
+    history = np.zeros_like(state)
+    history[1:] = state[:-1]
+
+    return forced + np.einsum("bij,bj->bi", free, history)
+
+
+###############################################################################
+
+
+def _decode_exact(
+    filters: npt.NDArray[np.uint8],
+    ranges: npt.NDArray[np.uint8],
+    samples: npt.NDArray[np.int8],
+) -> npt.NDArray[np.int16]:
+    if not len(filters):
+        return np.zeros(0, np.int16)
+
+    # Apply the range shift to every nibble up front (see [5]).  Values are in
+    # the DSP's 15-bit "half" scale.  Ranges 13-15 are reserved, and behave as
+    # if the nibble were shifted by 12 and then by 11 more bits to the right.
+    shifted = (samples.astype(np.int32) << ranges[:, np.newaxis]) >> 1
+    shifted[ranges > 12] = np.where(samples[ranges > 12] < 0, -2048, 0)
+    coefs = _EXACT_FILTERS[filters]
+
+    # The IIR filter clamps and wraps on every sample, which makes it
+    # nonlinear, so there's no scan over blocks as in _decode.  A filter 0
+    # block ignores the filter history, though, so the blocks split into
+    # independent chains that each start with one (e.g., every repetition of
+    # a loop).  Short chains are decoded side by side, and long ones
+    # sequentially, whichever is cheaper.
+    first = filters == 0
+    first[0] = True
+    chain = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+    pos = np.arange(len(filters)) - starts[chain]
+    lengths = np.diff(np.append(starts, len(filters)))
+
+    # Estimated cost of decoding chains up to each length side by side and
+    # the rest sequentially, in blocks
+    depths = np.sort(lengths)
+    costs = _LOCKSTEP_COST * depths + depths.sum() - np.cumsum(depths)
+    depth = 0
+    if costs.min() < depths.sum():
+        depth = int(depths[np.argmin(costs)])
+
+    rv = np.empty(shifted.shape, np.int16)
+    short = lengths[chain] <= depth
+    if short.any():
+        # Renumber the short chains from zero
+        _, idx = np.unique(chain[short], return_inverse=True)
+        rv[short] = _decode_lockstep(
+            shifted[short], coefs[short], pos[short], idx, depth
+        )
+    if not short.all():
+        # Each chain starts fresh, so they can be run back to back
+        rv[~short] = _decode_sequential(shifted[~short], coefs[~short])
+
+    return rv.reshape(-1)
+
+
+###############################################################################
+
+
+def _decode_lockstep(
+    shifted: npt.NDArray[np.int32],
+    coefs: npt.NDArray[np.int32],
+    pos: npt.NDArray[np.int64],
+    chain: npt.NDArray[np.int64],
+    depth: int,
+) -> npt.NDArray[np.int16]:
+    # Lay the chains out as columns, padded with silent filter 0 blocks, and
+    # run the filter over every column at once
+    nchains = int(chain.max()) + 1
+    grid = np.zeros((depth, SAMPLES_PER_BLOCK, nchains), np.int32)
+    grid_coefs = np.zeros((depth, 5, nchains), np.int32)
+    grid[pos, :, chain] = shifted
+    grid_coefs[pos, :, chain] = coefs
+
+    old = np.zeros(nchains, np.int32)
+    older = np.zeros(nchains, np.int32)
+    for block, (a, b, c, d, e) in zip(grid, grid_coefs):
+        for n, smpl in enumerate(block):
+            smpl = smpl + a * old + ((b * old) >> c) + d * older
+            smpl += (e * older) >> 4
+            smpl = np.clip(smpl, -0x8000, 0x7FFF)
+            smpl = ((2 * smpl + 0x8000) & 0xFFFF) - 0x8000
+            block[n] = smpl
+            older, old = old, smpl >> 1
+
+    return grid[pos, :, chain].astype(np.int16)
+
+
+###############################################################################
+
+
+def _decode_sequential(
+    shifted: npt.NDArray[np.int32], coefs: npt.NDArray[np.int32]
+) -> npt.NDArray[np.int16]:
+    # Run the filter on plain integers with everything else hoisted out of the
+    # loop
+    rv = []
+    old = older = 0
+    for (a, b, c, d, e), block in zip(coefs.tolist(), shifted.tolist()):
+        for smpl in block:
+            smpl += a * old + ((b * old) >> c) + d * older + ((e * older) >> 4)
+
+            # Clamp to 16 bits, then double and wrap to 16 bits.  The filter
+            # history is kept at 15 bits.
+            smpl = min(max(smpl, -0x8000), 0x7FFF)
+            smpl = ((2 * smpl + 0x8000) & 0xFFFF) - 0x8000
+            rv.append(smpl)
+            older, old = old, smpl >> 1
+
+    return np.array(rv, dtype=np.int16).reshape(-1, SAMPLES_PER_BLOCK)
+
+
+###############################################################################
+
+
+def _align_loop(
+    pcm: npt.NDArray[np.int64], loop_start: int | None
+) -> tuple[npt.NDArray[np.int64], int | None]:
+    # Non-looping samples just get padded out to a whole block
+    if loop_start is None:
+        pad = -len(pcm) % SAMPLES_PER_BLOCK
+        return np.concatenate((pcm, np.zeros(pad, np.int64))), None
+
+    if not 0 <= loop_start < len(pcm):
+        raise BrrException(f"Invalid loop start: {loop_start}")
+
+    # Pad the front so the loop starts on a block boundary, then repeat the
+    # loop until it spans a whole number of blocks.  This keeps the loop
+    # bit-exact rather than resampling it.
+    pad = -loop_start % SAMPLES_PER_BLOCK
+    loop = pcm[loop_start:]
+    reps = SAMPLES_PER_BLOCK // math.gcd(len(loop), SAMPLES_PER_BLOCK)
+    pcm = np.concatenate(
+        (np.zeros(pad, np.int64), pcm[:loop_start], np.tile(loop, reps))
+    )
+
+    return pcm, (loop_start + pad) // SAMPLES_PER_BLOCK
+
+
+###############################################################################
+
+
+def _encode(
+    pcm: npt.NDArray[np.int64], loop_block: int | None
+) -> npt.NDArray[np.uint8]:
+    nblocks = len(pcm) // SAMPLES_PER_BLOCK
+    target = pcm.reshape(nblocks, SAMPLES_PER_BLOCK)
+    blocks = np.zeros((nblocks, BLOCK_SIZE), dtype=np.uint8)
+
+    nfilts = len(_FILTERS)
+    shift = _ENCODER_RANGES[np.newaxis, :]
+    nibbles = np.empty(
+        (nfilts, len(_ENCODER_RANGES), SAMPLES_PER_BLOCK), dtype=np.int64
+    )
+
+    old = older = 0
+    for n, block in enumerate(target):
+        # Every (filter, range) candidate starts from the state left behind by
+        # the previous block's choice, and is decoded exactly as the DSP would
+        cand_old = np.full(nibbles.shape[:2], old)
+        cand_older = np.full(nibbles.shape[:2], older)
+        err = np.zeros(nibbles.shape[:2])
+
+        for idx, smpl in enumerate(block):
+            pred = np.zeros_like(cand_old)
+            o1, o2 = cand_old[1:], cand_older[1:]
+            pred[1] = o1[0] + ((-o1[0]) >> 4)
+            pred[2] = 2 * o1[1] + ((-3 * o1[1]) >> 5) - o2[1] + (o2[1] >> 4)
+            pred[3] = (
+                2 * o1[2] + ((-13 * o1[2]) >> 6) - o2[2] + ((3 * o2[2]) >> 4)
+            )
+
+            # Quantize the residual to the nearest nibble for each range
+            resid = smpl - 2 * pred
+            nibble = np.clip(np.rint(resid / np.exp2(shift)), -8, 7)
+            nibble = nibble.astype(np.int64)
+            nibbles[:, :, idx] = nibble
+
+            out = np.clip(((nibble << shift) >> 1) + pred, -0x8000, 0x7FFF)
+            out = ((2 * out + 0x8000) & 0xFFFF) - 0x8000
+            err += (out - smpl) ** 2
+
+            cand_older, cand_old = cand_old, out >> 1
+
+        # The first block and the loop block can't depend on what came before
+        # them, so they must use filter 0
+        if n in (0, loop_block):
+            err[1:] = np.inf
+
+        filt, rng = np.unravel_index(np.argmin(err), err.shape)
+        old, older = int(cand_old[filt, rng]), int(cand_older[filt, rng])
+
+        nibs = 0xF & nibbles[filt, rng]
+        blocks[n, 0] = (_ENCODER_RANGES[rng] << 4) | (filt << 2)
+        blocks[n, 1:] = (nibs[::2] << 4) | nibs[1::2]
+
+    blocks[-1, 0] |= 0x1 if loop_block is None else 0x3
+
+    return blocks
+
+
+###############################################################################
+
+
+def _encode_wav(job: tuple[Path, int | None]) -> "Brr":
+    return Brr.from_wav(*job)
+
+
+###############################################################################
+
+
 def _end_block(block: Sequence[int]) -> bool:
     return bool(block[0] & 0x1)
 
@@ -89,6 +369,66 @@ def _end_block(block: Sequence[int]) -> bool:
 ###############################################################################
 
 
+def _next_end_blocks(aram: npt.NDArray[np.uint8]) -> npt.NDArray[np.int64]:
+    # For every offset, the address of the first end block in the chain of
+    # blocks starting there, or len(aram) if the chain runs off the end.
+    # Offsets 9 bytes apart are in the same chain, so with ARAM laid out in
+    # 9-byte rows each column is a separate chain, and a reverse running
+    # minimum down the columns finds the next end block for every row.
+    size = len(aram)
+    nrows = -(-size // BLOCK_SIZE)
+
+    addrs = np.arange(nrows * BLOCK_SIZE, dtype=np.int64)
+    ends = np.full(len(addrs), size, dtype=np.int64)
+
+    # Only blocks that fit in ARAM count
+    nheaders = size - BLOCK_SIZE + 1
+    is_end = (aram[:nheaders] & 0x1) != 0
+    ends[:nheaders][is_end] = addrs[:nheaders][is_end]
+
+    ends = ends.reshape(nrows, BLOCK_SIZE)
+    np.minimum.accumulate(ends[::-1], axis=0, out=ends[::-1])
+
+    return ends.reshape(-1)[:size]
+
+
+###############################################################################
+
+
+@cache
+def _response_tables() -> (
+    tuple[npt.NDArray[np.double], npt.NDArray[np.double]]
+):
+    # Deferred, these tables are only built once
+    from scipy.signal import lfilter, lfiltic  # type: ignore  # isort: skip
+
+    # Tabulate, per filter, the matrix that maps a block's samples to its
+    # outputs (zero-state response), and the one that maps the previous two
+    # outputs to its outputs (zero-input response)
+    nfilts = len(_FILTERS)
+    zs_resp = np.zeros((nfilts, SAMPLES_PER_BLOCK, SAMPLES_PER_BLOCK))
+    zi_resp = np.zeros((nfilts, SAMPLES_PER_BLOCK, 2))
+
+    impulse = np.zeros(SAMPLES_PER_BLOCK)
+    impulse[0] = 1
+
+    for filt, a_coeffs in _FILTERS.items():
+        resp = lfilter([1], a_coeffs, impulse)
+        for n in range(SAMPLES_PER_BLOCK):
+            zs_resp[filt, n:, n] = resp[: SAMPLES_PER_BLOCK - n]
+
+        for n, init in enumerate(([1, 0], [0, 1])):
+            zi = lfiltic([1], a_coeffs, init)
+            zi_resp[filt, :, n], _ = lfilter(
+                [1], a_coeffs, np.zeros(SAMPLES_PER_BLOCK), zi=zi
+            )
+
+    return zs_resp, zi_resp
+
+
+###############################################################################
+
+
 def _u4_to_s4(data: npt.NDArray[np.uint8]) -> npt.NDArray[np.int8]:
     return (0xF & (data.astype(np.int8) + 8)) - 8
 
@@ -98,57 +438,119 @@ def _u4_to_s4(data: npt.NDArray[np.uint8]) -> npt.NDArray[np.int8]:
 ###############################################################################
 
 
-def extract_brrs(spc: bytes) -> List["Brr"]:
-    header = spc[:256]
-    aram = spc[256:]
+def extract_brr_slots(spc: "bytes | SpcFile") -> dict[int, "Brr"]:
+    """
+    Find the samples in an SPC file's sample directory, by directory slot
 
-    magic = header[:0x23]
+    Parameters
+    ----------
+    spc : bytes or SpcFile
+        The SPC file
 
-    if magic != b"SNES-SPC700 Sound File Data v0.30\x1A\x1A":
-        return []
-    if len(spc) < 0x10200:
-        return []
+    Returns
+    -------
+    dict
+        The valid samples, keyed by sample directory slot (the sample's SRCN
+        value) in slot order.  Their blocks are views into the file's ARAM,
+        not copies.
+    """
+    if not isinstance(spc, SpcFile):
+        try:
+            spc = SpcFile(spc)
+        except SpcException:
+            return {}
+
+    aram = spc.aram
+    sample_dir_offset = spc.sample_dir_offset
+
+    entries = spc.sample_dir
+    starts = entries["start"].astype(np.int64)
+    ends = _next_end_blocks(aram)[starts]
+
+    # The sample has to end, and can't run into the directory
+    valid = ends < len(aram)
+    valid &= ~((starts < sample_dir_offset) & (sample_dir_offset <= ends))
+
+    # Loop points of non-looping samples are ignored
+    loops = (aram[np.minimum(ends, len(aram) - 1)] & 0x2) != 0
+    loop_offsets = np.where(loops, entries["loop"] - starts, 0)
+    valid &= loop_offsets >= 0
+
+    brrs = {}
+    for slot, start, end, loop_offset in zip(
+        np.flatnonzero(valid).tolist(),
+        starts[valid].tolist(),
+        (ends[valid] + BLOCK_SIZE).tolist(),
+        loop_offsets[valid].tolist(),
+    ):
+        blocks = aram[start:end].reshape(-1, BLOCK_SIZE)
+        with suppress(BrrException):
+            brrs[slot] = Brr(blocks, loop_offset)
 
-    dir_reg = spc[0x1015D]
-    sample_dir_offset = 256 * dir_reg
-    sample_dir = aram[sample_dir_offset : sample_dir_offset + 0x400]
+    return brrs
 
-    brrs = []
-    for start_addr, loop in iter_unpack("<2H", sample_dir):
-        brr = bytearray()
 
-        last_addr = addr = start_addr
-        valid_sample = False
+###############################################################################
 
-        while addr < len(aram):
-            if addr >= 0x10000:
-                break
-            if last_addr < sample_dir_offset <= addr:
-                break
 
-            block = aram[addr : addr + BLOCK_SIZE]
-            addr += BLOCK_SIZE
+def extract_brrs(spc: "bytes | SpcFile") -> List["Brr"]:
+    """
+    Find the samples in an SPC file's sample directory
 
-            brr.extend(block)
+    Parameters
+    ----------
+    spc : bytes or SpcFile
+        The SPC file
 
-            if _end_block(block):
-                valid_sample = True
-                sample_loops = _block_loops(block)
-                break
+    Returns
+    -------
+    list
+        The valid samples, in directory order.  Their blocks are views into
+        the file's ARAM, not copies.
+    """
+    return list(extract_brr_slots(spc).values())
 
-        if valid_sample:
-            loop_offset = 0
-            if sample_loops:
-                loop_offset = loop - start_addr
 
-            if loop_offset < 0:
-                continue
+###############################################################################
 
-            brr = bytearray(loop_offset.to_bytes(2, "little")) + brr
-            with suppress(BrrException):
-                brrs.append(Brr.from_binary(brr))
 
-    return brrs
+def encode_wavs(
+    fnames: Sequence[Path],
+    loop_starts: Sequence[int | None] | None = None,
+    parallel: bool = False,
+    max_workers: int | None = None,
+) -> list["Brr"]:
+    """
+    Encode a batch of WAV files to BRRs
+
+    Parameters
+    ----------
+    fnames : Sequence[Path]
+        WAV files to encode
+    loop_starts : Sequence[int | None]
+        Loop start sample for each file, or None if the file does not loop.
+        If this is None, no file loops.
+    parallel : bool
+        True to encode files concurrently on a process pool
+    max_workers : int
+        Process pool size, defaulting to the number of processors.  Ignored if
+        `parallel` is False.
+
+    Returns
+    -------
+    list
+        The encoded BRRs, in the same order as `fnames`
+    """
+    if loop_starts is None:
+        loop_starts = len(fnames) * [None]
+
+    jobs = list(zip(fnames, loop_starts, strict=True))
+
+    if not parallel:
+        return [_encode_wav(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(_encode_wav, jobs))
 
 
 ###############################################################################
@@ -168,17 +570,23 @@ class Brr:
     blocks: npt.NDArray[np.uint8]
     loop_point: int | None = None
     samples_per_frame: int = 1024
-    _waveform_cache: dict[int, npt.NDArray[np.int16]] = field(
+    exact: bool = False
+    _waveform_cache: dict[tuple[int, bool], npt.NDArray[np.int16]] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+    _pitch_cache: dict[PitchMethod, PitchEstimate] = field(
         init=False, repr=False, compare=False, default_factory=dict
     )
-    _keyed: bool = False
+    _voice: Voice | None = field(
+        init=False, repr=False, compare=False, default=None
+    )
 
     ###########################################################################
     # API constructor definitions
     ###########################################################################
 
     @classmethod
-    def from_binary(cls, raw: bytes) -> "Brr":
+    def from_binary(cls, raw: bytes, exact: bool = False) -> "Brr":
         data = np.frombuffer(raw, np.uint8)
         if data.size % BLOCK_SIZE == 0:
             start = 0
@@ -187,115 +595,121 @@ class Brr:
             start = 2
             # Little endian per [2] above
             loop_point = int.from_bytes(raw[:2], "little")
+        else:
+            raise BrrException(f"Invalid BRR file length: {data.size}")
 
         data = data[start:].reshape((-1, BLOCK_SIZE))
-        return cls(data, loop_point)
+        return cls(data, loop_point, exact=exact)
 
     ###########################################################################
 
     @classmethod
-    def from_file(cls, fname: Path) -> "Brr":
+    def from_file(cls, fname: Path, exact: bool = False) -> "Brr":
         with open(fname, "rb") as fobj:
-            return cls.from_binary(fobj.read())
+            return cls.from_binary(fobj.read(), exact)
 
     ###########################################################################
-    # API method definitions
-    ###########################################################################
-
-    def generate(
-        self, pitch_reg: int, env: Envelope
-    ) -> Iterator[npt.NDArray[np.int16]]:
-        self._keyed = True
-
-        # Variable initialization
-        proc = np.zeros(SAMPLES_PER_BLOCK)
-        chunk_size = self.samples_per_frame / SAMPLES_PER_BLOCK
-
-        dt = pitch_reg / PITCH_REG_SCALE
-
-        # Loop the requested number of times, starting at block 0 the first
-        # time and at the loop block all other times
-        start_block = 0
-        idx = 0
-
-        env_times, envelope = env.envelope
-        env_times *= SAMPLE_FREQ
-
-        buffer = np.zeros(SAMPLES_PER_BLOCK, dtype=np.int16)
-        weights = np.zeros(self.samples_per_frame)
-        nblocks = int(np.ceil(chunk_size * dt))
-        frame_size = 1 + nblocks * SAMPLES_PER_BLOCK
-        frame = np.zeros(frame_size)
-        xp = np.array([-1])
-        ts = np.array([-dt])
-
-        one_shot = not self.sample_loops
-        done = False
-
-        # TODO: refactor with generate_waveform
-        while True:
-            for n in range(start_block, self.nblocks):
-                if idx == 0:
-                    frame[0] = frame[-1]
-                    xp = xp[-1] + np.arange(len(frame))
-                    ts = np.arange(ts[-1] + dt, xp[-1], dt)
 
-                # Get the filter coefficients
-                a_coeffs = _FILTERS[self.filters[n]]
-                b_coeffs = [2 ** self.ranges[n]]
-
-                # Run the IIR filter
-                init = lfiltic(b_coeffs, a_coeffs, [proc[-1], proc[-2]])
-                proc, _ = lfilter(b_coeffs, a_coeffs, self.samples[n], zi=init)
-
-                frame[
-                    1
-                    + idx * SAMPLES_PER_BLOCK : 1
-                    + (idx + 1) * SAMPLES_PER_BLOCK
-                ] = proc
-
-                idx += 1
-
-                emit = False
-                if (n == self.nblocks - 1) and one_shot:
-                    frame[1 + idx * SAMPLES_PER_BLOCK :] = 0
-                    emit = True
-
-                if idx == nblocks:
-                    idx = 0
-                    emit = True
-
-                if emit:
-                    if self._keyed:
-                        weights = np.interp(ts, env_times, envelope)
-                    else:
-                        weights = weights[-1] * np.ones(len(ts))
-                        weights -= 8 * np.arange(len(ts)) / 2**11
-                        weights = np.maximum(weights, 0)
-                        done = True
+    @classmethod
+    def from_pcm(
+        cls, pcm: npt.ArrayLike, loop_start: int | None = None
+    ) -> "Brr":
+        """
+        Encode 16-bit PCM samples
+
+        Parameters
+        ----------
+        pcm : ArrayLike
+            Signed 16-bit sample values
+        loop_start : int
+            Index of the first looped sample, or None for a one-shot sample
+
+        Returns
+        -------
+        Brr
+            The encoded sample
+
+        Notes
+        -----
+        Blocks are 16 samples long, so a looping sample is zero-padded at the
+        front to put the loop start on a block boundary, and the loop is
+        repeated until its length is a multiple of 16 samples.  A one-shot
+        sample is zero-padded at the end.
+        """
+        data = np.clip(np.rint(np.asarray(pcm)), -0x8000, 0x7FFF)
+        data, loop_block = _align_loop(data.astype(np.int64), loop_start)
+
+        if not len(data):
+            raise BrrException("Cannot encode an empty sample")
+
+        # One-shot samples still get a (zero) loop header, as AMK expects
+        blocks = _encode(data, loop_block)
+        return cls(blocks, BLOCK_SIZE * (loop_block or 0))
 
-                    result = np.interp(ts, xp, frame)
-                    result = np.round(result * weights).astype(np.int16)
-                    buffer = np.hstack((buffer, result))
+    ###########################################################################
 
-                    while len(buffer) >= self.samples_per_frame:
-                        yield buffer[: self.samples_per_frame]
-                        buffer = buffer[self.samples_per_frame :]
+    @classmethod
+    def from_wav(cls, fname: Path, loop_start: int | None = None) -> "Brr":
+        """
+        Encode a WAV file
+
+        Parameters
+        ----------
+        fname : Path
+            8- or 16-bit PCM WAV file.  Multiple channels are mixed down to
+            mono.  No resampling is done.
+        loop_start : int
+            Index of the first looped sample, or None for a one-shot sample
+
+        Returns
+        -------
+        Brr
+            The encoded sample
+        """
+        with wave.open(str(fname), "rb") as fobj:
+            width = fobj.getsampwidth()
+            nchannels = fobj.getnchannels()
+            frames = fobj.readframes(fobj.getnframes())
+
+        match width:
+            case 1:
+                data = np.frombuffer(frames, np.uint8).astype(np.double)
+                data = 256 * (data - 128)
+            case 2:
+                data = np.frombuffer(frames, "<i2").astype(np.double)
+            case _:
+                raise BrrException(f"Unsupported sample width: {width}")
+
+        data = data.reshape(-1, nchannels).mean(axis=1)
+        return cls.from_pcm(data, loop_start)
 
-                    if one_shot or done:
-                        rv = np.zeros(self.samples_per_frame, dtype=np.int16)
-                        rv[: len(buffer)] = buffer[:]
-                        yield rv
-                        return
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
 
-            start_block = self.loop_block
+    def generate(
+        self,
+        pitch_reg: int,
+        env: Envelope,
+        method: Interpolation = Interpolation.GAUSSIAN,
+    ) -> Iterator[npt.NDArray[np.int16]]:
+        waveform, loop_len = self.voice_source
+        self._voice = Voice(
+            waveform,
+            loop_len,
+            pitch_reg,
+            env,
+            self.samples_per_frame,
+            method=method,
+        )
+        yield from self._voice
 
     ###########################################################################
 
     def generate_waveform(self, loops: int = 1) -> npt.NDArray[np.int16]:
         # Cache lookup
         try:
-            return self._waveform_cache[loops]
+            return self._waveform_cache[(loops, self.exact)]
         except KeyError:
             # Not in the cache, do the calculation
             pass
@@ -303,39 +717,91 @@ class Brr:
         if not self.sample_loops and loops != 1:
             raise BrrException("Cannot loop non-looping sample")
 
-        # Variable initialization
+        # Play every block once, then the looped blocks the remaining times
         nblocks = self.nblocks + (loops - 1) * (self.nblocks - self.loop_block)
-        rv = np.empty((nblocks, SAMPLES_PER_BLOCK), dtype=np.int16)
-        proc = np.zeros(SAMPLES_PER_BLOCK)
-        rv_idx = 0
-
-        # Loop the requested number of times, starting at block 0 the first
-        # time and at the loop block all other times
-        start_block = 0
-        for _ in range(loops):
-            for n in range(start_block, self.nblocks):
-                # Get the filter coefficients
-                a_coeffs = _FILTERS[self.filters[n]]
-                b_coeffs = [2 ** self.ranges[n]]
-
-                # Run the IIR filter
-                init = lfiltic(b_coeffs, a_coeffs, [proc[-1], proc[-2]])
-                proc, _ = lfilter(b_coeffs, a_coeffs, self.samples[n], zi=init)
+        block_idx = np.concatenate(
+            (
+                np.arange(self.nblocks),
+                np.tile(
+                    np.arange(self.loop_block, self.nblocks), max(loops - 1, 0)
+                ),
+            )
+        )[:nblocks]
 
-                # Store the result
-                rv[rv_idx] = np.round(proc)
-                rv_idx += 1
+        filters = self._filter_array[block_idx]
+        ranges = self._range_array[block_idx]
+        samples = self.samples[block_idx]
 
-            start_block = self.loop_block
+        if self.exact:
+            rv = _decode_exact(filters, ranges, samples)
+        else:
+            rv = np.round(_decode(filters, ranges, samples)).astype(np.int16)
 
         # Cache storage and return
-        self._waveform_cache[loops] = rv.reshape(-1)
-        return self._waveform_cache[loops]
+        self._waveform_cache[(loops, self.exact)] = rv.reshape(-1)
+        return self._waveform_cache[(loops, self.exact)]
 
     ###########################################################################
 
     def keyoff(self) -> None:
-        self._keyed = False
+        if self._voice is not None:
+            self._voice.keyoff()
+
+    ###########################################################################
+
+    def pitch(self, method: PitchMethod = PitchMethod.FFT) -> PitchEstimate:
+        """
+        Estimate the sample's fundamental frequency
+
+        Parameters
+        ----------
+        method : PitchMethod
+            Estimation method
+
+        Returns
+        -------
+        PitchEstimate
+            The fundamental frequency and confidence in it, see
+            `estimate_pitch`.  Looping samples are estimated from their loop.
+        """
+        try:
+            return self._pitch_cache[method]
+        except KeyError:
+            pass
+
+        waveform, loop_len = self.voice_source
+        rv = estimate_pitch(waveform, loop_len, method)
+        self._pitch_cache[method] = rv
+        return rv
+
+    ###########################################################################
+
+    def preload(
+        self,
+        waveform: npt.NDArray[np.int16],
+        spectrum: npt.NDArray[np.floating],
+        pitch: PitchEstimate,
+    ) -> None:
+        """
+        Prime the decoding and analysis caches with earlier results
+
+        Parameters
+        ----------
+        waveform : NDArray
+            Output of `generate_waveform()` (one pass)
+        spectrum : NDArray
+            Value of `spectrum`
+        pitch : PitchEstimate
+            Output of `pitch()` (default method)
+
+        Notes
+        -----
+        This is for restoring results computed from a sample with the same
+        `digest` and `exact` setting, see `BrrLibrary`.  Nothing is checked.
+        """
+        self._waveform_cache[(1, self.exact)] = waveform
+        self._pitch_cache[PitchMethod.FFT] = pitch
+        self.__dict__["spectrum"] = spectrum
 
     ###########################################################################
 
@@ -369,7 +835,7 @@ class Brr:
         if self.loop_point is not None:
             rv += self.loop_point.to_bytes(2, "little")
 
-        return self.blocks.tobytes()
+        return rv + self.blocks.tobytes()
 
     ###########################################################################
 
@@ -395,32 +861,22 @@ class Brr:
     ###########################################################################
 
     @cached_property
-    def fundamental(self) -> float:
-        samples_per_loop = SAMPLES_PER_BLOCK * (self.nblocks - self.loop_block)
-        target_samples = 64000
-        if self.sample_loops and samples_per_loop > 0:
-            loops = math.ceil(target_samples / samples_per_loop)
-            start = self.loop_block * SAMPLES_PER_BLOCK
-        else:
-            loops = 1
-            start = 0
+    def digest(self) -> str:
+        """SHA-256 of `binary`, which identifies the sample's contents."""
+        return hashlib.sha256(self.binary).hexdigest()
 
-        nyquist = SAMPLE_FREQ / 2
-        # Remove any DC bias
-        waveform = np.array(self.generate_waveform(loops), dtype=np.double)
-        waveform -= waveform.mean()
+    ###########################################################################
 
-        spec = np.abs(np.fft.rfft(waveform[start:]))
-        spec /= spec.max()
-        peak: float
-        peak, *_ = find_peaks(spec, height=0.25)[0]
-        return nyquist * peak / len(spec)
+    @property
+    def fundamental(self) -> float:
+        """Fundamental frequency, from the default `pitch` estimator."""
+        return self.pitch().frequency
 
     ###########################################################################
 
     @cached_property
     def filters(self) -> list[int]:
-        return list(0x3 & (self.blocks[:, 0] >> 2))
+        return list(self._filter_array)
 
     ###########################################################################
 
@@ -438,7 +894,7 @@ class Brr:
 
     @cached_property
     def ranges(self) -> list[int]:
-        return list(0xF & (self.blocks[:, 0] >> 4))
+        return list(self._range_array)
 
     ###########################################################################
 
@@ -459,6 +915,52 @@ class Brr:
 
         return _u4_to_s4(rv)
 
+    ###########################################################################
+
+    @cached_property
+    def spectrum(self) -> npt.NDArray[np.double]:
+        """
+        Normalized magnitude spectrum, see `magnitude_spectrum`
+
+        Looping samples only include the loop.  Silent samples raise
+        ValueError.
+        """
+        return magnitude_spectrum(*self.voice_source)
+
+    ###########################################################################
+
+    @property
+    def voice_source(self) -> tuple[npt.NDArray[np.int16], int]:
+        """
+        The waveform and loop length a `Voice` plays this sample from
+
+        Looping samples are the first pass followed by one more pass through
+        the loop, which the voice repeats from then on.  One-shot samples have
+        a loop length of 0.
+        """
+        if self.sample_loops:
+            waveform = self.generate_waveform(2)
+            loop_len = SAMPLES_PER_BLOCK * (self.nblocks - self.loop_block)
+        else:
+            waveform = self.generate_waveform(1)
+            loop_len = 0
+
+        return waveform, loop_len
+
+    ###########################################################################
+    # Private property definitions
+    ###########################################################################
+
+    @cached_property
+    def _filter_array(self) -> npt.NDArray[np.uint8]:
+        return 0x3 & (self.blocks[:, 0] >> 2)
+
+    ###########################################################################
+
+    @cached_property
+    def _range_array(self) -> npt.NDArray[np.uint8]:
+        return 0xF & (self.blocks[:, 0] >> 4)
+
     ###########################################################################
     # Data model methods
     ###########################################################################
@@ -0,0 +1,258 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Content-addressed BRR storage
+
+Notes
+-----
+Samples are identified by `Brr.digest`, so a sample loaded twice (from
+another file, a sample pack, or an SPC) is only decoded and analyzed once.
+Decoded waveforms, spectra, and pitch estimates are also written to an on-disk
+cache, one ``.npz`` file per sample, that survives between sessions.  The
+cache is bounded in size, and the least recently used entries are evicted
+first.  An entry's modification time is its last use.  The cache's size is
+tracked as entries are written, and the directory is only rescanned when that
+total passes the bound.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import os
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+# Library imports
+import numpy as np
+
+from .brr import Brr
+from .pitch import PitchEstimate
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+DEFAULT_CACHE_SIZE = 256 * 2**20
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_EXT = ".npz"
+
+# Bumped whenever what's stored changes, older entries are recomputed
+_FORMAT = 2
+
+# Number of samples kept in memory
+_MEMORY_ENTRIES = 256
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class BrrLibrary:
+    """
+    A content-addressed collection of BRR samples
+
+    Parameters
+    ----------
+    cache_dir : Path
+        Directory for the persistent cache, or None to only cache in memory.
+        It is created when the first entry is written.
+    max_size : int
+        Upper bound on the persistent cache's size, in bytes
+    """
+
+    cache_dir: Path | None
+    max_size: int
+    _brrs: OrderedDict[str, Brr]
+    _size: int | None
+
+    ###########################################################################
+
+    def __init__(
+        self, cache_dir: Path | None, max_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._brrs = OrderedDict()
+        self._size = None
+
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def add(self, brr: Brr) -> Brr:
+        """
+        Look up a sample by its contents
+
+        Parameters
+        ----------
+        brr : Brr
+            The sample
+
+        Returns
+        -------
+        Brr
+            The library's copy of the sample if it has one, otherwise `brr`
+            with its decoded waveform and analysis restored from the
+            persistent cache (or computed and saved there)
+
+        Notes
+        -----
+        Samples without a detectable fundamental are returned as-is and not
+        saved, as are samples that can't be saved because the cache directory
+        isn't writable.
+        """
+        key = self._key(brr)
+
+        with suppress(KeyError):
+            self._brrs.move_to_end(key)
+            return self._brrs[key]
+
+        if not self._load(key, brr):
+            with suppress(OSError, ValueError):
+                self._save(key, brr)
+
+        self._brrs[key] = brr
+        if len(self._brrs) > _MEMORY_ENTRIES:
+            self._brrs.popitem(last=False)
+
+        return brr
+
+    ###########################################################################
+
+    def clear(self) -> None:
+        """Empty the library and its persistent cache."""
+        self._brrs.clear()
+        for fname, _ in self._entries():
+            with suppress(FileNotFoundError):
+                fname.unlink()
+        self._size = 0
+
+    ###########################################################################
+
+    def from_binary(self, raw: bytes, exact: bool = False) -> Brr:
+        """Add a sample as in `Brr.from_binary`."""
+        return self.add(Brr.from_binary(raw, exact))
+
+    ###########################################################################
+
+    def from_file(self, fname: Path, exact: bool = False) -> Brr:
+        """Add a sample as in `Brr.from_file`."""
+        return self.add(Brr.from_file(fname, exact))
+
+    ###########################################################################
+
+    def prune(self) -> None:
+        """Evict least recently used entries until the cache fits."""
+        entries = self._entries()
+        total = sum(stat.st_size for _, stat in entries)
+
+        entries.sort(key=lambda x: x[1].st_mtime_ns)
+        for fname, stat in entries:
+            if total <= self.max_size:
+                break
+            with suppress(FileNotFoundError):
+                fname.unlink()
+            total -= stat.st_size
+
+        self._size = total
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        rv = []
+        if self.cache_dir is not None and self.cache_dir.is_dir():
+            for fname in self.cache_dir.glob(f"*{_EXT}"):
+                with suppress(FileNotFoundError):
+                    rv.append((fname, fname.stat()))
+        return rv
+
+    ###########################################################################
+
+    def _fname(self, key: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}{_EXT}"
+
+    ###########################################################################
+
+    def _key(self, brr: Brr) -> str:
+        # Exact decoding can give a different waveform
+        return brr.digest + ("-exact" if brr.exact else "")
+
+    ###########################################################################
+
+    def _load(self, key: str, brr: Brr) -> bool:
+        fname = self._fname(key)
+        if fname is None:
+            return False
+
+        try:
+            with np.load(fname) as data:
+                if int(data["format"]) != _FORMAT:
+                    return False
+                pitch = PitchEstimate(
+                    float(data["fundamental"]), float(data["confidence"])
+                )
+                brr.preload(data["waveform"], data["spectrum"], pitch)
+        except (OSError, KeyError, ValueError):
+            # Missing, or written by something else
+            return False
+
+        # Mark it as recently used
+        with suppress(OSError):
+            os.utime(fname)
+
+        return True
+
+    ###########################################################################
+
+    def _save(self, key: str, brr: Brr) -> None:
+        fname = self._fname(key)
+        if fname is None:
+            return
+
+        pitch = brr.pitch()
+
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and move it into place so other processes
+        # never see a partial entry.  It's removed if anything goes wrong.
+        fobj = NamedTemporaryFile(
+            dir=fname.parent, suffix=".tmp", delete=False
+        )
+        try:
+            with fobj:
+                np.savez(
+                    fobj,
+                    waveform=brr.generate_waveform(),
+                    spectrum=brr.spectrum.astype(np.float32),
+                    fundamental=pitch.frequency,
+                    confidence=pitch.confidence,
+                    format=_FORMAT,
+                )
+            os.replace(fobj.name, fname)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(fobj.name)
+            raise
+
+        # Only scan the directory when it may have outgrown its bound.  Other
+        # processes' writes are picked up the next time it's scanned.
+        if self._size is None:
+            self._size = sum(stat.st_size for _, stat in self._entries())
+        else:
+            self._size += fname.stat().st_size
+        if self._size > self.max_size:
+            self.prune()
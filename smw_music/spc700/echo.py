@@ -5,7 +5,22 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-only
 
-"""Echo configuration logic."""
+"""
+Echo configuration and simulation logic.
+
+Notes
+-----
+The echo simulation follows the S-DSP's echo path as documented in [1]_.
+Voices with echo enabled are summed into an echo send, which is written to
+the echo buffer along with the fed-back echo output and read back `delay`
+taps later.  What's read back goes through the 8-tap FIR filter to become
+the echo output.  Because the feedback only ever reaches back a whole delay,
+every sample in a delay-length chunk can be computed at once from earlier
+chunks.
+
+.. [1] Fullsnes - Nocash SNES Specs, "SNES APU DSP Echo Registers".
+       https://problemkaputt.de/fullsnes.htm#snesapudspechoregisters
+"""
 
 ###############################################################################
 # Imports
@@ -13,23 +28,149 @@
 
 # Standard library imports
 from dataclasses import dataclass
+from functools import lru_cache
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+from .spc700 import SAMPLE_FREQ
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+# FIR filter coefficients AMK selects between, C0 (applied to the oldest
+# sample) first
+FIR_FILTERS = (
+    (0x7F, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00),
+    (0x58, 0xBF, 0xDB, 0xF0, 0xFE, 0x07, 0x0C, 0x0C),
+)
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_FIR_CACHE_SIZE = 64
+
+_FIR_TAPS = 8
+
+# Stereo samples per EDL step (2KB of 4-byte samples)
+_SAMPLES_PER_TAP = 512
 
 ###############################################################################
 # Private function definitions
 ###############################################################################
 
 
+def _clamp16(data: npt.NDArray[np.int64]) -> None:
+    np.clip(data, -0x8000, 0x7FFF, out=data)
+
+
+###############################################################################
+
+
+def _fir(
+    played: npt.NDArray[np.int64],
+    coeffs: npt.NDArray[np.int64],
+    start: int,
+    stop: int,
+) -> npt.NDArray[np.int64]:
+    # The DSP wraps the sum of the first seven taps to 16 bits, then adds the
+    # last tap and clamps
+    taps = [
+        (played[start + n : stop + n] * coeffs[n]) >> 6
+        for n in range(_FIR_TAPS)
+    ]
+    rv = sum(taps[:-1])
+    rv = ((rv + 0x8000) & 0xFFFF) - 0x8000
+    rv += taps[-1]
+    _clamp16(rv)
+    rv &= ~1
+    return rv
+
+
+###############################################################################
+
+
 def _mag_inv_to_int(mag: float, inv: bool) -> int:
     clip = min(max(mag, 0.0), 1.0)
     # The '0xFF &' forces the integer into 2's complement representation
     return 0xFF & round(-128 * clip if inv else 127 * clip)
 
 
+###############################################################################
+
+
+def _signed(reg: int) -> int:
+    return reg - 0x100 if reg & 0x80 else reg
+
+
 ###############################################################################
 # API function definitions
 ###############################################################################
 
 
+def apply_echo(
+    send: npt.ArrayLike, config: "EchoConfig"
+) -> npt.NDArray[np.int64]:
+    """
+    Run an echo send through the S-DSP's echo path
+
+    Parameters
+    ----------
+    send : ArrayLike
+        (nsamples, 2) array of left and right echo send samples, the sum of
+        every voice with echo enabled
+    config : EchoConfig
+        Echo settings
+
+    Returns
+    -------
+    NDArray
+        (nsamples, 2) array of the echo output, scaled by the echo volume, to
+        be added to the main output
+
+    Notes
+    -----
+    The echo buffer starts out silent.
+    """
+    send = np.asarray(send, dtype=np.int64)
+    nsamples = len(send)
+
+    # An EDL of 0 still leaves a one-sample buffer
+    delay = max(1, config.delay * _SAMPLES_PER_TAP)
+    coeffs = np.array([_signed(x) for x in config.fir_coeffs], dtype=np.int64)
+    efb = _signed(config.fb_reg)
+    evol = np.array(
+        [_signed(config.left_vol_reg), _signed(config.right_vol_reg)]
+    )
+
+    # What the FIR sees: what was written `delay` samples earlier, at half
+    # scale, behind the FIR's history
+    played = np.zeros((_FIR_TAPS - 1 + nsamples, 2), dtype=np.int64)
+    written = np.empty_like(send)
+    echo = np.empty_like(send)
+
+    for start in range(0, nsamples, delay):
+        stop = min(start + delay, nsamples)
+        if start >= delay:
+            played[_FIR_TAPS - 1 + start : _FIR_TAPS - 1 + stop] = (
+                written[start - delay : stop - delay] >> 1
+            )
+
+        echo[start:stop] = _fir(played, coeffs, start, stop)
+
+        chunk = send[start:stop] + ((echo[start:stop] * efb) >> 7)
+        _clamp16(chunk)
+        written[start:stop] = chunk & ~1
+
+    return (echo * evol) >> 7
+
+
+###############################################################################
+
+
 # TODO: Is this AMK dependent?
 def echo_bytes(delay: int) -> tuple[int, int]:
     if delay == 0:
@@ -40,6 +181,52 @@ def echo_bytes(delay: int) -> tuple[int, int]:
     return rv
 
 
+###############################################################################
+
+
+@lru_cache(maxsize=_FIR_CACHE_SIZE)
+def fir_response(
+    coeffs: tuple[int, ...],
+    npoints: int = 1000,
+    sample_freq: float = SAMPLE_FREQ,
+) -> tuple[
+    npt.NDArray[np.double], npt.NDArray[np.double], npt.NDArray[np.double]
+]:
+    """
+    Frequency response of the echo FIR filter
+
+    Parameters
+    ----------
+    coeffs : tuple
+        Signed FIR coefficients, C0 (applied to the oldest sample) first
+    npoints : int
+        Number of frequencies, evenly spaced from 0 to Nyquist
+    sample_freq : float
+        Sample frequency, in Hz
+
+    Returns
+    -------
+    tuple
+        Frequencies in Hz, magnitude response in dB, and phase response in
+        degrees.  The arrays are read-only and shared between callers.
+    """
+    # Deferred, scipy is slow to import
+    from scipy.signal import freqz  # type: ignore  # isort: skip
+
+    # Newest sample first is the usual ordering for an FIR's coefficients
+    taps = np.array(coeffs[::-1], dtype=np.double) / 128
+    freqs, resp = freqz(taps, worN=npoints, fs=sample_freq)
+
+    with np.errstate(divide="ignore"):
+        mag = 20 * np.log10(np.abs(resp))
+    phase = np.degrees(np.angle(resp))
+
+    for arr in (freqs, mag, phase):
+        arr.setflags(write=False)
+
+    return freqs, mag, phase
+
+
 ###############################################################################
 # API class definitions
 ###############################################################################
@@ -108,6 +295,13 @@ class EchoConfig:
 
     ###########################################################################
 
+    @property
+    def fir_coeffs(self) -> tuple[int, ...]:
+        """Return the FIR filter (C0-C7) register settings."""
+        return FIR_FILTERS[self.fir_filt]
+
+    ###########################################################################
+
     @property
     def fb_reg(self) -> int:
         """Return the feedback (EFB) register setting."""
@@ -0,0 +1,333 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Sample interpolation
+
+Notes
+-----
+The S-DSP resamples with a 4-tap filter whose weights come from a 512-entry
+gaussian table, indexed by the top 8 bits of the 12-bit pitch counter
+fraction, as documented in [1]_.  Each tap is scaled down by 11 bits, the sum
+of the first three taps wraps to 16 bits, and the final sum is clamped to 16
+bits with its LSB cleared.
+
+.. [1] Fullsnes - Nocash SNES Specs, "SNES APU DSP BRR Pitch".
+       https://problemkaputt.de/fullsnes.htm#snesapudspbrrpitch
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from enum import Enum, auto
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+FRAC_BITS = 12
+
+# Samples of padding needed before and after a source waveform
+PAD_BEFORE = 1
+PAD_AFTER = 3
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# fmt: off
+_GAUSS = np.array([
+    0,    0,    0,    0,    0,    0,    0,    0,
+    0,    0,    0,    0,    0,    0,    0,    0,
+    1,    1,    1,    1,    1,    1,    1,    1,
+    1,    1,    1,    2,    2,    2,    2,    2,
+    2,    2,    3,    3,    3,    3,    3,    4,
+    4,    4,    4,    4,    5,    5,    5,    5,
+    6,    6,    6,    6,    7,    7,    7,    8,
+    8,    8,    9,    9,    9,    10,   10,   10,
+    11,   11,   11,   12,   12,   13,   13,   14,
+    14,   15,   15,   15,   16,   16,   17,   17,
+    18,   19,   19,   20,   20,   21,   21,   22,
+    23,   23,   24,   24,   25,   26,   27,   27,
+    28,   29,   29,   30,   31,   32,   32,   33,
+    34,   35,   36,   36,   37,   38,   39,   40,
+    41,   42,   43,   44,   45,   46,   47,   48,
+    49,   50,   51,   52,   53,   54,   55,   56,
+    58,   59,   60,   61,   62,   64,   65,   66,
+    67,   69,   70,   71,   73,   74,   76,   77,
+    78,   80,   81,   83,   84,   86,   87,   89,
+    90,   92,   94,   95,   97,   99,   100,  102,
+    104,  106,  107,  109,  111,  113,  115,  117,
+    118,  120,  122,  124,  126,  128,  130,  132,
+    134,  137,  139,  141,  143,  145,  147,  150,
+    152,  154,  156,  159,  161,  163,  166,  168,
+    171,  173,  175,  178,  180,  183,  186,  188,
+    191,  193,  196,  199,  201,  204,  207,  210,
+    212,  215,  218,  221,  224,  227,  230,  233,
+    236,  239,  242,  245,  248,  251,  254,  257,
+    260,  263,  267,  270,  273,  276,  280,  283,
+    286,  290,  293,  297,  300,  304,  307,  311,
+    314,  318,  321,  325,  328,  332,  336,  339,
+    343,  347,  351,  354,  358,  362,  366,  370,
+    374,  378,  381,  385,  389,  393,  397,  401,
+    405,  410,  414,  418,  422,  426,  430,  434,
+    439,  443,  447,  451,  456,  460,  464,  469,
+    473,  477,  482,  486,  491,  495,  499,  504,
+    508,  513,  517,  522,  527,  531,  536,  540,
+    545,  550,  554,  559,  563,  568,  573,  577,
+    582,  587,  592,  596,  601,  606,  611,  615,
+    620,  625,  630,  635,  640,  644,  649,  654,
+    659,  664,  669,  674,  678,  683,  688,  693,
+    698,  703,  708,  713,  718,  723,  728,  732,
+    737,  742,  747,  752,  757,  762,  767,  772,
+    777,  782,  787,  792,  797,  802,  806,  811,
+    816,  821,  826,  831,  836,  841,  846,  851,
+    855,  860,  865,  870,  875,  880,  884,  889,
+    894,  899,  904,  908,  913,  918,  923,  927,
+    932,  937,  941,  946,  951,  955,  960,  965,
+    969,  974,  978,  983,  988,  992,  997,  1001,
+    1005, 1010, 1014, 1019, 1023, 1027, 1032, 1036,
+    1040, 1045, 1049, 1053, 1057, 1061, 1066, 1070,
+    1074, 1078, 1082, 1086, 1090, 1094, 1098, 1102,
+    1106, 1109, 1113, 1117, 1121, 1125, 1128, 1132,
+    1136, 1139, 1143, 1146, 1150, 1153, 1157, 1160,
+    1164, 1167, 1170, 1174, 1177, 1180, 1183, 1186,
+    1190, 1193, 1196, 1199, 1202, 1205, 1207, 1210,
+    1213, 1216, 1219, 1221, 1224, 1227, 1229, 1232,
+    1234, 1237, 1239, 1241, 1244, 1246, 1248, 1251,
+    1253, 1255, 1257, 1259, 1261, 1263, 1265, 1267,
+    1269, 1270, 1272, 1274, 1275, 1277, 1279, 1280,
+    1282, 1283, 1284, 1286, 1287, 1288, 1290, 1291,
+    1292, 1293, 1294, 1295, 1296, 1297, 1297, 1298,
+    1299, 1300, 1300, 1301, 1302, 1302, 1303, 1303,
+    1303, 1304, 1304, 1304, 1304, 1304, 1305, 1305,
+], dtype=np.int64)
+# fmt: on
+
+# (table base, direction) for each tap, oldest sample first
+_TAPS = ((255, -1), (511, -1), (256, 1), (0, 1))
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _wrap16(data: npt.NDArray[np.int64]) -> None:
+    np.add(data, 0x8000, out=data)
+    np.bitwise_and(data, 0xFFFF, out=data)
+    np.subtract(data, 0x8000, out=data)
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class Interpolation(Enum):
+    LINEAR = auto()
+    GAUSSIAN = auto()
+
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def fold_positions(
+    idx: npt.NDArray[np.int64],
+    loop_start: int,
+    loop_len: int,
+    work: npt.NDArray[np.int64],
+    mask: npt.NDArray[np.bool_],
+) -> None:
+    """
+    Fold sample indices in place for a (possibly) looping sample
+
+    Parameters
+    ----------
+    idx : NDArray
+        Sample indices, updated in place
+    loop_start : int
+        Index of the first sample in the looped section
+    loop_len : int
+        Length of the looped section, 0 for a one-shot sample
+    work : NDArray
+        Scratch space the same shape as `idx`
+    mask : NDArray
+        Scratch space the same shape as `idx`
+
+    Notes
+    -----
+    Indices past the end of a looping sample are folded back into the loop.
+    Indices past the end of a one-shot sample are clamped to the end, which
+    the padded source reads as silence.
+    """
+    if loop_len:
+        np.subtract(idx, loop_start, out=work)
+        np.remainder(work, loop_len, out=work)
+        np.add(work, loop_start, out=work)
+        np.greater_equal(idx, loop_start, out=mask)
+        np.copyto(idx, work, where=mask)
+    else:
+        np.minimum(idx, loop_start, out=idx)
+
+
+###############################################################################
+
+
+def interpolate(
+    src: npt.NDArray[np.int64],
+    idx: npt.NDArray[np.int64],
+    frac: npt.NDArray[np.int64],
+    method: Interpolation,
+    out: npt.NDArray[np.int64],
+    work: npt.NDArray[np.int64],
+) -> None:
+    """
+    Interpolate a padded source waveform
+
+    Parameters
+    ----------
+    src : NDArray
+        Source waveform, padded with `pad_source`
+    idx : NDArray
+        Index of the source sample at or before each output position, in the
+        unpadded waveform's coordinates
+    frac : NDArray
+        Fractional part of each output position, with `FRAC_BITS` bits
+    method : Interpolation
+        Interpolation method
+    out : NDArray
+        Output, the same shape as `idx`
+    work : NDArray
+        Scratch space, with shape ``(3, len(idx))``
+
+    Notes
+    -----
+    Nothing is allocated, so this is suitable for per-frame rendering.
+    """
+    tap_idx, weight, term = work
+
+    if method == Interpolation.LINEAR:
+        # (lo * (1 - frac) + hi * frac), in fixed point
+        np.add(idx, PAD_BEFORE, out=tap_idx)
+        np.take(src, tap_idx, out=term)
+        np.subtract(2**FRAC_BITS, frac, out=weight)
+        np.multiply(term, weight, out=out)
+        np.add(tap_idx, 1, out=tap_idx)
+        np.take(src, tap_idx, out=term)
+        np.multiply(term, frac, out=term)
+        np.add(out, term, out=out)
+        np.right_shift(out, FRAC_BITS, out=out)
+        return
+
+    out[:] = 0
+    for tap, (base, direction) in enumerate(_TAPS):
+        # Table lookup on the top 8 bits of the fraction
+        np.right_shift(frac, FRAC_BITS - 8, out=weight)
+        np.multiply(weight, direction, out=weight)
+        np.add(weight, base, out=weight)
+        np.take(_GAUSS, weight, out=weight)
+
+        np.add(idx, PAD_BEFORE + tap - 1, out=tap_idx)
+        np.take(src, tap_idx, out=term)
+        np.multiply(term, weight, out=term)
+        np.right_shift(term, 11, out=term)
+        np.add(out, term, out=out)
+
+        if tap == 2:
+            _wrap16(out)
+
+    np.clip(out, -0x8000, 0x7FFF, out=out)
+    np.bitwise_and(out, ~1, out=out)
+
+
+###############################################################################
+
+
+def pad_source(
+    waveform: npt.NDArray[np.int16], loop_len: int
+) -> npt.NDArray[np.int64]:
+    """
+    Pad a waveform for interpolation
+
+    Parameters
+    ----------
+    waveform : NDArray
+        The decoded sample.  For a looping sample, this must end with exactly
+        one pass through the looped section.
+    loop_len : int
+        Number of samples in the looped section, 0 for a one-shot sample
+
+    Returns
+    -------
+    NDArray
+        The padded waveform.  Looping samples continue into the start of the
+        loop, one-shot samples continue into silence.
+    """
+    after = np.zeros(PAD_AFTER, dtype=np.int64)
+    if loop_len:
+        loop = waveform[len(waveform) - loop_len :]
+        after[:] = np.resize(loop, PAD_AFTER)
+
+    return np.concatenate(
+        (np.zeros(PAD_BEFORE, dtype=np.int64), waveform, after)
+    )
+
+
+###############################################################################
+
+
+def resample(
+    waveform: npt.NDArray[np.int16],
+    loop_len: int,
+    pitch_reg: int,
+    nsamples: int,
+    method: Interpolation = Interpolation.GAUSSIAN,
+) -> npt.NDArray[np.int16]:
+    """
+    Resample a whole waveform at once
+
+    Parameters
+    ----------
+    waveform : NDArray
+        The decoded sample.  For a looping sample, this must end with exactly
+        one pass through the looped section, which will be repeated.
+    loop_len : int
+        Number of samples in the looped section, 0 for a one-shot sample
+    pitch_reg : int
+        S-DSP pitch register setting
+    nsamples : int
+        Number of output samples
+    method : Interpolation
+        Interpolation method
+
+    Returns
+    -------
+    NDArray
+        The resampled waveform.  One-shot samples are followed by silence.
+    """
+    src = pad_source(waveform, loop_len)
+    fixed = pitch_reg * np.arange(nsamples, dtype=np.int64)
+    idx = fixed >> FRAC_BITS
+    frac = fixed & (2**FRAC_BITS - 1)
+
+    fold_positions(
+        idx,
+        len(waveform) - loop_len,
+        loop_len,
+        np.empty_like(idx),
+        np.empty(nsamples, dtype=bool),
+    )
+
+    out = np.empty(nsamples, dtype=np.int64)
+    interpolate(src, idx, frac, method, out, np.empty((3, nsamples), np.int64))
+    return out.astype(np.int16)
@@ -0,0 +1,271 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Offline S-DSP voice mixing
+
+Notes
+-----
+This renders a list of notes through the S-DSP's eight voices to a 32kHz
+stereo buffer, without building an SPC.  Each note is rendered in one
+vectorized pass (pitch, interpolation, envelope, and voice volume) and added
+into the mix, and into the echo send if the note has echo enabled.  The DSP
+clamps the mix after adding each voice, this clamps
+once after adding all of them; the two only differ when a partial sum
+overflows.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import wave
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+# Package imports
+from smw_music.common import SmwMusicException
+
+from .brr import Brr
+from .echo import EchoConfig, apply_echo
+from .interpolation import Interpolation, resample
+from .nspc import set_pitch
+from .spc700 import SAMPLE_FREQ, Envelope
+from .voice import ENV_BITS, RELEASE_STEP
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+NVOICES = 8
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Volume registers are signed 8-bit values, 0x80 is unity gain
+_VOL_BITS = 7
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _envelope(
+    samples: npt.NDArray[np.int16], keyed: int
+) -> npt.NDArray[np.int64]:
+    # Envelope while keyed, followed by a linear release to silence
+    held = np.empty(keyed, dtype=np.int64)
+    count = min(keyed, len(samples))
+    held[:count] = samples[:count]
+    held[count:] = samples[-1]
+
+    level = int(held[-1]) if keyed else 0
+    release = level - RELEASE_STEP * np.arange(
+        1, -(-level // RELEASE_STEP) + 1, dtype=np.int64
+    )
+    np.maximum(release, 0, out=release)
+
+    return np.concatenate((held, release))
+
+
+###############################################################################
+
+
+def _render(
+    note: "Note", keyed: int, method: Interpolation
+) -> npt.NDArray[np.int64]:
+    waveform, loop_len = note.brr.voice_source
+    env = _envelope(note.envelope.samples, keyed)
+
+    out = resample(
+        waveform, loop_len, note.pitch_reg, len(env), method
+    ).astype(np.int64)
+    out *= env
+    out >>= ENV_BITS
+    out &= ~1
+
+    return out
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class MixerException(SmwMusicException):
+    """Offline Mixer Exceptions."""
+
+
+###############################################################################
+
+
+@dataclass
+class Note:
+    """
+    A single note played on one of the S-DSP's voices
+
+    Parameters
+    ----------
+    brr : Brr
+        The sample played
+    envelope : Envelope
+        The voice's envelope
+    tune : int
+        N-SPC tuning value for the sample
+    note : int
+        N-SPC note number
+    start : int
+        Output sample the note is keyed on at
+    length : int
+        Number of samples the note is held before it's keyed off
+    subnote : int
+        Fractional part of the note, as in `set_pitch`
+    volume : tuple
+        The (left, right) voice volume registers (signed, -128 to 127)
+    voice : int
+        The voice the note plays on (0 to 7).  A note keyed on a voice cuts
+        off the voice's previous note.
+    echo : bool
+        True if the note is sent to the echo path
+    """
+
+    brr: Brr
+    envelope: Envelope
+    tune: int
+    note: int
+    start: int
+    length: int
+    subnote: int = 0
+    volume: tuple[int, int] = (127, 127)
+    voice: int = 0
+    echo: bool = False
+
+    ###########################################################################
+    # API property definitions
+    ###########################################################################
+
+    @property
+    def pitch_reg(self) -> int:
+        return set_pitch(self.tune, self.note, self.subnote)
+
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def mix(
+    notes: Iterable[Note],
+    nsamples: int | None = None,
+    master_vol: tuple[int, int] = (127, 127),
+    echo: EchoConfig | None = None,
+    method: Interpolation = Interpolation.GAUSSIAN,
+) -> npt.NDArray[np.int16]:
+    """
+    Render notes to a stereo buffer
+
+    Parameters
+    ----------
+    notes : Iterable
+        The notes to play
+    nsamples : int
+        Number of output samples, or None to render until the last note has
+        finished releasing (the echo tail is not included)
+    master_vol : tuple
+        The (left, right) main volume registers (signed, -128 to 127)
+    echo : EchoConfig
+        Echo settings, or None to disable echo
+    method : Interpolation
+        Interpolation method
+
+    Returns
+    -------
+    NDArray
+        (nsamples, 2) array of left and right output samples
+
+    Raises
+    ------
+    MixerException
+        If a note is on a voice that doesn't exist, or has a negative start
+        or length
+    """
+    voices: dict[int, list[Note]] = defaultdict(list)
+    for note in notes:
+        if not 0 <= note.voice < NVOICES:
+            raise MixerException(f"Invalid voice {note.voice}")
+        if note.start < 0:
+            raise MixerException(f"Invalid note start {note.start}")
+        if note.length < 0:
+            raise MixerException(f"Invalid note length {note.length}")
+        voices[note.voice].append(note)
+
+    rendered = []
+    for voice_notes in voices.values():
+        voice_notes.sort(key=lambda x: x.start)
+        starts = [note.start for note in voice_notes[1:]] + [None]
+
+        for note, cutoff in zip(voice_notes, starts):
+            out = _render(note, note.length, method)
+            if cutoff is not None:
+                # Keying the next note cuts this one off, even mid-release
+                out = out[: cutoff - note.start]
+            rendered.append((note, out))
+
+    if nsamples is None:
+        nsamples = max(
+            (note.start + len(out) for note, out in rendered), default=0
+        )
+
+    main = np.zeros((nsamples, 2), dtype=np.int64)
+    send = np.zeros((nsamples, 2), dtype=np.int64)
+    for note, out in rendered:
+        out = out[: max(nsamples - note.start, 0)]
+        end = note.start + len(out)
+        for chan, vol in enumerate(note.volume):
+            amp = (out * vol) >> _VOL_BITS
+            main[note.start : end, chan] += amp
+            if note.echo:
+                send[note.start : end, chan] += amp
+
+    np.clip(main, -0x8000, 0x7FFF, out=main)
+    main *= master_vol
+    main >>= _VOL_BITS
+
+    if echo is not None:
+        np.clip(send, -0x8000, 0x7FFF, out=send)
+        main += apply_echo(send, echo)
+
+    return np.clip(main, -0x8000, 0x7FFF).astype(np.int16)
+
+
+###############################################################################
+
+
+def write_wav(fname: Path, data: npt.NDArray[np.int16]) -> None:
+    """
+    Write a rendered stereo buffer to a WAV file
+
+    Parameters
+    ----------
+    fname : Path
+        Output file name
+    data : NDArray
+        (nsamples, 2) array of left and right samples, as from `mix`
+    """
+    with wave.open(str(fname), "wb") as fobj:
+        fobj.setnchannels(2)  # pylint: disable=no-member
+        fobj.setsampwidth(2)  # pylint: disable=no-member
+        fobj.setframerate(SAMPLE_FREQ)  # pylint: disable=no-member
+        fobj.writeframes(  # pylint: disable=no-member
+            data.astype("<i2").tobytes()
+        )
@@ -11,6 +11,13 @@ Logic related to the N-SPC SPC700 music engine
 # Imports
 ###############################################################################
 
+# Standard library imports
+from functools import cache
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
 from .spc700 import PITCH_REG_SCALE
 
 ###############################################################################
@@ -34,6 +41,36 @@ _PITCH_TABLE = [
     0x10BE,
 ]
 
+# Number of notes the pitch table covers (6 octaves, higher notes would shift
+# left)
+_NNOTES = 72
+
+# Number of subnote steps between notes
+_NSUBNOTES = 256
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+@cache
+def _note_pitches() -> npt.NDArray[np.int64]:
+    # Untuned pitch register for every (note, subnote), the same calculation
+    # as set_pitch
+    octave, idx = np.divmod(np.arange(_NNOTES), 12)
+    table = np.array(_PITCH_TABLE, dtype=np.int64)
+    delta = table[idx + 1] - table[idx]
+
+    subnotes = np.arange(_NSUBNOTES)
+    rv = table[idx, None] + ((subnotes * delta[:, None]) >> 8)
+    rv >>= (5 - octave)[:, None]
+
+    rv.setflags(write=False)
+    return rv
+
+
+###############################################################################
+# API function definitions
 ###############################################################################
 
 
@@ -90,6 +127,40 @@ def calc_tune(fundamental: float, note: int, freq: float) -> tuple[int, float]:
 ###############################################################################
 
 
+def calc_tunes(
+    fundamental: npt.ArrayLike, note: npt.ArrayLike, freq: npt.ArrayLike
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.double]]:
+    """
+    Array version of `calc_tune`
+
+    Parameters
+    ----------
+    fundamental : ArrayLike
+        The fundamental frequencies of the samples
+    note : ArrayLike
+        The desired N-SPC note commands
+    freq : ArrayLike
+        The desired audio frequencies generated when `note` is keyed
+
+    Returns
+    -------
+    tuple
+        The "tune" values and actual frequencies, as in `calc_tune`, with the
+        broadcast shape of the inputs
+    """
+    fundamental = np.asarray(fundamental, dtype=np.double)
+    pitch = set_pitches(256, note)
+
+    tune = np.rint(256 * PITCH_REG_SCALE * (freq / fundamental) / pitch)
+    tune = tune.astype(np.int64)
+    actual = fundamental * (tune / 256) * pitch / PITCH_REG_SCALE
+
+    return tune, actual
+
+
+###############################################################################
+
+
 def midi_to_nspc(midi_number: int) -> int:
     """
     Convert a midi note number to an N-SPC command number
@@ -151,3 +222,40 @@ def set_pitch(tune: int, note: int, subnote: int = 0) -> int:
     pitch >>= 5 - octave
 
     return pitch * tune >> 8
+
+
+###############################################################################
+
+
+def set_pitches(
+    tune: npt.ArrayLike, note: npt.ArrayLike, subnote: npt.ArrayLike = 0
+) -> npt.NDArray[np.int64]:
+    """
+    Array version of `set_pitch`
+
+    Parameters
+    ----------
+    tune : ArrayLike
+        N-SPC BRR prescalars
+    note : ArrayLike
+        N-SPC note numbers
+    subnote : ArrayLike
+        Fractional parts of the input notes when treated as Q15.8 numbers
+        (0-255)
+
+    Returns
+    -------
+    NDArray
+        SPC700 pitch register settings, with the broadcast shape of the inputs
+
+    Notes
+    -----
+    The untuned pitch for every note and subnote is tabulated once, so this is
+    a table lookup and a multiply.  Use `numpy.ix_` to get every combination
+    of a set of tunes, notes, and subnotes in one call.
+    """
+    note = 0x7F & np.asarray(note, dtype=np.int64)
+    if np.any(note >= _NNOTES):
+        raise ValueError(f"Notes must be below {_NNOTES} (after masking)")
+
+    return (_note_pitches()[note, subnote] * np.asarray(tune)) >> 8
@@ -0,0 +1,337 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Pitch estimation for samples
+
+Notes
+-----
+A looping sample repeats its loop forever, so it's periodic in the loop
+length and its spectrum only has energy at multiples of ``fs / loop_len``.
+Analyzing one pass of the loop (circularly) gives the same answer as
+unrolling it many times, without the cost.  One-shot samples are analyzed in
+full.
+
+Three estimators are available:
+
+* `PitchMethod.FFT` picks the lowest harmonic within 12dB of the strongest
+  one, which is what `Brr.fundamental` always did.  It's the default, so
+  automatic tuning doesn't change under existing projects.
+* `PitchMethod.HPS` is the harmonic product spectrum [1]_, which finds the
+  frequency whose harmonics are strongest together, so it doesn't need a
+  strong fundamental.  Missing harmonics are floored so one gap doesn't
+  zero out the product, and ties go to the highest candidate so pure tones
+  aren't mistaken for their subharmonics.
+* `PitchMethod.YIN` is the YIN estimator [2]_, which works in the time
+  domain and isn't limited to the spectrum's bin spacing.
+
+The confidence for FFT and HPS estimates is the fraction of the signal's
+energy in harmonics of the estimate.  For YIN it's one minus the cumulative
+mean normalized difference at the chosen lag.
+
+.. [1] M. R. Schroeder, "Period Histogram and Product Spectrum: New Methods
+       for Fundamental-Frequency Measurement," JASA 43(4), 1968.
+
+.. [2] A. de Cheveigné and H. Kawahara, "YIN, a fundamental frequency
+       estimator for speech and music," JASA 111(4), 2002.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from dataclasses import dataclass
+from enum import IntEnum, auto
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+from .spc700 import SAMPLE_FREQ
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Lowest relative magnitude for a harmonic to be picked by the FFT method
+_FFT_THRESHOLD = 0.25
+
+# Relative magnitude missing harmonics are floored to by the HPS method
+_HPS_FLOOR = 0.01
+
+# Harmonics multiplied together by the HPS method
+_HPS_HARMONICS = 5
+
+# Log score within which HPS candidates are treated as ties
+_HPS_TOLERANCE = np.log(2)
+
+# Shortest period the YIN method considers, in samples
+_YIN_MIN_LAG = 2
+
+# Dip in the YIN difference function accepted as a period
+_YIN_THRESHOLD = 0.15
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class PitchMethod(IntEnum):
+    FFT = auto()
+    HPS = auto()
+    YIN = auto()
+
+
+###############################################################################
+
+
+@dataclass(frozen=True)
+class PitchEstimate:
+    """
+    An estimated fundamental frequency
+
+    Attributes
+    ----------
+    frequency : float
+        The fundamental frequency, in Hz
+    confidence : float
+        How well the signal fits the estimate, from 0 (not at all) to 1
+        (perfectly)
+    """
+
+    frequency: float
+    confidence: float
+
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _fft(spec: npt.NDArray[np.double], periodic: bool) -> int:
+    if periodic:
+        # Every bin is a harmonic of the loop, which made every nonzero bin a
+        # peak when the loop was unrolled
+        (peaks,) = np.nonzero(spec[1:] >= _FFT_THRESHOLD)
+        peaks += 1
+    else:
+        # Deferred, scipy is only needed for one-shot samples
+        from scipy.signal import find_peaks  # type: ignore  # isort: skip
+
+        peaks, _ = find_peaks(spec, height=_FFT_THRESHOLD)
+
+    if not len(peaks):
+        raise ValueError("No fundamental found")
+    return int(peaks[0])
+
+
+###############################################################################
+
+
+def _harmonicity(spec: npt.NDArray[np.double], fbin: int, tol: int) -> float:
+    # Fraction of the energy (DC excluded) within `tol` bins of a harmonic
+    power = spec**2
+    total = power[1:].sum()
+
+    centers = np.arange(fbin, len(spec), fbin)
+    mask = np.zeros(len(spec), dtype=bool)
+    for offset in range(-tol, tol + 1):
+        idx = centers + offset
+        mask[idx[(idx > 0) & (idx < len(spec))]] = True
+
+    return float(power[mask].sum() / total)
+
+
+###############################################################################
+
+
+def _hps(spec: npt.NDArray[np.double], periodic: bool) -> int:
+    if not periodic:
+        # One-shot harmonics can land a bin away from an exact multiple
+        spec = np.maximum(spec, np.roll(spec, 1))
+        spec = np.maximum(spec, np.roll(spec, -1))
+
+    # Sum of logs rather than a product, with missing harmonics floored so
+    # one missing harmonic doesn't rule a candidate out
+    logs = np.log(np.maximum(spec, _HPS_FLOOR))
+    nbins = -(-len(spec) // _HPS_HARMONICS)
+    score = logs[:nbins].copy()
+    for harmonic in range(2, _HPS_HARMONICS + 1):
+        decimated = logs[::harmonic][:nbins]
+        score[: len(decimated)] += decimated
+        score[len(decimated) :] += np.log(_HPS_FLOOR)
+
+    # Ignore DC.  Subharmonics of a pure tone score the same as the tone, so
+    # take the highest candidate that's about as good as the best.
+    score[0] = -np.inf
+    (candidates,) = np.nonzero(score >= score.max() - _HPS_TOLERANCE)
+    return int(candidates[-1])
+
+
+###############################################################################
+
+
+def _segment(
+    waveform: npt.ArrayLike, loop_len: int
+) -> tuple[npt.NDArray[np.double], bool]:
+    data = np.asarray(waveform, dtype=np.double)
+    if loop_len:
+        data = data[-loop_len:]
+    if not len(data):
+        raise ValueError("Empty waveform")
+
+    # Remove any DC bias
+    return data - data.mean(), bool(loop_len)
+
+
+###############################################################################
+
+
+def _yin(data: npt.NDArray[np.double], periodic: bool) -> tuple[float, float]:
+    nsamples = len(data)
+    nfft = 2 * nsamples
+    if periodic:
+        # Circular difference function, lags 0 to the loop length (which is
+        # always a perfect match)
+        spec = np.fft.rfft(data)
+        corr = np.fft.irfft(np.abs(spec) ** 2, nsamples)
+        diff = np.append(2 * (corr[0] - corr), 0)
+    else:
+        # Difference function over a window of half the sample, lags up to
+        # half the sample
+        window = nsamples // 2
+        spec = np.fft.rfft(data, nfft)
+        wspec = np.fft.rfft(data[:window], nfft)
+        corr = np.fft.irfft(spec * np.conj(wspec), nfft)[: window + 1]
+
+        energy = np.concatenate(([0], np.cumsum(data**2)))
+        lagged = energy[window : window + window + 1] - energy[: window + 1]
+        diff = energy[window] + lagged - 2 * corr
+
+    # Cumulative mean normalized difference
+    cumulative = np.cumsum(diff[1:])
+    if len(diff) <= _YIN_MIN_LAG or not cumulative[-1] > 0:
+        raise ValueError("No fundamental found")
+
+    cmnd = np.ones_like(diff)
+    lags = np.arange(1, len(diff))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmnd[1:] = np.where(cumulative > 0, diff[1:] * lags / cumulative, 1.0)
+
+    (below,) = np.nonzero(cmnd[_YIN_MIN_LAG:] < _YIN_THRESHOLD)
+    if len(below):
+        lag = _YIN_MIN_LAG + int(below[0])
+        # Slide to the bottom of the dip
+        while lag + 1 < len(cmnd) and cmnd[lag + 1] < cmnd[lag]:
+            lag += 1
+    else:
+        lag = _YIN_MIN_LAG + int(np.argmin(cmnd[_YIN_MIN_LAG:]))
+
+    # Parabolic interpolation between lags
+    period = float(lag)
+    if 0 < lag < len(cmnd) - 1:
+        left, mid, right = cmnd[lag - 1 : lag + 2]
+        denom = left - 2 * mid + right
+        if denom > 0:
+            period += 0.5 * (left - right) / denom
+
+    confidence = float(np.clip(1 - cmnd[lag], 0, 1))
+    return period, confidence
+
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def estimate_pitch(
+    waveform: npt.ArrayLike,
+    loop_len: int = 0,
+    method: PitchMethod = PitchMethod.FFT,
+    sample_freq: float = SAMPLE_FREQ,
+) -> PitchEstimate:
+    """
+    Estimate a sample's fundamental frequency
+
+    Parameters
+    ----------
+    waveform : ArrayLike
+        Sample values
+    loop_len : int
+        Length of the loop at the end of `waveform`, or 0 for a one-shot
+        sample.  Only the loop is analyzed.
+    method : PitchMethod
+        Estimation method
+    sample_freq : float
+        Sample frequency, in Hz
+
+    Returns
+    -------
+    PitchEstimate
+        The fundamental frequency and confidence in it
+
+    Raises
+    ------
+    ValueError
+        If the sample is silent or no fundamental is found
+    """
+    data, periodic = _segment(waveform, loop_len)
+
+    if method == PitchMethod.YIN:
+        period, confidence = _yin(data, periodic)
+        return PitchEstimate(float(sample_freq / period), confidence)
+
+    spec = np.abs(np.fft.rfft(data))
+    peak = spec.max()
+    if not peak > 0:
+        raise ValueError("No fundamental found")
+    spec /= peak
+
+    if method == PitchMethod.FFT:
+        fbin = _fft(spec, periodic)
+    else:
+        fbin = _hps(spec, periodic)
+    # One-shot harmonics smear across neighboring bins
+    confidence = _harmonicity(spec, fbin, 0 if periodic else 1)
+
+    return PitchEstimate(sample_freq * fbin / len(data), confidence)
+
+
+###############################################################################
+
+
+def magnitude_spectrum(
+    waveform: npt.ArrayLike, loop_len: int = 0
+) -> npt.NDArray[np.double]:
+    """
+    Normalized magnitude spectrum of a sample
+
+    Parameters
+    ----------
+    waveform : ArrayLike
+        Sample values
+    loop_len : int
+        Length of the loop at the end of `waveform`, or 0 for a one-shot
+        sample.  Only the loop is analyzed.
+
+    Returns
+    -------
+    NDArray
+        Magnitudes relative to the largest, with the DC bias removed.  Bins
+        are evenly spaced from 0 to Nyquist, ``sample_freq / n`` apart for an
+        analyzed length of ``n``.
+
+    Raises
+    ------
+    ValueError
+        If the sample is silent
+    """
+    data, _ = _segment(waveform, loop_len)
+    spec = np.abs(np.fft.rfft(data))
+    peak = spec.max()
+    if not peak > 0:
+        raise ValueError("Silent sample")
+    return spec / peak
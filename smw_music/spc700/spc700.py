@@ -5,6 +5,14 @@
 
 """
 Logic related to the SPC700 chip
+
+Notes
+-----
+The sample-accurate envelope generator follows the S-DSP's envelope logic as
+documented in [1]_.
+
+.. [1] Fullsnes - Nocash SNES Specs, "SNES APU DSP ADSR/Gain Envelope".
+       https://problemkaputt.de/fullsnes.htm#snesapudspadsrgainenvelope
 """
 
 ###############################################################################
@@ -14,6 +22,7 @@ Logic related to the SPC700 chip
 # Standard library imports
 from dataclasses import dataclass
 from enum import IntEnum, auto
+from functools import lru_cache
 
 # Library imports
 import numpy as np
@@ -33,6 +42,8 @@ SAMPLE_FREQ = 32000
 # fmt: off
 _LIMIT = 2**11 - 1
 
+_ENVELOPE_CACHE_SIZE = 32
+
 _MAX_COUNT = 0x77ff
 
 _MAX_SECS = 38
@@ -49,17 +60,53 @@ _OFFSETS = [0,   0, 1040,
             536, 0, 1040,
             0,   0]
 
+# Large enough to hold every GAIN setting and a good chunk of the ADSR space
+_PLOT_CACHE_SIZE = 4096
+
 _RATES = [2**32,   # "infinity"
           2048, 1536, 1280, 1024, 768, 640, 512, 384, 320, 256, 192, 160,
           128, 96, 80, 64, 48, 40, 32, 24, 20, 16, 12, 10, 8, 6, 5, 4, 3, 2, 1]
 
 # fmt: on
 
+###############################################################################
+# Private class definitions
+###############################################################################
+
+
+class _EnvPhase(IntEnum):
+    ATTACK = auto()
+    DECAY = auto()
+    SUSTAIN = auto()
+    GAIN = auto()
+
+
 ###############################################################################
 # Private function definitions
 ###############################################################################
 
 
+def _next_event(rate: int, sample: int) -> int:
+    # The global rate counter counts down from 0 at key-on, and a rate's
+    # event fires when the counter plus the rate's offset is a multiple of the
+    # rate's period.  All of the periods divide the counter's range, so events
+    # are periodic in the sample count.
+    period = _RATES[rate]
+    return sample + (_OFFSETS[rate] - sample) % period
+
+
+###############################################################################
+
+
+def _freeze(plot: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    # Plots are cached and shared between callers, so they must not change
+    plot.setflags(write=False)
+    return plot
+
+
+###############################################################################
+
+
 def _time_to_str(tval: float) -> str:
     if tval < 1:
         rv = f"{int(1000*tval)}ms"
@@ -73,6 +120,7 @@ def _time_to_str(tval: float) -> str:
 ###############################################################################
 
 
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_adsr(
     attack_reg: int,
     decay_reg: int,
@@ -132,7 +180,7 @@ def generate_adsr(
     times.append(100)
     envelope.append(envelope[-1])
 
-    plot = np.array((times, envelope))
+    plot = _freeze(np.array((times, envelope)))
 
     return (
         plot,
@@ -144,6 +192,7 @@ def generate_adsr(
 ###############################################################################
 
 
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_decexp(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
     times = [0.0]
     envelope = [1.0]
@@ -164,7 +213,7 @@ def generate_decexp(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
 
     times.append(100)
     envelope.append(envelope[-1])
-    plot = np.array((times, envelope))
+    plot = _freeze(np.array((times, envelope)))
 
     return (plot, rv)
 
@@ -172,6 +221,7 @@ def generate_decexp(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
 ###############################################################################
 
 
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_declin(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
     times = [0.0, 0.0, 100]
     envelope = [1, 0, 0]
@@ -184,18 +234,19 @@ def generate_declin(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
         envelope[1] = 1
         envelope[2] = 1
 
-    plot = np.array((times, envelope))
+    plot = _freeze(np.array((times, envelope)))
     return (plot, rv)
 
 
 ###############################################################################
 
 
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_direct_gain(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
     gain = (gain_reg << 4) / _LIMIT
     rv = f"{100*(gain_reg)/(_LIMIT >> 4):.2f}%"
 
-    plot = np.array(([0, 100], [gain, gain]))
+    plot = _freeze(np.array(([0, 100], [gain, gain])))
 
     return (plot, rv)
 
@@ -203,6 +254,116 @@ def generate_direct_gain(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
 ###############################################################################
 
 
+@lru_cache(maxsize=_ENVELOPE_CACHE_SIZE)
+def generate_envelope(
+    adsr1_reg: int, adsr2_reg: int, gain_reg: int
+) -> npt.NDArray[np.int16]:
+    """
+    Generate the S-DSP's per-sample envelope following a key-on
+
+    Parameters
+    ----------
+    adsr1_reg : int
+        ADSR1 register
+    adsr2_reg : int
+        ADSR2 register
+    gain_reg : int
+        GAIN register
+
+    Returns
+    -------
+    NDArray
+        The 11-bit envelope level for each output sample, up to the point
+        where it stops changing.  The envelope holds the last value forever
+        after that.  The array is read-only and shared between callers.
+
+    Notes
+    -----
+    The DSP recomputes the envelope every sample but only commits it when
+    the active rate's counter fires, while phase changes are decided on the
+    uncommitted value every sample.  Both only depend on the committed level,
+    the phase, and the previous uncommitted level, so this steps from event
+    to event and only visits individual samples around a change.
+    """
+    slevel = adsr2_reg >> 5
+    gain_mode = gain_reg >> 5
+
+    phase = _EnvPhase.ATTACK if adsr1_reg & 0x80 else _EnvPhase.GAIN
+    env = hidden = 0
+    sample = 0
+
+    # Sample number and level for every change in the envelope
+    times = [0]
+    levels = [0]
+
+    while True:
+        match phase:
+            case _EnvPhase.ATTACK:
+                rate = 2 * (adsr1_reg & 0xF) + 1
+                new_env = env + (0x20 if rate < 31 else 0x400)
+            case _EnvPhase.DECAY | _EnvPhase.SUSTAIN:
+                if phase == _EnvPhase.DECAY:
+                    rate = 2 * ((adsr1_reg >> 4) & 0x7) + 16
+                else:
+                    rate = adsr2_reg & 0x1F
+                new_env = env - 1
+                new_env -= new_env >> 8
+            case _EnvPhase.GAIN if gain_mode < 4:
+                rate = 31
+                new_env = gain_reg << 4
+            case _EnvPhase.GAIN:
+                rate = gain_reg & 0x1F
+                if gain_mode == 4:
+                    new_env = env - 0x20
+                elif gain_mode == 5:
+                    new_env = env - 1
+                    new_env -= new_env >> 8
+                elif gain_mode == 7 and hidden >= 0x600:
+                    new_env = env + 0x8
+                else:
+                    new_env = env + 0x20
+
+        new_phase = phase
+        if phase == _EnvPhase.DECAY and (new_env >> 8) == slevel:
+            new_phase = _EnvPhase.SUSTAIN
+
+        new_hidden = new_env
+        if not 0 <= new_env <= _LIMIT:
+            new_env = min(max(new_env, 0), _LIMIT)
+            if phase == _EnvPhase.ATTACK:
+                new_phase = _EnvPhase.DECAY
+
+        # Rate 0 never fires
+        fires = bool(rate) and _next_event(rate, sample) == sample
+        if fires and new_env != env:
+            env = new_env
+            times.append(sample)
+            levels.append(env)
+
+        changed = (new_phase, new_hidden) != (phase, hidden) or (
+            fires and times[-1] == sample
+        )
+        phase, hidden = new_phase, new_hidden
+
+        if changed:
+            sample += 1
+        elif rate == 0 or fires:
+            # Either nothing will ever fire again, or it fired and nothing
+            # changed: the envelope has settled
+            break
+        else:
+            sample = _next_event(rate, sample + 1)
+
+    times.append(times[-1] + 1)
+    rv = np.repeat(np.array(levels, dtype=np.int16), np.diff(times))
+    rv.setflags(write=False)
+    return rv
+
+
+###############################################################################
+
+
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_incbent(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
     times = [0.0, 0.0, 0.0, 100]
     envelope = [0, 0.75, 1, 1]
@@ -219,13 +380,14 @@ def generate_incbent(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
         envelope[2] = 0
         envelope[3] = 0
 
-    plot = np.array((times, envelope))
+    plot = _freeze(np.array((times, envelope)))
     return (plot, rv)
 
 
 ###############################################################################
 
 
+@lru_cache(maxsize=_PLOT_CACHE_SIZE)
 def generate_inclin(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
     times = [0.0, 0.0, 100]
     envelope = [0, 1, 1]
@@ -239,7 +401,7 @@ def generate_inclin(gain_reg: int) -> tuple[npt.NDArray[np.double], str]:
         envelope[1] = 0
         envelope[2] = 0
 
-    plot = np.array((times, envelope))
+    plot = _freeze(np.array((times, envelope)))
 
     return (plot, rv)
 
@@ -390,3 +552,10 @@ class Envelope:
                 rv = 0xA0 | self.gain_setting
 
         return rv
+
+    ###########################################################################
+
+    @property
+    def samples(self) -> npt.NDArray[np.int16]:
+        """Per-sample 11-bit envelope, see `generate_envelope`."""
+        return generate_envelope(self.adsr1_reg, self.adsr2_reg, self.gain_reg)
@@ -0,0 +1,231 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+SPC file access
+
+Notes
+-----
+The SPC file layout and ID666 tag format are documented in [1]_.  Everything
+except the ID666 tags is exposed as a NumPy view into the file's buffer, so
+opening a file with `SpcFile.from_file` memory-maps it and nothing is copied
+until it's used.
+
+.. [1] SPC File Format - SNESdev Wiki.
+       https://snes.nesdev.org/wiki/SPC_file_format
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import mmap
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+# Package imports
+from smw_music.common import SmwMusicException
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+ARAM_SIZE = 0x10000
+
+MAGIC = b"SNES-SPC700 Sound File Data v0.30\x1a\x1a"
+
+# Start and loop address for each sample directory entry
+SAMPLE_DIR_DTYPE = np.dtype([("start", "<u2"), ("loop", "<u2")])
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_ARAM_OFFSET = 0x100
+
+_DIR_REG = 0x5D
+
+_DSP_OFFSET = 0x10100
+
+_DSP_SIZE = 0x80
+
+_HAS_ID666 = 0x1A
+
+# Header, ARAM, DSP registers, and the unused/IPL ROM area
+_MIN_SIZE = 0x10200
+
+# The sample directory has up to 256 entries
+_SAMPLE_DIR_ENTRIES = 0x100
+
+# (field, offset, length) for text format ID666 tags
+_TAGS = (
+    ("song", 0x2E, 32),
+    ("game", 0x4E, 32),
+    ("dumper", 0x6E, 16),
+    ("comments", 0x7E, 32),
+    ("date", 0x9E, 11),
+    ("length", 0xA9, 3),
+    ("fade", 0xAC, 5),
+    ("artist", 0xB1, 32),
+)
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _text(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode("latin-1").strip()
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class SpcException(SmwMusicException):
+    """SPC File Exceptions."""
+
+
+###############################################################################
+
+
+@dataclass
+class Id666:
+    """
+    ID666 tags from an SPC file's header
+
+    Only the text format is decoded; length and fade are left as text.
+    """
+
+    song: str = ""
+    game: str = ""
+    dumper: str = ""
+    comments: str = ""
+    date: str = ""
+    length: str = ""
+    fade: str = ""
+    artist: str = ""
+
+
+###############################################################################
+
+
+class SpcFile:
+    """
+    An SPC file
+
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview, or mmap
+        The file's contents.  This is used in place, not copied.
+
+    Raises
+    ------
+    SpcException
+        If `data` is too short or isn't an SPC file
+    """
+
+    _buf: memoryview
+
+    ###########################################################################
+
+    def __init__(self, data: bytes | bytearray | memoryview | mmap.mmap):
+        self._buf = memoryview(data).cast("B")
+
+        if self._buf[: len(MAGIC)] != MAGIC:
+            raise SpcException("Not an SPC file")
+        if len(self._buf) < _MIN_SIZE:
+            raise SpcException("Truncated SPC file")
+
+    ###########################################################################
+    # API constructor definitions
+    ###########################################################################
+
+    @classmethod
+    def from_file(cls, fname: Path) -> "SpcFile":
+        with open(fname, "rb") as fobj:
+            # The mapping outlives the file object
+            try:
+                data = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:
+                raise SpcException(f"Could not map {fname}") from exc
+        return cls(data)
+
+    ###########################################################################
+    # API property definitions
+    ###########################################################################
+
+    @cached_property
+    def aram(self) -> npt.NDArray[np.uint8]:
+        """The 64KiB of audio RAM."""
+        return np.frombuffer(
+            self._buf, np.uint8, ARAM_SIZE, offset=_ARAM_OFFSET
+        )
+
+    ###########################################################################
+
+    @cached_property
+    def dsp_regs(self) -> npt.NDArray[np.uint8]:
+        """The 128 S-DSP registers."""
+        return np.frombuffer(
+            self._buf, np.uint8, _DSP_SIZE, offset=_DSP_OFFSET
+        )
+
+    ###########################################################################
+
+    @property
+    def header(self) -> memoryview:
+        """The raw 256-byte header."""
+        return self._buf[:_ARAM_OFFSET]
+
+    ###########################################################################
+
+    @cached_property
+    def id666(self) -> Id666 | None:
+        """The header's ID666 tags, or None if it doesn't have any."""
+        if self._buf[len(MAGIC)] != _HAS_ID666:
+            return None
+
+        return Id666(
+            **{
+                name: _text(self._buf[offset : offset + length].tobytes())
+                for name, offset, length in _TAGS
+            }
+        )
+
+    ###########################################################################
+
+    @property
+    def sample_dir(self) -> npt.NDArray[np.void]:
+        """
+        The sample directory, as a view of `SAMPLE_DIR_DTYPE` entries
+
+        The directory is cut short if it runs off the end of ARAM.
+        """
+        offset = self.sample_dir_offset
+        nentries = min(
+            _SAMPLE_DIR_ENTRIES,
+            (ARAM_SIZE - offset) // SAMPLE_DIR_DTYPE.itemsize,
+        )
+        return np.frombuffer(
+            self._buf,
+            SAMPLE_DIR_DTYPE,
+            nentries,
+            offset=_ARAM_OFFSET + offset,
+        )
+
+    ###########################################################################
+
+    @property
+    def sample_dir_offset(self) -> int:
+        """ARAM address of the sample directory (DIR register)."""
+        return 0x100 * int(self.dsp_regs[_DIR_REG])
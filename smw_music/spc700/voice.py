@@ -0,0 +1,225 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Streaming pitched-voice rendering
+
+Notes
+-----
+Pitch is applied the way the S-DSP does it, by adding the pitch register to a
+position counter with 12 fractional bits once per output sample.  Samples are
+interpolated with the S-DSP's gaussian filter by default, and scaled by the
+sample-accurate envelope from `generate_envelope`.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from collections.abc import Iterator
+
+# Library imports
+import numpy as np
+import numpy.typing as npt
+
+from .interpolation import (
+    FRAC_BITS,
+    Interpolation,
+    fold_positions,
+    interpolate,
+    pad_source,
+)
+from .spc700 import Envelope
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+# Envelope bits
+ENV_BITS = 11
+
+# Envelope release rate, in envelope steps per output sample
+RELEASE_STEP = 8
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class Voice:
+    """
+    A single keyed voice, rendered one frame at a time
+
+    Parameters
+    ----------
+    waveform : NDArray
+        The decoded sample.  For a looping sample, this must end with exactly
+        one pass through the looped section, which will be repeated.
+    loop_len : int
+        Number of samples in the looped section, 0 for a one-shot sample
+    pitch_reg : int
+        S-DSP pitch register setting
+    env : Envelope
+        Envelope applied while the voice is keyed
+    samples_per_frame : int
+        Number of output samples per frame
+    nframes : int
+        Number of frames in the output ring buffer
+    method : Interpolation
+        Interpolation method
+
+    Notes
+    -----
+    All working storage is allocated up front, so rendering a frame does not
+    allocate any arrays.  Frames are views into a ring buffer of `nframes`
+    frames and are overwritten `nframes` renders later; copy them if they need
+    to live longer than that.
+    """
+
+    _ring: npt.NDArray[np.int16]
+    _slot: int
+
+    ###########################################################################
+
+    def __init__(
+        self,
+        waveform: npt.NDArray[np.int16],
+        loop_len: int,
+        pitch_reg: int,
+        env: Envelope,
+        samples_per_frame: int = 1024,
+        nframes: int = 4,
+        method: Interpolation = Interpolation.GAUSSIAN,
+    ) -> None:
+        self._loop_len = loop_len
+        self._loop_start = len(waveform) - loop_len
+        self._pitch = pitch_reg
+        self._method = method
+
+        self._src = pad_source(waveform, loop_len)
+        self._end = len(waveform)
+
+        self._pos = 0
+        self._time = 0
+        self._keyed = True
+        self._done = False
+
+        # Shared and read-only, never written to
+        self._env_curve = env.samples
+        self._env_final = int(self._env_curve[-1])
+        self._level = 0
+
+        n = samples_per_frame
+        self._ring = np.zeros((nframes, n), dtype=np.int16)
+        self._slot = 0
+
+        self._steps = pitch_reg * np.arange(n, dtype=np.int64)
+        self._release = RELEASE_STEP * np.arange(1, n + 1, dtype=np.int64)
+        self._idx = np.empty(n, dtype=np.int64)
+        self._frac = np.empty(n, dtype=np.int64)
+        self._mask = np.empty(n, dtype=bool)
+        self._interp = np.empty(n, dtype=np.int64)
+        self._work = np.empty((3, n), dtype=np.int64)
+        self._env = np.empty(n, dtype=np.int64)
+
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def keyoff(self) -> None:
+        self._keyed = False
+
+    ###########################################################################
+
+    def render(self) -> npt.NDArray[np.int16] | None:
+        """
+        Render the next frame
+
+        Returns
+        -------
+        NDArray
+            The next frame, or None if the voice has finished
+        """
+        if self._done:
+            return None
+
+        self._positions()
+        interpolate(
+            self._src,
+            self._idx,
+            self._frac,
+            self._method,
+            self._interp,
+            self._work,
+        )
+        self._envelope()
+
+        slot = self._ring[self._slot]
+        self._slot = (self._slot + 1) % len(self._ring)
+
+        # Apply the envelope the way the DSP does, dropping the low bit
+        np.multiply(self._interp, self._env, out=self._interp)
+        np.right_shift(self._interp, ENV_BITS, out=self._interp)
+        np.bitwise_and(self._interp, ~1, out=self._interp)
+        np.copyto(slot, self._interp, casting="unsafe")
+
+        return slot
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _envelope(self) -> None:
+        if self._keyed:
+            start = self._time
+            count = max(0, min(len(self._env), len(self._env_curve) - start))
+            self._env[:count] = self._env_curve[start : start + count]
+            self._env[count:] = self._env_final
+        else:
+            # Linear release from wherever the envelope was at keyoff
+            np.subtract(self._level, self._release, out=self._env)
+            np.maximum(self._env, 0, out=self._env)
+            if not self._env[-1]:
+                self._done = True
+
+        self._level = int(self._env[-1])
+        self._time += len(self._env)
+
+    ###########################################################################
+
+    def _positions(self) -> None:
+        np.add(self._steps, self._pos, out=self._idx)
+        np.bitwise_and(self._idx, 2**FRAC_BITS - 1, out=self._frac)
+        np.right_shift(self._idx, FRAC_BITS, out=self._idx)
+
+        self._pos += len(self._steps) * self._pitch
+
+        fold_positions(
+            self._idx,
+            self._loop_start,
+            self._loop_len,
+            self._work[0],
+            self._mask,
+        )
+
+        if self._loop_len:
+            # Keep the position counter from growing without bound
+            wraps = ((self._pos >> FRAC_BITS) - self._loop_start) // (
+                self._loop_len
+            )
+            if wraps > 0:
+                self._pos -= (wraps * self._loop_len) << FRAC_BITS
+        elif self._idx[-1] >= self._end:
+            self._done = True
+
+    ###########################################################################
+    # Data model methods
+    ###########################################################################
+
+    def __iter__(self) -> Iterator[npt.NDArray[np.int16]]:
+        while (frame := self.render()) is not None:
+            yield frame
@@ -19,6 +19,16 @@ from .instrument import (
     extract_instruments,
     unmapped_notes,
 )
+from .pack_index import PackIndex
+from .pack_tuning import (
+    PACK_TUNING_FNAME,
+    SampleTuning,
+    analyze_packs,
+    load_pack_tunings,
+    save_pack_tunings,
+    tune_binary,
+    tune_sample,
+)
 from .preferences import Preferences
 from .project import (
     EXTENSION,
@@ -31,8 +41,11 @@ from .sample import Sample, SamplePack, SampleParams
 from .spcmw import (
     create_project,
     first_use,
+    get_brr_library,
+    get_pack_index,
     get_preferences,
     get_recent_projects,
+    get_score_cache,
     save_preferences,
     save_recent_projects,
 )
@@ -53,6 +66,14 @@ __all__ = [
     "Tuning",
     "extract_instruments",
     "unmapped_notes",
+    "PackIndex",
+    "PACK_TUNING_FNAME",
+    "SampleTuning",
+    "analyze_packs",
+    "load_pack_tunings",
+    "save_pack_tunings",
+    "tune_binary",
+    "tune_sample",
     "Preferences",
     "ProjectInfo",
     "ProjectSettings",
@@ -64,8 +85,11 @@ __all__ = [
     "SampleParams",
     "create_project",
     "first_use",
+    "get_brr_library",
+    "get_pack_index",
     "get_preferences",
     "get_recent_projects",
+    "get_score_cache",
     "save_preferences",
     "save_recent_projects",
 ]
@@ -0,0 +1,323 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""
+Persistent sample pack index.
+
+Notes
+-----
+Each pack's entry records what loading it found (sample paths, pattern
+parameters, and sizes) along with each sample's automatic tuning and digest.
+An entry is reused as long as the zip file's size and modification time
+match.  If they don't, but the file's hash does (it was copied or touched),
+the entry is still reused and its modification time is updated.
+
+`PackIndex.load_all` loads many packs at once.  Index lookups (which may
+hash a zip file) run on a thread pool, and packs that have to be scanned
+are decompressed, parsed, and tuned on a process pool, since tuning is
+CPU-bound.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import hashlib
+import json
+import multiprocessing
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, suppress
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any
+from zipfile import BadZipFile, ZipFile
+
+from .pack_tuning import SampleTuning, tune_binary
+from .sample import SamplePack, SampleParams
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Bumped whenever the file's contents change meaning
+_FORMAT = 2
+
+# Read size for hashing zip files
+_HASH_CHUNK = 2**20
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fobj:
+        while chunk := fobj.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+###############################################################################
+
+
+def _scan(path: Path) -> dict[str, Any]:
+    # Runs in a worker process.  Stat first, so a pack that changes while
+    # it's read looks out of date next time.
+    stat = path.stat()
+    pack = SamplePack(path)
+
+    samples = []
+    with ZipFile(path) as zobj:
+        for sample in pack.samples:
+            tuning = tune_binary(zobj.read(sample.member))
+            samples.append(
+                {
+                    "path": sample.path.as_posix(),
+                    "member": sample.member,
+                    "size": sample.size,
+                    "regs": sample.params.regs,
+                    "tuning": None if tuning is None else asdict(tuning),
+                }
+            )
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _hash(path),
+        "samples": samples,
+    }
+
+
+###############################################################################
+
+
+def _unpack(
+    path: Path, entry: dict[str, Any]
+) -> tuple[SamplePack, dict[str, SampleTuning]]:
+    pack = SamplePack.from_index(
+        path,
+        (
+            (
+                Path(x["path"]),
+                SampleParams.from_regs(x["regs"]),
+                x["size"],
+                x["member"],
+            )
+            for x in entry["samples"]
+        ),
+    )
+    tunings = {
+        x["path"]: SampleTuning(**x["tuning"])
+        for x in entry["samples"]
+        if x["tuning"] is not None
+    }
+
+    return pack, tunings
+
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+class PackIndex:
+    """
+    Cache of what's in each sample pack
+
+    Parameters
+    ----------
+    fname : Path
+        Index file, or None to not persist anything.  It's read here and
+        written by `save`.
+    """
+
+    fname: Path | None
+    _entries: dict[str, dict[str, Any]]
+    _dirty: bool
+
+    ###########################################################################
+
+    def __init__(self, fname: Path | None) -> None:
+        self.fname = fname
+        self._entries = {}
+        self._dirty = False
+
+        if fname is not None:
+            try:
+                with open(fname, "r", encoding="utf8") as fobj:
+                    contents = json.load(fobj)
+                if contents["format"] == _FORMAT:
+                    self._entries = contents["packs"]
+            except (OSError, ValueError, KeyError, TypeError):
+                # Missing or unreadable, start over
+                pass
+
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def load(self, path: Path) -> tuple[SamplePack, dict[str, SampleTuning]]:
+        """
+        Load a sample pack, from the index if it's up to date
+
+        Parameters
+        ----------
+        path : Path
+            The pack's zip file
+
+        Returns
+        -------
+        tuple
+            The pack, and automatic tuning for each of its samples by their
+            path in the pack (as with `load_pack_tunings`)
+        """
+        key, entry = self._lookup(path)
+        if entry is None:
+            entry = self._store(key, _scan(path))
+
+        return _unpack(path, entry)
+
+    ###########################################################################
+
+    def load_all(
+        self, paths: Iterable[Path], max_workers: int | None = None
+    ) -> Iterator[
+        tuple[Path, tuple[SamplePack, dict[str, SampleTuning]] | None]
+    ]:
+        """
+        Load several sample packs concurrently
+
+        Parameters
+        ----------
+        paths : Iterable
+            The packs' zip files
+        max_workers : int
+            Number of workers in each pool, or None for the default
+
+        Yields
+        ------
+        tuple
+            Each pack's path, and what `load` returns for it (or None if it
+            couldn't be loaded), in the order the packs were given.  Each
+            is yielded as soon as it and every pack before it are loaded.
+        """
+        packs = list(paths)
+        with ThreadPoolExecutor(max_workers) as pool:
+            pending = [pool.submit(self._lookup, x) for x in packs]
+
+        lookups: list[tuple[str, dict[str, Any] | None] | None] = []
+        for future in pending:
+            try:
+                lookups.append(future.result())
+            except OSError:
+                lookups.append(None)
+
+        missing = [
+            n for n, x in enumerate(lookups) if x is not None and x[1] is None
+        ]
+
+        with ExitStack() as stack:
+            # Worker processes are only worth starting with several packs to
+            # scan and several CPUs to scan them on
+            scans: dict[int, Future[dict[str, Any]]] = {}
+            if min(len(missing), max_workers or os.cpu_count() or 1) >= 2:
+                # Forking a process with other threads running isn't safe
+                context = multiprocessing.get_context("spawn")
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers, context)
+                )
+                scans = {n: executor.submit(_scan, packs[n]) for n in missing}
+
+            for n, (path, found) in enumerate(zip(packs, lookups)):
+                scan = scans[n].result if n in scans else partial(_scan, path)
+                yield path, self._resolve(path, found, scan)
+
+    ###########################################################################
+
+    def save(self) -> None:
+        """Write the index, if anything changed, forgetting missing packs."""
+        if self.fname is None or not self._dirty:
+            return
+
+        entries = {k: v for k, v in self._entries.items() if Path(k).exists()}
+        contents = {"format": _FORMAT, "packs": entries}
+
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+        fobj = NamedTemporaryFile(
+            "w",
+            encoding="utf8",
+            dir=self.fname.parent,
+            suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with fobj:
+                json.dump(contents, fobj)
+            os.replace(fobj.name, self.fname)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(fobj.name)
+            raise
+
+        self._entries = entries
+        self._dirty = False
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _lookup(self, path: Path) -> tuple[str, dict[str, Any] | None]:
+        # The pack's key, and its entry if it's up to date
+        key = str(path.resolve())
+        stat = path.stat()
+
+        entry = self._entries.get(key)
+        if entry is None or entry["size"] != stat.st_size:
+            return key, None
+
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return key, entry
+
+        if entry["sha256"] != _hash(path):
+            return key, None
+
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return key, entry
+
+    ###########################################################################
+
+    def _resolve(
+        self,
+        path: Path,
+        lookup: tuple[str, dict[str, Any] | None] | None,
+        scan: Callable[[], dict[str, Any]],
+    ) -> tuple[SamplePack, dict[str, SampleTuning]] | None:
+        # Finish loading a pack given its lookup result, scanning it if it
+        # wasn't in the index.  A pack that can't be read, isn't a zip file,
+        # or has a malformed pattern file is skipped.
+        if lookup is None:
+            return None
+
+        key, entry = lookup
+        try:
+            if entry is None:
+                entry = self._store(key, scan())
+            return _unpack(path, entry)
+        except (OSError, BadZipFile, ValueError):
+            return None
+
+    ###########################################################################
+
+    def _store(self, key: str, entry: dict[str, Any]) -> dict[str, Any]:
+        self._entries[key] = entry
+        self._dirty = True
+        return entry
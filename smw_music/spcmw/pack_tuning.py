@@ -0,0 +1,297 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Precomputed sample pack tuning."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from glob import glob
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from zipfile import BadZipFile
+
+# Package imports
+from smw_music.spc700 import (
+    BLOCK_SIZE,
+    Brr,
+    BrrException,
+    calc_tune,
+    midi_to_nspc,
+)
+
+from .sample import SamplePack
+
+###############################################################################
+# API constant definitions
+###############################################################################
+
+# Tuning cache file name, in the sample pack directory
+PACK_TUNING_FNAME = "tuning.json"
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Middle C, the dashboard's default note and output pitch
+_C4_FREQ = 440 * 2 ** (-9 / 12)
+_C4_MIDI = 60
+
+# Bumped whenever the file's contents change meaning
+_FORMAT = 2
+
+# Number of samples tuned per worker job
+_JOB_SAMPLES = 16
+
+###############################################################################
+# API class definitions
+###############################################################################
+
+
+@dataclass
+class SampleTuning:
+    """
+    Automatic tuning results for one sample
+
+    Attributes
+    ----------
+    digest : str
+        `Brr.digest` of the analyzed sample
+    fundamental : float
+        The sample's fundamental frequency, in Hz
+    confidence : float
+        Confidence in `fundamental`, see `PitchEstimate`
+    tune : int
+        Suggested tune setting for playing middle C on middle C
+    subtune : int
+        Suggested subtune setting
+    """
+
+    digest: str
+    fundamental: float
+    confidence: float
+    tune: int
+    subtune: int
+
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _analyze(
+    job: tuple[Path, int, int],
+) -> tuple[Path, dict[str, SampleTuning] | None]:
+    # Runs in a worker process, on samples [start, stop) of a pack.  A pack
+    # that can't be read, isn't a zip file, or has a malformed pattern file
+    # gives None.
+    path, start, stop = job
+    rv = {}
+    try:
+        for sample in SamplePack(path).samples[start:stop]:
+            tuning = tune_binary(sample.data)
+            if tuning is not None:
+                rv[sample.path.as_posix()] = tuning
+    except (OSError, BadZipFile, ValueError):
+        return path, None
+
+    return path, rv
+
+
+###############################################################################
+# API function definitions
+###############################################################################
+
+
+def analyze_packs(
+    dname: Path, max_workers: int | None = None
+) -> tuple[dict[str, dict[str, SampleTuning]], list[Path]]:
+    """
+    Compute automatic tuning for every sample in a sample pack directory
+
+    Parameters
+    ----------
+    dname : Path
+        Directory of sample pack zip files
+    max_workers : int
+        Number of worker processes, or None for one per CPU
+
+    Returns
+    -------
+    tuple
+        Tuning results, by pack name (the zip file's stem) and then sample
+        path in the pack, and the packs that couldn't be read
+    """
+    paths = [dname / fname for fname in sorted(glob("*.zip", root_dir=dname))]
+
+    # Work is split into runs of samples rather than whole packs, so a
+    # single large pack still uses every worker
+    tunings: dict[str, dict[str, SampleTuning]] = {}
+    failed = set()
+    jobs: list[tuple[Path, int, int]] = []
+    for path in paths:
+        try:
+            nsamples = len(SamplePack(path).samples)
+        except (OSError, BadZipFile, ValueError):
+            failed.add(path)
+            continue
+
+        tunings[path.stem] = {}
+        jobs.extend(
+            (path, start, min(start + _JOB_SAMPLES, nsamples))
+            for start in range(0, nsamples, _JOB_SAMPLES)
+        )
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        for path, tuning in executor.map(_analyze, jobs):
+            if tuning is None:
+                failed.add(path)
+            else:
+                tunings[path.stem].update(tuning)
+
+    # A pack that fails partway through is dropped
+    for path in failed:
+        tunings.pop(path.stem, None)
+
+    return tunings, [x for x in paths if x in failed]
+
+
+###############################################################################
+
+
+def load_pack_tunings(fname: Path) -> dict[str, dict[str, SampleTuning]]:
+    """
+    Load a tuning cache file written by `save_pack_tunings`
+
+    Parameters
+    ----------
+    fname : Path
+        Cache file
+
+    Returns
+    -------
+    dict
+        Tuning results, as from `analyze_packs`.  Missing, unreadable, and
+        out-of-date files give no results.
+    """
+    try:
+        with open(fname, "r", encoding="utf8") as fobj:
+            contents = json.load(fobj)
+        if contents["format"] != _FORMAT:
+            return {}
+
+        return {
+            pack: {path: SampleTuning(**x) for path, x in samples.items()}
+            for pack, samples in contents["packs"].items()
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+###############################################################################
+
+
+def save_pack_tunings(
+    fname: Path, tunings: dict[str, dict[str, SampleTuning]]
+) -> None:
+    """
+    Write a tuning cache file
+
+    Parameters
+    ----------
+    fname : Path
+        Cache file
+    tunings : dict
+        Tuning results, as from `analyze_packs`
+    """
+    contents = {
+        "format": _FORMAT,
+        "packs": {
+            pack: {path: asdict(x) for path, x in samples.items()}
+            for pack, samples in tunings.items()
+        },
+    }
+
+    # Write to a temporary file and move it into place so the dashboard never
+    # sees a partial file.  It's removed if anything goes wrong.
+    fobj = NamedTemporaryFile(
+        "w",
+        encoding="utf8",
+        dir=fname.parent,
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with fobj:
+            json.dump(contents, fobj, indent=1)
+        os.replace(fobj.name, fname)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(fobj.name)
+        raise
+
+
+###############################################################################
+
+
+def tune_binary(data: bytes) -> SampleTuning | None:
+    """
+    Compute automatic tuning for a BRR file's contents
+
+    Parameters
+    ----------
+    data : bytes
+        The BRR file, with or without a loop point header
+
+    Returns
+    -------
+    SampleTuning
+        The tuning results, or None if the file isn't a valid sample, or the
+        sample is silent or pitchless
+    """
+    # Only analyze files that are whole blocks, after an optional loop header
+    if len(data) < BLOCK_SIZE or len(data) % BLOCK_SIZE not in (0, 2):
+        return None
+
+    try:
+        return tune_sample(Brr.from_binary(data))
+    except BrrException:
+        return None
+
+
+###############################################################################
+
+
+def tune_sample(brr: Brr) -> SampleTuning | None:
+    """
+    Compute automatic tuning for a sample
+
+    Parameters
+    ----------
+    brr : Brr
+        The sample
+
+    Returns
+    -------
+    SampleTuning
+        The tuning results, or None if the sample is silent or pitchless
+    """
+    try:
+        pitch = brr.pitch()
+    except ValueError:
+        return None
+
+    setting, _ = calc_tune(pitch.frequency, midi_to_nspc(_C4_MIDI), _C4_FREQ)
+    tune, subtune = divmod(setting, 256)
+    return SampleTuning(
+        brr.digest, pitch.frequency, pitch.confidence, tune, subtune
+    )
@@ -10,17 +10,27 @@
 ###############################################################################
 
 # Standard library imports
-from dataclasses import dataclass, field
-from functools import cached_property
-from glob import iglob
+import io
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import InitVar, dataclass, field
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from typing import TextIO
 from zipfile import ZipFile
 
 # Package imports
 from smw_music.spc700 import Brr, Envelope, GainMode
 
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Number of BRR files each pack keeps in memory
+_CACHE_ENTRIES = 16
+
+_PATTERN_FNAME = "!patterns.txt"
+
 ###############################################################################
 # API Class Definitions
 ###############################################################################
@@ -30,14 +40,23 @@ from smw_music.spc700 import Brr, Envelope, GainMode
 class Sample:
     path: Path
     params: "SampleParams"
-    data: bytes
+    size: int
+    member: str = field(repr=False)
+    pack: "SamplePack" = field(repr=False, compare=False)
 
     ###########################################################################
 
-    @cached_property
+    @property
     def brr(self) -> Brr:
         return Brr.from_binary(self.data)
 
+    ###########################################################################
+
+    @property
+    def data(self) -> bytes:
+        """The BRR file's contents, read from the pack on demand."""
+        return self.pack.read(self.member)
+
 
 ###############################################################################
 
@@ -45,14 +64,106 @@ class Sample:
 # This probably belongs in the AMK area
 @dataclass
 class SamplePack:
+    """
+    A sample pack zip file
+
+    Only the zip's directory and pattern files are read up front.  BRR files
+    are read from the zip as they're used, and the most recently used ones
+    are kept in memory.
+
+    Parameters
+    ----------
+    path : Path
+        The zip file
+    scan : bool
+        False to skip reading the zip's directory, for `from_index`
+    """
+
     path: Path
+    scan: InitVar[bool] = True
+    _samples: dict[Path, Sample] = field(init=False, repr=False, compare=False)
+    _cache: OrderedDict[str, bytes] = field(
+        init=False, repr=False, compare=False, default_factory=OrderedDict
+    )
+    _lock: threading.Lock = field(
+        init=False, repr=False, compare=False, default_factory=threading.Lock
+    )
+
+    ###########################################################################
+    # API constructor definitions
+    ###########################################################################
+
+    @classmethod
+    def from_index(
+        cls,
+        path: Path,
+        samples: Iterable[tuple[Path, "SampleParams", int, str]],
+    ) -> "SamplePack":
+        """
+        Rebuild a pack without reading its zip file
+
+        Parameters
+        ----------
+        path : Path
+            The zip file
+        samples : Iterable
+            (path, params, size, member) for each sample, as in `Sample`
+
+        Returns
+        -------
+        SamplePack
+            The pack
+        """
+        rv = cls(path, scan=False)
+        rv._samples = {
+            spath: Sample(spath, params, size, member, rv)
+            for spath, params, size, member in samples
+        }
+        return rv
 
     ###########################################################################
+    # API property definitions
+    ###########################################################################
 
     @property
     def samples(self) -> list[Sample]:
         return list(self._samples.values())
 
+    ###########################################################################
+    # API method definitions
+    ###########################################################################
+
+    def read(self, member: str) -> bytes:
+        """
+        Read a file from the pack
+
+        Parameters
+        ----------
+        member : str
+            File name in the zip
+
+        Returns
+        -------
+        bytes
+            The file's contents
+        """
+        with self._lock:
+            try:
+                self._cache.move_to_end(member)
+                return self._cache[member]
+            except KeyError:
+                pass
+
+        with ZipFile(self.path) as zobj:
+            data = zobj.read(member)
+
+        with self._lock:
+            self._cache[member] = data
+            if len(self._cache) > _CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+
+        return data
+
     ###########################################################################
 
     def __getitem__(self, key: Path) -> Sample:
@@ -60,52 +171,65 @@ class SamplePack:
 
     ###########################################################################
 
-    def __post_init__(self) -> None:
+    def __post_init__(self, scan: bool) -> None:
+        if not scan:
+            self._samples = {}
+            return
+
         # Initialize the return value
         samples = {}
 
-        # Unpack the pack zip file to a temporary directory
-        with TemporaryDirectory() as tdir, ZipFile(self.path) as zobj:
-            zobj.extractall(tdir)
+        with ZipFile(self.path) as zobj:
+            infos = [x for x in zobj.infolist() if not x.is_dir()]
+            brrs = [
+                x for x in infos if Path(x.filename).suffix.lower() == ".brr"
+            ]
 
             # Locate the pattern description files
-            names = [Path(x) for x in zobj.namelist()]
-            pat_files = [n for n in names if n.parts[-1] == "!patterns.txt"]
+            pat_files = [
+                x for x in infos if Path(x.filename).name == _PATTERN_FNAME
+            ]
 
             for pat_file in pat_files:
-                parent = pat_file.parents[0]
-                parent_dir = tdir / parent
-                sample_params = []
-                with open(Path(tdir) / pat_file, "r", encoding="utf8") as fobj:
-                    sample_params = SampleParams.from_pattern_file(fobj)
+                parent = Path(pat_file.filename).parent
+                with zobj.open(pat_file) as fobj:
+                    sample_params = SampleParams.from_pattern_file(
+                        io.TextIOWrapper(fobj, encoding="utf8")
+                    )
 
                 # Stupid case insensitive file systems.  Build a map between
                 # the lower-case version of file name in the directory and its
-                brr_data = {}
-                for fname in iglob("*.brr", root_dir=parent_dir):
-                    with open(parent_dir / fname, "rb") as fobj:
-                        brr_data[fname.lower()] = fobj.read()
+                # entry in the zip
+                brr_infos = {
+                    Path(x.filename).name.lower(): x
+                    for x in brrs
+                    if Path(x.filename).parent == parent
+                }
 
                 for brr_fname, params in sample_params:
                     try:
-                        data = brr_data[brr_fname.lower()]
-                        sample_file = parent / brr_fname
-                        samples[sample_file] = Sample(
-                            sample_file, params, data
-                        )
+                        info = brr_infos[brr_fname.lower()]
                     except KeyError:
                         # If a file in the pattern file is missing, skip it
                         continue
 
-            # Add brr files that aren't in the !patterns.txt file
-            default_params = SampleParams.from_regs([0, 0, 0x7F, 0x10, 0])
-            for fname in iglob("**/*.brr", root_dir=tdir, recursive=True):
-                path = Path(fname)
-                if path not in samples:
-                    with open(Path(tdir) / fname, "rb") as fobj:
-                        data = fobj.read()
-
-                    samples[path] = Sample(path, default_params, data)
+                    sample_file = parent / brr_fname
+                    samples[sample_file] = Sample(
+                        sample_file,
+                        params,
+                        info.file_size,
+                        info.filename,
+                        self,
+                    )
+
+        # Add brr files that aren't in the !patterns.txt file
+        default_params = SampleParams.from_regs([0, 0, 0x7F, 0x10, 0])
+        for info in brrs:
+            path = Path(info.filename)
+            if path not in samples:
+                samples[path] = Sample(
+                    path, default_params, info.file_size, info.filename, self
+                )
 
         self._samples = samples
 
@@ -194,3 +318,18 @@ class SampleParams:
                 patterns.append(cls.from_pattern(line))
 
         return patterns
+
+    ###########################################################################
+    # API property definitions
+    ###########################################################################
+
+    @property
+    def regs(self) -> list[int]:
+        """The pattern's register values, the inverse of `from_regs`."""
+        return [
+            self.envelope.adsr1_reg,
+            self.envelope.adsr2_reg,
+            self.envelope.gain_reg,
+            self.tuning,
+            self.subtuning,
+        ]
@@ -20,9 +20,12 @@ import yaml
 
 # Package imports
 from smw_music.common import SmwMusicException
+from smw_music.song import ScoreCache
+from smw_music.spc700 import BrrLibrary
 from smw_music.spcmw.preferences import Preferences
 
 from . import amk
+from .pack_index import PackIndex
 from .project import Project, ProjectInfo
 
 ###############################################################################
@@ -76,10 +79,13 @@ def _remove_old_config_dir() -> None:
 
 _CONFIG_DIR = _config_dir()
 _CONFIG_DIR_OLD = _config_dir(False)
+_BRR_CACHE_DIR = _CONFIG_DIR / "brr_cache"
+_PACK_INDEX_FNAME = _CONFIG_DIR / "pack_index.json"
 _PREFS_FNAME = _CONFIG_DIR / "preferences.yaml"
 _PREFS_FNAME_OLD = _CONFIG_DIR_OLD / "preferences.yaml"
 _RECENT_PROJECTS_FNAME = _CONFIG_DIR / "projects.yaml"
 _RECENT_PROJECTS_FNAME_OLD = _CONFIG_DIR_OLD / "projects.yaml"
+_SCORE_CACHE_DIR = _CONFIG_DIR / "score_cache"
 
 ###############################################################################
 # API function definitions
@@ -101,6 +107,20 @@ def first_use() -> bool:
 ###############################################################################
 
 
+def get_brr_library() -> BrrLibrary:
+    return BrrLibrary(_BRR_CACHE_DIR)
+
+
+###############################################################################
+
+
+def get_pack_index() -> PackIndex:
+    return PackIndex(_PACK_INDEX_FNAME)
+
+
+###############################################################################
+
+
 def get_preferences() -> Preferences:
     if _PREFS_FNAME.exists():
         rv = Preferences.from_file(_PREFS_FNAME)
@@ -132,6 +152,13 @@ def get_recent_projects() -> list[Path]:
 ###############################################################################
 
 
+def get_score_cache() -> ScoreCache:
+    return ScoreCache(_SCORE_CACHE_DIR)
+
+
+###############################################################################
+
+
 def save_preferences(preferences: Preferences) -> None:
     _create_config_dir()
     _remove_old_config_dir()
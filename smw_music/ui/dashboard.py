@@ -452,6 +452,32 @@ class Dashboard(QWidget):
 
     ###########################################################################
 
+    def on_sample_pack_changed(
+        self, name: str, sample_pack: SamplePack | None
+    ) -> None:
+        tree = self._view.sample_pack_list
+
+        # Replace the pack's row, or add one at the end if it's new
+        index = tree.topLevelItemCount()
+        for top in tree.findItems(name, Qt.MatchFlag.MatchExactly):
+            index = tree.indexOfTopLevelItem(top)
+            tree.takeTopLevelItem(index)
+        self._sample_pack_items = {
+            k: v for k, v in self._sample_pack_items.items() if k[0] != name
+        }
+
+        if sample_pack is not None:
+            top = QTreeWidgetItem([name])
+            _mark_unselectable(top)
+
+            self._add_sample_pack(top, name, sample_pack)
+            tree.insertTopLevelItem(index, top)
+
+        tree.resizeColumnToContents(0)
+        tree.resizeColumnToContents(1)
+
+    ###########################################################################
+
     def on_sample_packs_changed(
         self, sample_packs: dict[str, SamplePack]
     ) -> None:
@@ -634,7 +660,7 @@ class Dashboard(QWidget):
                     parent = item
 
             item = QTreeWidgetItem(
-                parent, [sample.path.name, brr_size(len(sample.data))]
+                parent, [sample.path.name, brr_size(sample.size)]
             )
             item_id = (name, sample.path)
             item.setData(0, Qt.ItemDataRole.UserRole, item_id)
@@ -838,6 +864,7 @@ class Dashboard(QWidget):
         m.response_generated.connect(self.on_response_generated)
         m.preferences_changed.connect(self.on_preferences_changed)
         m.sample_packs_changed.connect(self.on_sample_packs_changed)
+        m.sample_pack_changed.connect(self.on_sample_pack_changed)
         m.recent_projects_updated.connect(self.on_recent_projects_updated)
         v.actionClearRecentProjects.triggered.connect(
             m.on_recent_projects_cleared
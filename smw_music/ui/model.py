@@ -51,6 +51,7 @@ from smw_music.spc700 import (
     midi_to_nspc,
 )
 from smw_music.spcmw import (
+    PACK_TUNING_FNAME,
     Artic,
     ArticSetting,
     Dynamics,
@@ -62,12 +63,14 @@ from smw_music.spcmw import (
     ProjectSettings,
     SamplePack,
     SampleSource,
+    SampleTuning,
     TuneSource,
     Tuning,
     advanced,
     amk,
     extract_instruments,
     get_preferences,
+    load_pack_tunings,
     unmapped_notes,
 )
 from smw_music.utils import brr_size_b, newest_release, version_tuple
@@ -204,6 +207,10 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
     sample_packs_changed = pyqtSignal(
         dict, arguments=["sample_packs"]  # type:ignore[call-arg]
     )
+    sample_pack_changed = pyqtSignal(
+        (str, object),
+        arguments=["name", "sample_pack"],  # type: ignore[call-arg]
+    )
 
     mml_generated = pyqtSignal(
         str, arguments=["mml"]  # type: ignore[call-arg]
@@ -219,6 +226,13 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
         str, arguments=["songinfo"]  # type: ignore[call-arg]
     )
     _sample_watcher: observers.Observer
+    _sample_pack_watcher: SamplePackWatcher
+
+    # Hand packs loaded on other threads to the GUI thread, tagged with the
+    # load's generation.  They're emitted from those threads, so they're
+    # delivered as queued connections.
+    _sample_pack_loaded = pyqtSignal(int, object, object, dict, bool)
+    _sample_packs_loaded = pyqtSignal(int)
 
     ###########################################################################
     # Constructor definitions
@@ -232,8 +246,21 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
         self._reset_song()
         self._reset_state()
         self._sample_packs: dict[str, SamplePack] = {}
+        self._pack_tunings: dict[str, dict[str, SampleTuning]] = {}
         self._sample_player = SamplePlayer()
-
+        self._brr_library = spcmw.get_brr_library()
+        self._pack_index = spcmw.get_pack_index()
+        self._score_cache = spcmw.get_score_cache()
+        # Guards the pack index, which is used from worker threads
+        self._sample_pack_lock = threading.RLock()
+        # Bumped by every full reload, results from older ones are dropped
+        self._sample_pack_generation = 0
+        self._sample_pack_names: set[str] = set()
+        self._sample_packs_loading = False
+        self._deferred_project: Path | None = None
+
+        self._sample_pack_loaded.connect(self._on_sample_pack_loaded)
+        self._sample_packs_loaded.connect(self._on_sample_packs_loaded)
         self._start_watcher()
 
     ###########################################################################
@@ -305,27 +332,25 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
     ###########################################################################
 
     def update_sample_packs(self) -> None:
-        self._sample_packs = {}
-
         # TODO: Make this work with folders.
-        packs = {}
         root_dir = self.preferences.sample_pack_dname
-        for fname in glob("*.zip", root_dir=root_dir):
-            pack = Path(fname)
-            packs[pack.stem] = root_dir / pack
-
-        for name, path in packs.items():
-            try:
-                self._sample_packs[name] = SamplePack(path)
+        paths = [
+            root_dir / fname
+            for fname in sorted(glob("*.zip", root_dir=root_dir))
+        ]
 
-            except FileNotFoundError:
-                self.response_generated.emit(
-                    True,
-                    "Error loading sample pack",
-                    f"Could not open sample pack {name} at {path}",
-                )
+        self._sample_pack_generation += 1
+        self._sample_pack_names = set()
+        self._sample_packs_loading = True
 
-        self.sample_packs_changed.emit(self._sample_packs)
+        # Packs are loaded in the background and replace the previous ones as
+        # they finish.  Packs that are gone are dropped once it's done.
+        self._sample_pack_th = threading.Thread(
+            target=self._load_sample_packs,
+            args=(root_dir, paths, self._sample_pack_generation),
+            daemon=True,
+        )
+        self._sample_pack_th.start()
 
     ###########################################################################
 
@@ -605,6 +630,12 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
     ###########################################################################
 
     def on_load(self, fname: Path) -> None:
+        # Projects refer to samples in sample packs, so wait for them
+        if self._sample_packs_loading:
+            self._deferred_project = fname
+            self.update_status("Loading sample packs")
+            return
+
         try:
             project, backup_fname = Project.load(fname)
             if backup_fname is not None:
@@ -1047,6 +1078,30 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
     # Private method definitions
     ###########################################################################
 
+    def _add_sample_pack(
+        self,
+        path: Path,
+        loaded: tuple[SamplePack, dict[str, SampleTuning]] | None,
+        file_tunings: dict[str, SampleTuning],
+    ) -> bool:
+        name = path.stem
+        if loaded is None:
+            self.response_generated.emit(
+                True,
+                "Error loading sample pack",
+                f"Could not open sample pack {name} at {path}",
+            )
+            return False
+
+        # Tuning precomputed by spcmw_tune_packs takes precedence over the
+        # index's
+        pack, tunings = loaded
+        self._sample_packs[name] = pack
+        self._pack_tunings[name] = tunings | file_tunings
+        return True
+
+    ###########################################################################
+
     def _append_recent_project(self, fname: Path) -> None:
         fname = fname.resolve()
         history = spcmw.get_recent_projects()
@@ -1105,18 +1160,25 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
 
     def _get_tune(self, state: State) -> tuple[float, tuple[int, float]]:
         brr: Brr | None = None
+        auto: float | None = None
         with suppress(NoProject, NoSample):
             sample = state.sample
             match sample.sample_source:
                 case SampleSource.SAMPLEPACK:
                     pack, path = sample.pack_sample
                     brr = self._sample_packs[pack][path].brr
+                    auto = self._pack_fundamental(pack, path, brr)
+                    if auto is None:
+                        brr = self._brr_library.add(brr)
                 case SampleSource.BRR:
                     with suppress(FileNotFoundError):
-                        brr = Brr.from_file(sample.brr_fname)
+                        brr = self._brr_library.from_file(sample.brr_fname)
 
         calculated_tune = (0.0, (0, 0.0))
         if brr is not None:
+            if auto is None:
+                auto = brr.fundamental
+
             tuning = state.sample.tuning
             scale = SAMPLE_FREQ / tuning.sample_freq
             source = tuning.source
@@ -1127,7 +1189,7 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
 
             match source:
                 case TuneSource.AUTO:
-                    fundamental = brr.fundamental
+                    fundamental = auto
                     fundamental /= 2 ** (tuning.semitone_shift / 12)
                 case TuneSource.MANUAL_NOTE:
                     fundamental = tuning.pitch.frequency * scale
@@ -1135,7 +1197,7 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
                     fundamental = tuning.frequency * scale
 
             calculated_tune = (
-                brr.fundamental,
+                auto,
                 brr.tune(
                     midi_to_nspc(Pitch("C", octave=4).midi),
                     tuning.output.frequency,
@@ -1250,7 +1312,7 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
             return
 
         try:
-            self.song = Song.from_music_xml(musicxml)
+            self.song = self._score_cache.from_music_xml(musicxml)
         except SongException as e:
             self.response_generated.emit(
                 True,
@@ -1291,6 +1353,31 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
 
     ###########################################################################
 
+    def _load_sample_packs(
+        self, root_dir: Path, paths: list[Path], generation: int
+    ) -> None:
+        # Runs on a worker thread.  The lock keeps the sample pack watcher out
+        # of the index in the meantime.  A newer reload stops this one.
+        with self._sample_pack_lock:
+            file_tunings = load_pack_tunings(root_dir / PACK_TUNING_FNAME)
+            for path, loaded in self._pack_index.load_all(paths):
+                if generation != self._sample_pack_generation:
+                    break
+                self._sample_pack_loaded.emit(
+                    generation,
+                    path,
+                    loaded,
+                    file_tunings.get(path.stem, {}),
+                    False,
+                )
+
+            with suppress(OSError):
+                self._pack_index.save()
+
+        self._sample_packs_loaded.emit(generation)
+
+    ###########################################################################
+
     def _load_sample_settings(self, item_id: tuple[str, Path]) -> None:
         pack, sample_path = item_id
         params = self._sample_packs[pack][sample_path].params
@@ -1418,6 +1505,69 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
 
     ###########################################################################
 
+    def _on_sample_pack_loaded(
+        self,
+        generation: int,
+        path: Path,
+        loaded: tuple[SamplePack, dict[str, SampleTuning]] | None,
+        file_tunings: dict[str, SampleTuning],
+        announce: bool,
+    ) -> None:
+        # The old pack is replaced in one step on the GUI thread.  A pack
+        # that's gone or fails to load is dropped.
+        if generation != self._sample_pack_generation:
+            return
+
+        name = path.stem
+        self._sample_pack_names.add(name)
+        existed = name in self._sample_packs
+        self._sample_packs.pop(name, None)
+        self._pack_tunings.pop(name, None)
+
+        if path.exists() and self._add_sample_pack(path, loaded, file_tunings):
+            action = "updated" if existed else "added"
+            self.sample_pack_changed.emit(name, self._sample_packs[name])
+        elif existed:
+            action = "removed"
+            self.sample_pack_changed.emit(name, None)
+        else:
+            return
+
+        if announce:
+            self.update_status(f"Sample pack {name} {action}")
+
+    ###########################################################################
+
+    def _on_sample_packs_loaded(self, generation: int) -> None:
+        if generation != self._sample_pack_generation:
+            return
+
+        # Drop the previous load's packs that weren't found this time
+        for name in set(self._sample_packs) - self._sample_pack_names:
+            del self._sample_packs[name]
+            self._pack_tunings.pop(name, None)
+        self.sample_packs_changed.emit(self._sample_packs)
+
+        self._sample_packs_loading = False
+        if self._deferred_project is not None:
+            fname, self._deferred_project = self._deferred_project, None
+            self.on_load(fname)
+
+    ###########################################################################
+
+    def _pack_fundamental(
+        self, pack: str, path: Path, brr: Brr
+    ) -> float | None:
+        # Precomputed fundamental, if it's for this exact sample
+        try:
+            tuning = self._pack_tunings[pack][path.as_posix()]
+        except KeyError:
+            return None
+
+        return tuning.fundamental if tuning.digest == brr.digest else None
+
+    ###########################################################################
+
     def _reset_state(self, project: Project | None = None) -> None:
         self._history: list[State] = [State()]
         self._undo_level = 0
@@ -1473,11 +1623,15 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
                 self._sample_watcher.stop()
                 self._sample_watcher.join()
 
+        with suppress(AttributeError):
+            self._sample_pack_watcher.stop()
+
+        self._sample_pack_watcher = SamplePackWatcher(self._update_sample_pack)
         self._sample_watcher = observers.Observer()
         self._sample_watcher.daemon = True
 
         self._sample_watcher.schedule(
-            SamplePackWatcher(self._update_sample_packs),
+            self._sample_pack_watcher,
             self.preferences.sample_pack_dname,
             False,
         )
@@ -1519,9 +1673,27 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
 
     ###########################################################################
 
-    def _update_sample_packs(self, msg: str) -> None:
-        self.update_status(msg)
-        self.update_sample_packs()
+    def _update_sample_pack(self, path: Path) -> None:
+        # Called from the sample pack watcher's thread when a pack's zip file
+        # is added, changed, or removed.  The pack is loaded here and swapped
+        # in on the GUI thread, so readers never see it missing.  Other packs
+        # are left alone.
+        loaded = None
+        with self._sample_pack_lock:
+            if path.exists():
+                _, loaded = next(self._pack_index.load_all([path]))
+
+                with suppress(OSError):
+                    self._pack_index.save()
+
+        file_tunings = load_pack_tunings(path.parent / PACK_TUNING_FNAME)
+        self._sample_pack_loaded.emit(
+            self._sample_pack_generation,
+            path,
+            loaded,
+            file_tunings.get(path.stem, {}),
+            True,
+        )
 
     ###########################################################################
 
@@ -1609,7 +1781,7 @@ class Model(QObject):  # pylint: disable=too-many-public-methods
                 is_pack = True
                 pack, path = sample.pack_sample
                 if pack:
-                    size = brr_size_b(len(self._sample_packs[pack][path].data))
+                    size = brr_size_b(self._sample_packs[pack][path].size)
             else:
                 is_pack = False
                 pack = ""
@@ -10,11 +10,21 @@
 ###############################################################################
 
 # Standard library imports
+import os
+import threading
 from pathlib import Path
 from typing import Callable
 
 # Library imports
-from watchdog import events, observers
+from watchdog import events
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Quiet time after a pack's last event before it's reloaded, in seconds.
+# Copying a large zip in generates a burst of events.
+_DEBOUNCE = 0.5
 
 ###############################################################################
 # API Class Definitions
@@ -22,33 +32,88 @@ from watchdog import events, observers
 
 
 class SamplePackWatcher(events.FileSystemEventHandler):
-    def __init__(self, hdlr: Callable[[str], None]) -> None:
+    """
+    Watch a sample pack directory for packs being added, changed, or removed
+
+    Parameters
+    ----------
+    hdlr : Callable
+        Called with a pack's path once its events have settled.  It's called
+        from a background thread, so it's free to do slow work.
+    delay : float
+        Quiet time, in seconds, before `hdlr` is called
+    """
+
+    def __init__(
+        self, hdlr: Callable[[Path], None], delay: float = _DEBOUNCE
+    ) -> None:
         super().__init__()
         self._hdlr = hdlr
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._timers: dict[Path, threading.Timer] = {}
 
     ###########################################################################
+    # API method definitions
+    ###########################################################################
 
     def on_created(
         self, event: events.FileCreatedEvent | events.DirCreatedEvent
     ) -> None:
-        fname = Path(event.src_path).name
-        self._hdlr(f"Sample pack {fname} added")
-        return
-        self._model.update_status(f"Sample pack {fname} added")
-        self._model.update_sample_packs()
+        self._schedule(event.src_path)
 
     ###########################################################################
 
     def on_deleted(
         self, event: events.FileDeletedEvent | events.DirDeletedEvent
     ) -> None:
-        fname = Path(event.src_path).name
-        self._hdlr(f"Sample pack {fname} removed")
-        return
-        self._model.update_status(f"Sample pack {fname} removed")
-        self._model.update_sample_packs()
+        self._schedule(event.src_path)
+
+    ###########################################################################
+
+    def on_modified(
+        self, event: events.FileModifiedEvent | events.DirModifiedEvent
+    ) -> None:
+        self._schedule(event.src_path)
 
     ###########################################################################
 
-    def start(self) -> None:
-        pass
+    def on_moved(
+        self, event: events.FileMovedEvent | events.DirMovedEvent
+    ) -> None:
+        self._schedule(event.src_path)
+        self._schedule(event.dest_path)
+
+    ###########################################################################
+
+    def stop(self) -> None:
+        """Cancel any pending reloads."""
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers = {}
+
+    ###########################################################################
+    # Private method definitions
+    ###########################################################################
+
+    def _fire(self, path: Path) -> None:
+        with self._lock:
+            self._timers.pop(path, None)
+        self._hdlr(path)
+
+    ###########################################################################
+
+    def _schedule(self, src_path: bytes | str) -> None:
+        path = Path(os.fsdecode(src_path))
+        if path.suffix != ".zip":
+            return
+
+        # Restart the pack's timer on every event
+        with self._lock:
+            if (timer := self._timers.get(path)) is not None:
+                timer.cancel()
+            timer = threading.Timer(self._delay, self._fire, (path,))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
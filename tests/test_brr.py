@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""BRR Handling Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+from scipy.signal import lfilter, lfiltic  # type: ignore
+
+# Package imports
+from smw_music.spc700 import BLOCK_SIZE, Brr, BrrException
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+# Filter coefficients, per the SNES Dev Manual
+_FILTERS = {
+    0: [1, 0, 0],
+    1: [1, -0.9375, 0],
+    2: [1, -1.90625, 0.9375],
+    3: [1, -1.7968750, 0.8125],
+}
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _random_brr(seed: int, nblocks: int, max_range: int) -> Brr:
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (nblocks, BLOCK_SIZE), dtype=np.uint8)
+    blocks[:, 0] = (rng.integers(0, max_range + 1, nblocks) << 4) | (
+        rng.integers(0, 4, nblocks) << 2
+    )
+    # End and loop flags on the last block
+    blocks[-1, 0] |= 0x3
+    loop_point = BLOCK_SIZE * int(rng.integers(0, nblocks))
+
+    return Brr(blocks, loop_point)
+
+
+###############################################################################
+
+
+def _reference_waveform(brr: Brr, loops: int) -> np.ndarray:
+    # Straightforward block-by-block decode
+    proc = np.zeros(16)
+    rv = []
+    start_block = 0
+    for _ in range(loops):
+        for n in range(start_block, brr.nblocks):
+            a_coeffs = _FILTERS[int(brr.filters[n])]
+            b_coeffs = [2.0 ** int(brr.ranges[n])]
+            init = lfiltic(b_coeffs, a_coeffs, [proc[-1], proc[-2]])
+            proc, _ = lfilter(b_coeffs, a_coeffs, brr.samples[n], zi=init)
+            rv.append(np.round(proc))
+        start_block = brr.loop_block
+
+    return np.concatenate(rv).astype(np.int16)
+
+
+def _reference_exact_waveform(brr: Brr, loops: int) -> np.ndarray:
+    # Straightforward sample-by-sample integer decode, per Fullsnes
+    old = older = 0
+    rv = []
+    start_block = 0
+    for _ in range(loops):
+        for n in range(start_block, brr.nblocks):
+            filt = int(brr.filters[n])
+            rng = int(brr.ranges[n])
+            for nibble in brr.samples[n].tolist():
+                if rng > 12:
+                    smpl = -2048 if nibble < 0 else 0
+                else:
+                    smpl = (nibble << rng) >> 1
+                if filt == 1:
+                    smpl += old + (-old >> 4)
+                elif filt == 2:
+                    smpl += 2 * old + (-3 * old >> 5) - older + (older >> 4)
+                elif filt == 3:
+                    smpl += 2 * old + (-13 * old >> 6) - older
+                    smpl += 3 * older >> 4
+                smpl = min(max(smpl, -0x8000), 0x7FFF)
+                smpl = ((2 * smpl + 0x8000) & 0xFFFF) - 0x8000
+                rv.append(smpl)
+                older, old = old, smpl >> 1
+        start_block = brr.loop_block
+
+    return np.array(rv, np.int16)
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("loops", [1, 3])
+def test_decode(seed, loops):
+    brr = _random_brr(seed, 1 + 7 * seed, 7)
+
+    assert np.array_equal(
+        brr.generate_waveform(loops), _reference_waveform(brr, loops)
+    )
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("loop_start", [None, 0, 203])
+def test_encode(loop_start):
+    times = np.arange(1003) / 32000
+    pcm = np.round(
+        12000 * np.sin(2 * np.pi * 440 * times)
+        + 3000 * np.sin(2 * np.pi * 1320 * times)
+    )
+
+    brr = Brr.from_binary(Brr.from_pcm(pcm, loop_start).binary, exact=True)
+
+    assert brr.filters[0] == 0
+    assert brr.sample_loops == (loop_start is not None)
+    assert all(rng <= 12 for rng in brr.ranges)
+
+    if loop_start is None:
+        waveform = brr.generate_waveform()[: len(pcm)]
+    else:
+        # Loop start is padded out to a block boundary, loop length is
+        # repeated out to a whole number of blocks
+        pad = -loop_start % 16
+        assert brr.loop_block == (loop_start + pad) // 16
+        assert brr.filters[brr.loop_block] == 0
+        waveform = brr.generate_waveform()[pad : pad + len(pcm)]
+
+    err = waveform - pcm
+    snr = 10 * np.log10(np.sum(pcm**2) / np.sum(err**2))
+    assert snr > 40
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "rng, nibble, expected",
+    [
+        (12, 0x7, 2 * (0x7 << 11)),
+        (12, 0x8, 2 * (-0x8 << 11)),
+        (13, 0x7, 0),
+        (13, 0x8, -4096),
+        (15, 0xF, -4096),
+    ],
+)
+def test_exact_ranges(rng, nibble, expected):
+    header = (rng << 4) | 0x1
+    blocks = np.array([[header] + 8 * [(nibble << 4) | nibble]], np.uint8)
+    brr = Brr(blocks, exact=True)
+
+    assert brr.generate_waveform()[0] == expected
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("loops", [1, 3])
+def test_exact_decode(seed, loops):
+    # Random filters leave a mix of short and long runs between filter 0
+    # blocks, which are decoded differently
+    brr = _random_brr(seed, 1 + 50 * seed, 15)
+    brr.exact = True
+
+    assert np.array_equal(
+        brr.generate_waveform(loops), _reference_exact_waveform(brr, loops)
+    )
+
+
+###############################################################################
+
+
+def test_exact_wraparound():
+    # A filter 0 block at full scale followed by a filter 1 block that
+    # overflows the 15-bit sample range and wraps
+    blocks = np.array(
+        [[0xC0] + 8 * [0x77], [0xC5] + 8 * [0x77]],
+        np.uint8,
+    )
+    brr = Brr(blocks, exact=True)
+    waveform = brr.generate_waveform()
+
+    assert waveform[15] == 28672
+    assert waveform[16] == 2 * (14336 + 14336 - 896) - 0x10000
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("size", [1, 8, 10, 19])
+def test_from_binary_length(size):
+    with pytest.raises(BrrException):
+        Brr.from_binary(bytes(size))
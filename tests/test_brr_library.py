@@ -0,0 +1,111 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""BRR Library Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import os
+from unittest import mock
+
+# Library imports
+import numpy as np
+
+# Package imports
+from smw_music.spc700 import Brr, BrrLibrary
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _tone(freq: float) -> Brr:
+    # 64 looping samples of a sine wave
+    pcm = 8000 * np.sin(2 * np.pi * freq * np.arange(256) / 32000)
+    return Brr.from_pcm(pcm, 0)
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_content_addressed(tmp_path):
+    library = BrrLibrary(tmp_path)
+    brr = library.add(_tone(500))
+
+    assert library.from_binary(brr.binary) is brr
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+
+###############################################################################
+
+
+def test_eviction(tmp_path):
+    library = BrrLibrary(tmp_path)
+    first = library.add(_tone(500))
+    size = (tmp_path / f"{first.digest}.npz").stat().st_size
+
+    # Make the first entry the oldest, then leave room for only two
+    os.utime(tmp_path / f"{first.digest}.npz", (0, 0))
+    library.max_size = 2 * size
+    library.add(_tone(1000))
+    third = library.add(_tone(2000))
+
+    assert not (tmp_path / f"{first.digest}.npz").exists()
+    assert (tmp_path / f"{third.digest}.npz").exists()
+
+
+###############################################################################
+
+
+def test_failed_write(tmp_path):
+    library = BrrLibrary(tmp_path)
+    with mock.patch("numpy.savez", side_effect=OSError):
+        brr = library.add(_tone(500))
+
+    # The sample is still usable, and no partial entry is left behind
+    assert brr.pitch().frequency > 0
+    assert not list(tmp_path.iterdir())
+
+
+###############################################################################
+
+
+def test_incremental_size(tmp_path, monkeypatch):
+    library = BrrLibrary(tmp_path)
+    entries = library._entries
+    scans = []
+
+    def _counted():
+        scans.append(None)
+        return entries()
+
+    monkeypatch.setattr(library, "_entries", _counted)
+
+    for freq in (500, 1000, 2000):
+        library.add(_tone(freq))
+
+    # The directory is only measured once while the cache is under its bound
+    assert len(scans) == 1
+    assert library._size == sum(x.stat().st_size for x in tmp_path.iterdir())
+
+
+###############################################################################
+
+
+def test_persistent(tmp_path):
+    expected = BrrLibrary(tmp_path).add(_tone(500))
+    brr = BrrLibrary(tmp_path).add(_tone(500))
+
+    assert "spectrum" in brr.__dict__
+    assert brr.pitch() == expected.pitch()
+    assert np.array_equal(
+        brr.generate_waveform(), expected.generate_waveform()
+    )
+    assert np.allclose(brr.spectrum, expected.spectrum)
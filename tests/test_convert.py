@@ -0,0 +1,37 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""SPCMW Command Line Tool Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import pathlib
+from unittest import mock
+
+# Package imports
+from smw_music.scripts import convert
+from smw_music.spcmw import Project, ProjectInfo
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_workers(tmp_path):
+    musicxml = pathlib.Path("tests") / "src" / "Crescendos.mxl"
+    project = Project(tmp_path, ProjectInfo("test", musicxml))
+
+    with (
+        mock.patch.object(Project, "load", return_value=(project, None)),
+        mock.patch("smw_music.exporters.common.get_score_cache") as cache,
+        mock.patch.object(convert.MmlExporter, "export") as export,
+    ):
+        convert.main([str(tmp_path / "test.prj"), "--workers", "3"])
+
+    cache.return_value.from_music_xml.assert_called_once_with(musicxml, 3)
+    export.assert_called_once()
@@ -10,175 +10,78 @@
 ###############################################################################
 
 # Library imports
+import numpy as np
 import pytest
 
 # Package imports
-from smw_music.music_xml import EchoConfig
+from smw_music.spc700 import FIR_FILTERS, EchoConfig, apply_echo, fir_response
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _signed(reg: int) -> int:
+    return reg - 0x100 if reg & 0x80 else reg
+
+
+###############################################################################
+
+
+def _reference_echo(send: np.ndarray, config: EchoConfig) -> np.ndarray:
+    # Sample-by-sample echo path with a ring buffer
+    buf = np.zeros((max(1, 512 * config.delay), 2), dtype=int)
+    hist = np.zeros((8, 2), dtype=int)
+    coeffs = [_signed(x) for x in config.fir_coeffs]
+    efb = _signed(config.fb_reg)
+    evol = [_signed(config.left_vol_reg), _signed(config.right_vol_reg)]
+
+    rv = np.zeros_like(send)
+    for n, sample in enumerate(send):
+        pos = n % len(buf)
+        hist = np.roll(hist, -1, axis=0)
+        hist[-1] = buf[pos] >> 1
+        for chan in range(2):
+            taps = [(int(hist[k, chan]) * coeffs[k]) >> 6 for k in range(8)]
+            fir = sum(taps[:-1])
+            fir = ((fir + 0x8000) & 0xFFFF) - 0x8000 + taps[-1]
+            fir = min(max(fir, -0x8000), 0x7FFF) & ~1
+
+            rv[n, chan] = (fir * evol[chan]) >> 7
+            fb = int(sample[chan]) + ((fir * efb) >> 7)
+            buf[pos, chan] = min(max(fb, -0x8000), 0x7FFF) & ~1
+
+    return rv
+
 
 ###############################################################################
 # Test definitions
 ###############################################################################
 
-# Here we go - vertigo
-# Video vertigo
-# Test for echo
-# https://www.youtube.com/watch?v=VaDLxSHVsVo
-
-
-@pytest.mark.parametrize(
-    "csv, exp",
-    [
-        (
-            "0,1,2,3,4,5,6,7,1.0,0,1.0,0,0,1.0,0,0",
-            (
-                set(range(8)),
-                (1.0, 1.0),
-                (False, False),
-                0,
-                1.0,
-                False,
-                0,
-                255,
-                127,
-                127,
-                127,
-            ),
-        ),
-        (
-            "1.0,0,1.0,0,0,1.0,0,0",
-            (
-                set(),
-                (1.0, 1.0),
-                (False, False),
-                0,
-                1.0,
-                False,
-                0,
-                0,
-                127,
-                127,
-                127,
-            ),
-        ),
-        (
-            "2,5,1,4,0.0787,0,0.157,0,0,0.236,0,0",
-            (
-                set((1, 2, 4, 5)),
-                (0.0787, 0.157),
-                (False, False),
-                0,
-                0.236,
-                False,
-                0,
-                0x36,
-                10,
-                20,
-                30,
-            ),
-        ),
-        (
-            "0,1,2,0.0859,1,0.165,0,0,0.244,0,0",
-            (
-                set((0, 1, 2)),
-                (0.0859, 0.165),
-                (True, False),
-                0,
-                0.244,
-                False,
-                0,
-                0x7,
-                0xF5,
-                21,
-                31,
-            ),
-        ),
-        (
-            "4,5,6,0.0945,0,0.172,1,0,0.252,0,0",
-            (
-                set((4, 5, 6)),
-                (0.0945, 0.172),
-                (False, True),
-                0,
-                0.252,
-                False,
-                0,
-                0x70,
-                12,
-                0xEA,
-                32,
-            ),
-        ),
-        (
-            "7,0,1,0.102,0,0.181,0,0,0.258,1,0",
-            (
-                set((0, 1, 7)),
-                (0.102, 0.181),
-                (False, False),
-                0,
-                0.258,
-                True,
-                0,
-                0x83,
-                13,
-                23,
-                0xDF,
-            ),
-        ),
-        (
-            "2,3,4,0.110,0,0.189,0,5,0.268,0,0",
-            (
-                set((2, 3, 4)),
-                (0.110, 0.189),
-                (False, False),
-                5,
-                0.268,
-                False,
-                0,
-                0x1C,
-                14,
-                24,
-                34,
-            ),
-        ),
-        (
-            "5,6,7,0.118,0,0.197,0,0,0.276,0,1",
-            (
-                set((5, 6, 7)),
-                (0.118, 0.197),
-                (False, False),
-                0,
-                0.276,
-                False,
-                1,
-                0xE0,
-                15,
-                25,
-                35,
-            ),
-        ),
-    ],
-    ids=[
-        "Base",
-        "Nochannels",
-        "Adjusted Magnitudes",
-        "Inv Left",
-        "Inv Right",
-        "Inv Feedback",
-        "Delay",
-        "FIR filter",
-    ],
-)
-def test_echo(csv, exp):
-    cfg = EchoConfig.from_csv(csv)
-    assert cfg.enables == exp[0], "Channel list"
-    assert cfg.vol_mag[0] == pytest.approx(exp[1][0]), "Left Volume"
-    assert cfg.vol_mag[1] == pytest.approx(exp[1][1]), "Right Volume"
-    assert cfg.vol_inv == exp[2], "Volume phase invert"
-    assert cfg.delay == exp[3], "Delay"
-    assert cfg.fb_mag == pytest.approx(exp[4]), "Feedback magnitude"
-    assert cfg.fb_inv == exp[5], "Feedback phase invert"
-    assert cfg.fir_filt == exp[6], "FIR filter selection"
-    assert cfg.channel_reg == exp[7], "Channel register"
-    assert cfg.left_vol_reg == exp[8], "Left volume register"
-    assert cfg.right_vol_reg == exp[9], "Right volume register"
-    assert cfg.fb_reg == exp[10], "Feedback register"
+
+@pytest.mark.parametrize("delay", [0, 1, 2])
+@pytest.mark.parametrize("fir_filt", [0, 1])
+def test_echo(delay, fir_filt):
+    rng = np.random.default_rng(delay)
+    send = rng.integers(-0x7000, 0x7000, (1500, 2))
+    config = EchoConfig((0.8, 0.5), (False, True), delay, 0.9, True, fir_filt)
+
+    assert np.array_equal(
+        apply_echo(send, config), _reference_echo(send, config)
+    )
+
+
+###############################################################################
+
+
+def test_fir_response():
+    coeffs = tuple(_signed(x) for x in FIR_FILTERS[0])
+    freqs, mag, phase = fir_response(coeffs)
+
+    # A single tap on the oldest sample is a flat 7-sample delay
+    assert freqs[0] == 0
+    assert np.allclose(mag, 20 * np.log10(127 / 128))
+    assert np.allclose(
+        np.exp(1j * np.radians(phase)), np.exp(-7j * np.pi * freqs / 16000)
+    )
+    assert fir_response(coeffs)[1] is mag
@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Envelope Generator Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import generate_adsr, generate_envelope
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_cached_plot():
+    plot, regions, labels = generate_adsr(3, 4, 5, 6)
+
+    assert generate_adsr(3, 4, 5, 6)[0] is plot
+    assert not plot.flags.writeable
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("setting", [0, 0x20, 0x7F])
+def test_direct_gain(setting):
+    env = generate_envelope(0, 0, setting)
+
+    # Direct gain is applied on the first sample and never changes
+    assert np.array_equal(env, [setting << 4])
+
+
+###############################################################################
+
+
+def test_fast_attack():
+    # Attack rate 15 adds 0x400 every sample, then the first decay step lands
+    # in sustain level 7, which holds (sustain rate 0)
+    env = generate_envelope(0xFF, 0xE0, 0)
+
+    assert np.array_equal(env, [0x400, 0x7FF, 0x7F7])
+    assert not env.flags.writeable
+
+
+###############################################################################
+
+
+def test_linear_increase():
+    # Rate 31 fires every sample
+    env = generate_envelope(0, 0, 0xDF)
+
+    assert np.array_equal(env[:63], 0x20 * np.arange(1, 64))
+    assert env[-1] == 0x7FF
+    assert len(env) == 64
@@ -0,0 +1,135 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""BRR Extraction Tool Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import hashlib
+
+# Library imports
+import numpy as np
+import yaml
+
+# Package imports
+from smw_music.scripts.extract_brrs import main
+from smw_music.spc700 import BLOCK_SIZE
+from smw_music.spc700.spc_file import MAGIC
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _brr_file(fill: int) -> bytes:
+    # Extracted files always have a loop header
+    return bytes(2) + _one_shot(fill)
+
+
+###############################################################################
+
+
+def _name(fill: int) -> str:
+    return f"{hashlib.sha256(_brr_file(fill)).hexdigest()}.brr"
+
+
+###############################################################################
+
+
+def _one_shot(fill: int, header: int = 0xC0) -> bytes:
+    # Two-block one-shot sample, filter 0 and range 12 by default
+    blocks = np.full((2, BLOCK_SIZE), fill, np.uint8)
+    blocks[:, 0] = header
+    blocks[-1, 0] |= 0x1
+    return blocks.tobytes()
+
+
+###############################################################################
+
+
+def _spc(fill: int) -> bytes:
+    # Slot 0 is the same sample in every file, slot 1 is filled with `fill`,
+    # and slot 2 starts with filter 1, which fails the default checks
+    data = np.zeros(0x10200, dtype=np.uint8)
+    data[: len(MAGIC)] = np.frombuffer(MAGIC, np.uint8)
+    data[len(MAGIC)] = 0x1A
+
+    aram = data[0x100:0x10100]
+    aram[0x1000 : 0x1000 + 2 * BLOCK_SIZE] = np.frombuffer(
+        _one_shot(0x11), np.uint8
+    )
+    aram[0x2000 : 0x2000 + 2 * BLOCK_SIZE] = np.frombuffer(
+        _one_shot(fill), np.uint8
+    )
+    aram[0x3000 : 0x3000 + 2 * BLOCK_SIZE] = np.frombuffer(
+        _one_shot(0x44, 0xC4), np.uint8
+    )
+
+    # Sample directory at 0x300, of (start, loop) address pairs
+    data[0x10100 + 0x5D] = 0x03
+    entries = np.repeat([0x1000, 0x2000, 0x3000], 2).astype("<u2")
+    aram[0x300 : 0x300 + entries.nbytes] = entries.view(np.uint8)
+
+    return data.tobytes()
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_batch(tmp_path, capsys):
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+
+    # Glob characters in a file name are taken literally
+    literal = src / "song [1].spc"
+    literal.write_bytes(_spc(0x22))
+    nested = src / "nested" / "other.spc"
+    nested.write_bytes(_spc(0x33))
+    bad = tmp_path / "bad.spc"
+    bad.write_bytes(b"Not an SPC file")
+
+    out = tmp_path / "out"
+    main(
+        [
+            str(literal),
+            str(src / "nested"),
+            str(tmp_path / "*.spc"),
+            str(tmp_path / "missing"),
+            "--output",
+            str(out),
+            "--jobs",
+            "1",
+        ]
+    )
+
+    stdout = capsys.readouterr().out
+    assert f"Could not read {bad}" in stdout
+    assert f"No SPCs found at {tmp_path / 'missing'}" in stdout
+    assert "Extracted 3 unique BRRs from 2 SPCs" in stdout
+
+    # Samples are named by content, and one shared by both files is only
+    # written once
+    shared, first, second = (_name(x) for x in (0x11, 0x22, 0x33))
+    assert sorted(x.name for x in out.glob("*.brr")) == sorted(
+        [shared, first, second]
+    )
+    assert (out / first).read_bytes() == _brr_file(0x22)
+
+    with open(out / "manifest.yaml", encoding="utf8") as fobj:
+        manifest = yaml.safe_load(fobj)
+
+    assert manifest == {
+        shared: [
+            {"spc": str(literal), "slot": 0},
+            {"spc": str(nested), "slot": 0},
+        ],
+        first: [{"spc": str(literal), "slot": 1}],
+        second: [{"spc": str(nested), "slot": 1}],
+    }
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Offline Mixer Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import (
+    Brr,
+    Envelope,
+    MixerException,
+    Note,
+    Voice,
+    mix,
+)
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _brr() -> Brr:
+    times = np.arange(1600) / 32000
+    pcm = 12000 * np.sin(2 * np.pi * 440 * times)
+    return Brr.from_pcm(pcm, 800)
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+@pytest.mark.parametrize("start, length", [(-1, 100), (0, -1)])
+def test_bad_timing(start, length):
+    note = Note(_brr(), Envelope(), 0x100, 0x24, start, length)
+
+    with pytest.raises(MixerException):
+        mix([note])
+
+
+###############################################################################
+
+
+def test_bad_voice():
+    note = Note(_brr(), Envelope(), 0x100, 0x24, 0, 100, voice=8)
+
+    with pytest.raises(MixerException):
+        mix([note])
+
+
+###############################################################################
+
+
+def test_cutoff():
+    env = Envelope(attack_setting=15, sus_level_setting=7)
+    notes = [
+        Note(_brr(), env, 0x100, 0x24, 0, 3000),
+        Note(_brr(), env, 0x100, 0x24, 1000, 200, volume=(0, 0)),
+    ]
+
+    # The second note is silent, and cuts the first one off
+    out = mix(notes)
+    assert out[:1000].any()
+    assert not out[1000:].any()
+
+
+###############################################################################
+
+
+def test_voice():
+    brr = _brr()
+    env = Envelope(attack_setting=15, sus_level_setting=7)
+    note = Note(brr, env, 0x100, 0x24, 100, 2048, volume=(127, -64))
+
+    voice = Voice(*brr.voice_source, note.pitch_reg, env)
+    frames = [voice.render().copy(), voice.render().copy()]
+    voice.keyoff()
+    frames.extend(frame.copy() for frame in voice)
+    expected = np.concatenate(frames).astype(np.int64)
+
+    out = mix([note])
+    left = out[100:, 0]
+    right = out[100:, 1]
+
+    assert not out[:100].any()
+    assert np.array_equal(
+        left, (((expected * 127) >> 7) * 127 >> 7)[: len(left)]
+    )
+    assert np.array_equal(
+        right, (((expected * -64) >> 7) * 127 >> 7)[: len(right)]
+    )
+    assert not expected[len(left) :].any()
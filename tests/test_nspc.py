@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""N-SPC Pitch Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import calc_tune, calc_tunes, set_pitch, set_pitches
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_calc_tunes():
+    fundamentals = np.linspace(100, 2000, 37)
+    tunes, actuals = calc_tunes(fundamentals, 0x24, 440)
+
+    for fundamental, tune, actual in zip(fundamentals, tunes, actuals):
+        assert calc_tune(fundamental, 0x24, 440) == (tune, actual)
+
+
+###############################################################################
+
+
+def test_set_pitches():
+    tunes = np.arange(0, 0x400, 0x33)
+    notes = np.arange(0x80, 0x80 + 72)
+    subnotes = np.arange(0, 256, 15)
+
+    pitches = set_pitches(*np.ix_(tunes, notes, subnotes))
+
+    for idx in np.ndindex(pitches.shape):
+        tune, note, subnote = tunes[idx[0]], notes[idx[1]], subnotes[idx[2]]
+        assert pitches[idx] == set_pitch(tune, note, subnote)
+
+
+###############################################################################
+
+
+def test_set_pitches_range():
+    with pytest.raises(ValueError):
+        set_pitches(0x100, [0x80, 0x80 + 72])
@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Sample Pack Index Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from pathlib import Path
+from zipfile import ZipFile
+
+# Library imports
+import numpy as np
+
+# Package imports
+from smw_music.spc700 import Brr
+from smw_music.spcmw import PackIndex
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _write_pack(fname: Path, nsamples: int) -> None:
+    # 500Hz is 64 samples per cycle
+    pcm = 8000 * np.sin(2 * np.pi * 500 * np.arange(1024) / 32000)
+    with ZipFile(fname, "w") as zobj:
+        for n in range(nsamples):
+            zobj.writestr(f"pack/{n}.brr", Brr.from_pcm(pcm, 512).binary)
+        zobj.writestr("pack/!patterns.txt", '"0.brr" $8F $E0 $00 $03 $20')
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_index(tmp_path):
+    fname = tmp_path / "pack.zip"
+    index_fname = tmp_path / "index.json"
+    _write_pack(fname, 1)
+
+    index = PackIndex(index_fname)
+    pack, tunings = index.load(fname)
+    index.save()
+
+    cached, cached_tunings = PackIndex(index_fname).load(fname)
+    sample = cached[Path("pack/0.brr")]
+
+    assert cached_tunings == tunings
+    assert sample.params == pack[Path("pack/0.brr")].params
+    assert sample.data == pack[Path("pack/0.brr")].data
+
+    # A changed pack is rescanned
+    _write_pack(fname, 2)
+    changed, _ = PackIndex(index_fname).load(fname)
+
+    assert len(changed.samples) == 2
+
+
+###############################################################################
+
+
+def test_load_all(tmp_path):
+    for n in range(3):
+        _write_pack(tmp_path / f"pack{n}.zip", n + 1)
+    (tmp_path / "bad.zip").write_bytes(b"not a zip file")
+    with ZipFile(tmp_path / "patterns.zip", "w") as zobj:
+        zobj.writestr("pack/!patterns.txt", '"0.brr $8F $E0 $00 $03 $20')
+    paths = sorted(tmp_path.glob("*.zip"), reverse=True)
+
+    index = PackIndex(None)
+    loaded = list(index.load_all(paths, 2))
+    cached = list(index.load_all(paths))
+
+    # Results come back in the order they were asked for
+    assert [x[0] for x in loaded] == paths
+    assert [x[0] for x in cached] == paths
+
+    loaded, cached = dict(loaded), dict(cached)
+    for name in ["bad.zip", "patterns.zip"]:
+        assert loaded[tmp_path / name] is None
+        assert cached[tmp_path / name] is None
+    for n in range(3):
+        pack, tunings = loaded[tmp_path / f"pack{n}.zip"]
+        assert len(pack.samples) == n + 1
+        assert cached[tmp_path / f"pack{n}.zip"][1] == tunings
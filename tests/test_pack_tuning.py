@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Sample Pack Tuning Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from zipfile import ZipFile
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import Brr
+from smw_music.spcmw import (
+    PACK_TUNING_FNAME,
+    analyze_packs,
+    load_pack_tunings,
+    save_pack_tunings,
+)
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_round_trip(tmp_path):
+    # 500Hz is 64 samples per cycle
+    pcm = 8000 * np.sin(2 * np.pi * 500 * np.arange(1024) / 32000)
+    brr = Brr.from_pcm(pcm, 512)
+    with ZipFile(tmp_path / "pack.zip", "w") as zobj:
+        zobj.writestr("pack/tone.brr", brr.binary)
+        zobj.writestr("pack/!patterns.txt", '"tone.brr" $FF $E0 $B8 $04 $00')
+
+    fname = tmp_path / PACK_TUNING_FNAME
+    tunings, failed = analyze_packs(tmp_path, 1)
+    save_pack_tunings(fname, tunings)
+    tuning = load_pack_tunings(fname)["pack"]["pack/tone.brr"]
+
+    assert not failed
+    assert tuning.digest == brr.digest
+    assert tuning.fundamental == pytest.approx(500, rel=1e-3)
+    assert (
+        256 * tuning.tune + tuning.subtune
+        == brr.tune(0x24, 440 * 2 ** (-9 / 12))[0]
+    )
+
+
+###############################################################################
+
+
+def test_bad_packs(tmp_path):
+    with ZipFile(tmp_path / "short.zip", "w") as zobj:
+        zobj.writestr("pack/short.brr", bytes(5))
+        zobj.writestr("pack/loop.brr", bytes([0xFF, 0xFF]) + bytes(18))
+        zobj.writestr(
+            "pack/!patterns.txt",
+            '"short.brr" $FF $E0 $B8 $04 $00\n"loop.brr" $FF $E0 $B8 $04 $00',
+        )
+    (tmp_path / "corrupt.zip").write_bytes(b"not a zip file")
+
+    tunings, failed = analyze_packs(tmp_path, 1)
+
+    assert tunings == {"short": {}}
+    assert failed == [tmp_path / "corrupt.zip"]
+
+
+###############################################################################
+
+
+def test_large_pack(tmp_path):
+    # Enough samples to be split across several workers
+    pcm = 8000 * np.sin(2 * np.pi * 500 * np.arange(1024) / 32000)
+    brr = Brr.from_pcm(pcm, 512)
+    names = [f"tone{n}.brr" for n in range(40)]
+    with ZipFile(tmp_path / "pack.zip", "w") as zobj:
+        for name in names:
+            zobj.writestr(f"pack/{name}", brr.binary)
+        zobj.writestr(
+            "pack/!patterns.txt",
+            "\n".join(f'"{name}" $FF $E0 $B8 $04 $00' for name in names),
+        )
+
+    tunings, failed = analyze_packs(tmp_path, 2)
+
+    assert not failed
+    assert sorted(tunings["pack"]) == sorted(f"pack/{x}" for x in names)
+
+
+###############################################################################
+
+
+def test_stale(tmp_path):
+    fname = tmp_path / PACK_TUNING_FNAME
+    fname.write_text('{"format": 0, "packs": {}}')
+
+    assert not load_pack_tunings(fname)
+    assert not load_pack_tunings(tmp_path / "missing.json")
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Pitch Estimation Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import (
+    Brr,
+    PitchMethod,
+    estimate_pitch,
+    magnitude_spectrum,
+)
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _tone(freq: float, amps: list[float], nsamples: int) -> np.ndarray:
+    times = np.arange(nsamples) / 32000
+    rv = sum(
+        amp * np.sin(2 * np.pi * (n + 1) * freq * times)
+        for n, amp in enumerate(amps)
+    )
+    return 8000 * rv / np.abs(rv).max()
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+@pytest.mark.parametrize("method", list(PitchMethod))
+def test_loop(method):
+    # 500Hz is 64 samples per cycle, a two-cycle loop after 256 samples
+    brr = Brr.from_pcm(_tone(500, [1, 0.5, 0.25], 256 + 128), 256)
+    estimate = brr.pitch(method)
+
+    assert estimate.frequency == pytest.approx(500, rel=1e-3)
+    assert estimate.confidence > 0.95
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("method", [PitchMethod.HPS, PitchMethod.YIN])
+def test_missing_fundamental(method):
+    estimate = estimate_pitch(_tone(200, [0, 1, 1, 1, 1], 8000), 0, method)
+
+    assert estimate.frequency == pytest.approx(200, rel=1e-2)
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("method", list(PitchMethod))
+def test_pure_tone(method):
+    estimate = estimate_pitch(_tone(1000, [1], 8000), 0, method)
+
+    assert estimate.frequency == pytest.approx(1000, rel=1e-2)
+
+
+###############################################################################
+
+
+def test_silence():
+    with pytest.raises(ValueError):
+        estimate_pitch(np.zeros(1000))
+    with pytest.raises(ValueError):
+        magnitude_spectrum(np.zeros(1000))
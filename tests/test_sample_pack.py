@@ -0,0 +1,44 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Sample Pack Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+from pathlib import Path
+from zipfile import ZipFile
+
+# Package imports
+from smw_music.spcmw import SamplePack
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_sample_pack(tmp_path):
+    fname = tmp_path / "pack.zip"
+    with ZipFile(fname, "w") as zobj:
+        zobj.writestr("inst/Flute.brr", bytes(18))
+        zobj.writestr("inst/sub/other.brr", bytes(9))
+        zobj.writestr(
+            "inst/!patterns.txt",
+            '"flute.brr" $8F $E0 $00 $03 $20 ; Flute\n'
+            + '"missing.brr" $8F $E0 $00 $03 $00\n',
+        )
+
+    pack = SamplePack(fname)
+    flute = pack[Path("inst/flute.brr")]
+    other = pack[Path("inst/sub/other.brr")]
+
+    assert flute.params.tuning == 3
+    assert flute.params.subtuning == 0x20
+    assert flute.size == 18
+    assert flute.data == bytes(18)
+    assert other.size == len(other.data) == 9
+    assert Path("inst/missing.brr") not in {x.path for x in pack.samples}
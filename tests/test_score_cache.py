@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Score Cache Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import os
+import pathlib
+import shutil
+from unittest import mock
+
+# Library imports
+import pytest
+
+# Package imports
+from smw_music.song import ScoreCache, Song
+
+###############################################################################
+# Private constant definitions
+###############################################################################
+
+_SRC = pathlib.Path("tests") / "src" / "Articulations.mxl"
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_cached(tmp_path):
+    expected = Song.from_music_xml(_SRC)
+    ScoreCache(tmp_path).from_music_xml(_SRC)
+
+    # A copy of the same score is served from the cache
+    fname = tmp_path / "copy.mxl"
+    shutil.copy(_SRC, fname)
+    with mock.patch.object(Song, "from_music_xml") as parse:
+        song = ScoreCache(tmp_path).from_music_xml(fname)
+
+    parse.assert_not_called()
+    assert song.channels == expected.channels
+    assert song.title == expected.title
+
+
+###############################################################################
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+def test_shared_directory(tmp_path):
+    cache_dir = tmp_path / "cache"
+    ScoreCache(cache_dir).from_music_xml(_SRC)
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    # Entries in a directory others can write to aren't trusted
+    cache_dir.chmod(0o777)
+    with mock.patch.object(
+        Song, "from_music_xml", wraps=Song.from_music_xml
+    ) as parse:
+        ScoreCache(cache_dir).from_music_xml(_SRC)
+
+    parse.assert_called_once()
+
+
+###############################################################################
+
+
+def test_version_change(tmp_path):
+    ScoreCache(tmp_path).from_music_xml(_SRC)
+
+    with mock.patch("smw_music.song.cache.__version__", "0.0.0"):
+        with mock.patch.object(
+            Song, "from_music_xml", wraps=Song.from_music_xml
+        ) as parse:
+            ScoreCache(tmp_path).from_music_xml(_SRC)
+
+    parse.assert_called_once()
@@ -0,0 +1,98 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Song Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import pathlib
+import threading
+
+# Library imports
+import pytest
+
+# Package imports
+from smw_music.song import Rest, Song
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "fname",
+    ["Crescendos.mxl", "Loop_Point.mxl", "SMB_Castle_Theme.mxl"],
+)
+def test_parallel_parts(fname):
+    fname = pathlib.Path("tests") / "src" / fname
+
+    expected = Song.from_music_xml(fname)
+    song = Song.from_music_xml(fname, workers=2)
+
+    assert len(song.channels) > 1
+    assert song.channels == expected.channels
+
+    # Parts are converted in this process when other threads are running
+    done = threading.Event()
+    thread = threading.Thread(target=done.wait)
+    thread.start()
+    try:
+        song = Song.from_music_xml(fname, workers=2)
+    finally:
+        done.set()
+        thread.join()
+
+    assert song.channels == expected.channels
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "fname",
+    [
+        "Crescendos.mxl",
+        "Headers.mxl",
+        "Loop_Point.mxl",
+        "Metadata.mxl",
+        "SMB_Castle_Theme.mxl",
+    ],
+)
+def test_streaming(fname):
+    fname = pathlib.Path("tests") / "src" / fname
+
+    expected = Song.from_music_xml(fname)
+    song = Song.from_music_xml(fname, streaming=True)
+
+    assert song.channels == expected.channels
+    assert song.title == expected.title
+    assert song.composer == expected.composer
+    assert song.porter == expected.porter
+    assert song.game == expected.game
+
+
+###############################################################################
+
+
+def test_streaming_missing_duration(tmp_path):
+    fname = tmp_path / "score.musicxml"
+    fname.write_text(
+        '<score-partwise><part-list><score-part id="P1">'
+        "<part-name>A</part-name></score-part></part-list>"
+        '<part id="P1"><measure number="1">'
+        "<attributes><divisions>1</divisions></attributes>"
+        "<note><rest/></note>"
+        "<note><pitch><step>C</step><octave>4</octave></pitch>"
+        "<duration>4</duration><type>whole</type></note>"
+        "</measure></part></score-partwise>"
+    )
+
+    song = Song.from_music_xml(fname, streaming=True)
+    rests = [x for x in song.channels[0] if isinstance(x, Rest)]
+
+    assert rests and rests[0].dots == 0
@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""SPC File Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Library imports
+import numpy as np
+import pytest
+
+# Package imports
+from smw_music.spc700 import BLOCK_SIZE, SpcException, SpcFile, extract_brrs
+from smw_music.spc700.brr import _next_end_blocks
+from smw_music.spc700.spc_file import MAGIC
+
+###############################################################################
+# Private function definitions
+###############################################################################
+
+
+def _spc() -> bytes:
+    data = np.zeros(0x10200, dtype=np.uint8)
+    data[: len(MAGIC)] = np.frombuffer(MAGIC, np.uint8)
+    data[len(MAGIC)] = 0x1A
+    data[0x2E : 0x2E + 5] = np.frombuffer(b"Title", np.uint8)
+    data[0xB1 : 0xB1 + 6] = np.frombuffer(b"Artist", np.uint8)
+
+    aram = data[0x100:0x10100]
+
+    # Looping two-block sample at 0x1000, looping from its second block
+    aram[0x1000 : 0x1000 + 2 * BLOCK_SIZE] = 0x11
+    aram[0x1000] = 0xC0
+    aram[0x1000 + BLOCK_SIZE] = 0xC3
+
+    # One-shot three-block sample at 0x2000
+    aram[0x2000 : 0x2000 + 3 * BLOCK_SIZE] = 0x22
+    aram[0x2000 + 2 * BLOCK_SIZE] = 0xC1
+
+    # Sample directory at 0x300
+    data[0x10100 + 0x5D] = 0x03
+    aram[0x300:0x308] = [0x00, 0x10, 0x09, 0x10, 0x00, 0x20, 0x00, 0x20]
+
+    return data.tobytes()
+
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+def test_extract(tmp_path):
+    fname = tmp_path / "test.spc"
+    fname.write_bytes(_spc())
+    spc = SpcFile.from_file(fname)
+
+    # Empty directory entries point at 0x0000, which has no end block before
+    # the directory
+    brrs = extract_brrs(spc)
+    assert len(brrs) == 2
+
+    assert brrs[0].nblocks == 2
+    assert brrs[0].sample_loops
+    assert brrs[0].loop_point == BLOCK_SIZE
+
+    assert brrs[1].nblocks == 3
+    assert not brrs[1].sample_loops
+
+    # Blocks are views into the file, not copies
+    assert all(np.shares_memory(brr.blocks, spc.aram) for brr in brrs)
+
+
+###############################################################################
+
+
+def test_id666():
+    spc = SpcFile(_spc())
+
+    assert spc.id666.song == "Title"
+    assert spc.id666.artist == "Artist"
+    assert spc.id666.game == ""
+
+
+###############################################################################
+
+
+def test_next_end_blocks():
+    rng = np.random.default_rng(0)
+    aram = (rng.random(0x10000) < 0.02).astype(np.uint8)
+    ends = _next_end_blocks(aram)
+
+    for addr in rng.integers(0, len(aram), 2000):
+        expected = len(aram)
+        for block in range(addr, len(aram) - BLOCK_SIZE + 1, BLOCK_SIZE):
+            if aram[block] & 0x1:
+                expected = block
+                break
+        assert ends[addr] == expected
+
+
+###############################################################################
+
+
+def test_not_spc():
+    data = b"Not an SPC file" + bytes(0x10200)
+
+    assert extract_brrs(data) == []
+    with pytest.raises(SpcException):
+        SpcFile(data)
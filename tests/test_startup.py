@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2024 The SMW Music Python Project Authors
+# <https://github.com/com-posers-pit/smw_music/blob/develop/AUTHORS.rst>
+#
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Entry Point Startup Tests."""
+
+###############################################################################
+# Imports
+###############################################################################
+
+# Standard library imports
+import subprocess
+import sys
+
+# Library imports
+import pytest
+
+###############################################################################
+# Test definitions
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "script, heavy",
+    [
+        ("convert", ["PyQt6", "scipy"]),
+        ("describe_brr", ["PyQt6", "music21", "scipy"]),
+        ("dump_ast", ["PyQt6", "scipy"]),
+        ("extract_brrs", ["PyQt6", "music21", "scipy"]),
+        ("tune_packs", ["PyQt6", "scipy"]),
+    ],
+)
+def test_startup_imports(script, heavy):
+    # Run in a fresh interpreter, so nothing's already been imported
+    code = "\n".join(
+        [
+            "import sys",
+            f"import smw_music.scripts.{script}",
+            f"print(' '.join(x for x in {heavy!r} if x in sys.modules))",
+        ]
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert result.stdout.split() == []